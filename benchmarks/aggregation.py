@@ -0,0 +1,111 @@
+"""
+Aggregated /currency/ latency: per-request rebuild (legacy) vs. the ingest-time cross-exchange index, on an idle
+store and with a tick written between requests, as under live ingest.
+
+Run: python -m benchmarks.aggregation [pairs_per_exchange] [requests]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from src.app import app
+from src.store import QuoteStore
+from src.utils import CurrencyAggregation
+
+EXCHANGES = ("binance", "kraken", "huobi", "kucoin")
+
+
+def fill(store: QuoteStore, legacy_db: dict, pairs: int) -> None:
+    for exchange in EXCHANGES:
+        for i in range(pairs):
+            ask = str(round(random.uniform(1, 5000), 2))
+            bid = str(round(random.uniform(1, 5000), 2))
+            store.update(exchange, f"PAIR{i}USDT", ask, bid)
+            legacy_db.setdefault(exchange, {})[f"PAIR{i}USDT"] = store.exchange(exchange).get(f"PAIR{i}USDT")
+
+
+def legacy_aggregation(legacy_db: dict) -> dict:
+    aggregated_prices = {}
+    for exchange, cache in legacy_db.items():
+        for currency in cache:
+            cur_dict = {currency: cache[currency]}
+            CurrencyAggregation(exchange, cur_dict, aggregated_prices).aggregation
+    return aggregated_prices
+
+
+def legacy_app(legacy_db: dict) -> FastAPI:
+    legacy = FastAPI()
+
+    @legacy.get("/currency/")
+    async def main() -> dict:
+        return {"result": legacy_aggregation(legacy_db)}
+
+    return legacy
+
+
+async def request_latency(application: FastAPI, requests: int, write=None, encoding: str = "identity") -> float:
+    async with AsyncClient(app=application, base_url="http://bench", headers={"Accept-Encoding": encoding}) as client:
+        await client.get("/currency/")
+        elapsed = 0.0
+        for _ in range(requests):
+            if write is not None:
+                write()
+            start = time.perf_counter()
+            await client.get("/currency/")
+            elapsed += time.perf_counter() - start
+        return elapsed / requests
+
+
+def tick(store: QuoteStore, legacy_db: dict, pairs: int):
+    def write() -> None:
+        exchange, pair = random.choice(EXCHANGES), f"PAIR{random.randrange(pairs)}USDT"
+        bid = round(random.uniform(1, 5000), 2)
+        store.update(exchange, pair, str(bid + 0.01), str(bid))
+        legacy_db[exchange][pair] = store.exchange(exchange).get(pair)
+
+    return write
+
+
+def main(pairs: int = 2000, requests: int = 50) -> None:
+    from src.app import AGGREGATED_BODY, DB
+
+    legacy_db = {}
+    fill(DB, legacy_db, pairs)
+
+    rounds = 200
+    start = time.perf_counter()
+    for _ in range(rounds):
+        legacy_aggregation(legacy_db)
+    rebuild = (time.perf_counter() - start) / rounds
+
+    # the body after one tick, as a request under live ingest finds it
+    write = tick(DB, legacy_db, pairs)
+    AGGREGATED_BODY.build()
+    indexed = 0.0
+    for _ in range(rounds):
+        write()
+        start = time.perf_counter()
+        AGGREGATED_BODY.build()
+        indexed += time.perf_counter() - start
+    indexed /= rounds
+
+    legacy_request = asyncio.run(request_latency(legacy_app(legacy_db), requests))
+    indexed_request = asyncio.run(request_latency(app, requests))
+    legacy_live = asyncio.run(request_latency(legacy_app(legacy_db), requests, write))
+    indexed_live = asyncio.run(request_latency(app, requests, write))
+    # a gzip body is compressed again for every new version
+    indexed_gzip = asyncio.run(request_latency(app, requests, write, "gzip"))
+
+    print(f"pairs: {pairs} x {len(EXCHANGES)} exchanges")
+    print(f"aggregation build   legacy: {rebuild * 1e3:9.3f} ms   indexed: {indexed * 1e3:9.3f} ms")
+    print(f"GET /currency/      legacy: {legacy_request * 1e3:9.3f} ms   indexed: {indexed_request * 1e3:9.3f} ms")
+    print(f"  tick in between   legacy: {legacy_live * 1e3:9.3f} ms   indexed: {indexed_live * 1e3:9.3f} ms")
+    print(f"  tick, gzip body                       indexed: {indexed_gzip * 1e3:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,161 @@
+"""
+Binance !ticker@arr against bookTicker streams on the same simulated price path, replayed at recorded pace:
+share of best bid/ask changes that reach the store, latency from the change at the exchange to the store write,
+connector CPU and bytes received. !ticker@arr sends every changed symbol's full 24h ticker once a second,
+bookTicker one small message per change.
+
+Run: python -m benchmarks.binance [symbols] [seconds] [changes_per_symbol_per_second]
+"""
+import asyncio
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+from benchmarks.ingest import collect, serve
+from benchmarks.replay import CONNECTORS, Recording, StandInServer, _price
+from src import bootstrap
+from src.settings import logger
+from src.store import QuoteStore
+
+
+def price_path(symbols: int, seconds: float, rate: float) -> list[tuple[float, str, str, str]]:
+    """
+    (seconds since start, symbol, ask, bid) of every best bid/ask change, every symbol starts at 0.
+    """
+    changes = []
+    for i in range(symbols):
+        symbol, base, t = f"C{i}USDT", random.uniform(0.01, 50000), 0.0
+        while t < seconds:
+            changes.append((t, symbol, *_price(base)))
+            t += random.expovariate(rate)
+    changes.sort()
+    return changes
+
+
+def book_recording(changes: list) -> Recording:
+    frames = []
+    for n, (t, symbol, ask, bid) in enumerate(changes):
+        ticker = {"u": n, "s": symbol, "b": bid, "B": "1.00000000", "a": ask, "A": "1.00000000"}
+        frames.append((t, json.dumps({"stream": f"{symbol.lower()}@bookTicker", "data": ticker})))
+    return Recording("binance_book", frames, {"symbols": sorted({change[1] for change in changes})})
+
+
+def ticker_recording(changes: list, interval: float = 1.0) -> Recording:
+    frames, latest, i = [], {}, 0
+    t = 0.0
+    while i < len(changes):
+        while i < len(changes) and changes[i][0] <= t:
+            latest[changes[i][1]] = changes[i]
+            i += 1
+        tickers = [
+            {
+                "e": "24hrTicker",
+                "E": 0,
+                "s": symbol,
+                "p": "0.1",
+                "P": "0.1",
+                "w": bid,
+                "x": bid,
+                "c": bid,
+                "Q": "1.00000000",
+                "b": bid,
+                "B": "1.00000000",
+                "a": ask,
+                "A": "1.00000000",
+                "o": bid,
+                "h": ask,
+                "l": bid,
+                "v": "1000.00000000",
+                "q": "50000.00000000",
+                "O": 0,
+                "C": 0,
+                "F": 1,
+                "L": 2,
+                "n": 2,
+            }
+            for _, symbol, ask, bid in latest.values()
+        ]
+        if tickers:
+            frames.append((t, json.dumps(tickers)))
+        latest = {}
+        t += interval
+    return Recording("binance", frames)
+
+
+async def consume(exchange: str, port: int, frames: int, asks: dict[str, float]) -> dict:
+    store = QuoteStore()
+    connector = CONNECTORS[exchange](store)
+    StandInServer(Recording(exchange, []), port=port).configure(connector)
+    # perf_counter() of every store write by ask
+    writes = {}
+    update_many = store.update_many
+
+    def timed_update_many(exchange, quotes, *args) -> list:
+        now = time.perf_counter()
+        for ask, *_ in quotes.values():
+            writes[ask] = now
+        return update_many(exchange, quotes, *args)
+
+    store.update_many = timed_update_many
+    cpu = time.process_time()
+    task = asyncio.create_task(connector.connection())
+    while connector.queue.processed - connector.subscribed < frames and not task.done():
+        await asyncio.sleep(0.005)
+    cpu = time.process_time() - cpu
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await bootstrap.close()
+    # the replay start is aligned on the fastest write (the prices at offset 0 are sent by both streams at once),
+    # so a latency is the delay beyond the best case
+    raw = sorted(written - asks[ask] for ask, written in writes.items() if ask in asks)
+    latencies = [value - raw[0] for value in raw]
+    return {
+        "delivered": len(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[int(len(latencies) * 0.99)],
+        "cpu": cpu,
+        "bytes": connector.queue.bytes_received,
+    }
+
+
+def client(exchange: str, port: int, frames: int, asks: dict, results: multiprocessing.Queue) -> None:
+    logger.disable("markets")
+    results.put(asyncio.run(consume(exchange, port, frames, asks)))
+
+
+def bench(recording: Recording, asks: dict) -> dict:
+    context = multiprocessing.get_context("spawn")
+    ports, results = context.Queue(), context.Queue()
+    server = context.Process(target=serve, args=(recording, 1.0, ports), daemon=True)
+    server.start()
+    try:
+        port = ports.get(timeout=30)
+        worker = context.Process(target=client, args=(recording.exchange, port, len(recording), asks, results))
+        worker.start()
+        return collect(results, worker)
+    finally:
+        server.terminate()
+
+
+def main(symbols: int = 300, seconds: float = 10.0, rate: float = 2.0) -> None:
+    changes = price_path(symbols, seconds, rate)
+    asks = {ask: t for t, _, ask, _ in changes}
+    print(f"{symbols} symbols, {len(changes)} best bid/ask changes in {seconds:.0f}s")
+    for name, recording in (("!ticker@arr", ticker_recording(changes)), ("bookTicker", book_recording(changes))):
+        result = bench(recording, asks)
+        print(
+            f"{name:12} changes stored {result['delivered'] / len(changes):6.1%}   "
+            f"latency p50 {result['p50'] * 1e3:7.1f} ms, p99 {result['p99'] * 1e3:7.1f} ms   "
+            f"CPU {result['cpu'] / seconds * 100:5.1f}%   received {result['bytes'] / seconds / 1024:7.1f} KiB/s"
+        )
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:4]
+    main(
+        int(arguments[0]) if arguments else 300,
+        float(arguments[1]) if len(arguments) > 1 else 10.0,
+        float(arguments[2]) if len(arguments) > 2 else 2.0,
+    )
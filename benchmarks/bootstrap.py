@@ -0,0 +1,76 @@
+"""
+Connector start-up time against the replay stand-in server: time from connection() to the first processed frame
+with the REST endpoints answering after a delay that plays a remote API.
+    cold      no cached catalog, a new HTTP session (what every connect cost before the shared bootstrap)
+    cached    catalog from the cache file, a new HTTP session (process restart)
+    reconnect catalog and token in memory, pooled session
+Binance has no REST bootstrap, its time is the websocket handshake and the first frame alone.
+
+Run: python -m benchmarks.bootstrap [rest_delay_ms] [rounds]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.replay import CONNECTORS, StandInServer, synthesize
+from src import bootstrap
+from src.settings import logger
+from src.store import QuoteStore
+
+
+async def first_frame(connector) -> float:
+    start = time.perf_counter()
+    task = asyncio.create_task(connector.connection())
+    while connector.queue.processed == 0 and not task.done():
+        await asyncio.sleep(0.0005)
+    elapsed = time.perf_counter() - start
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    connector.queue.processed = 0
+    return elapsed
+
+
+async def measure(exchange: str, rest_delay: float, rounds: int, directory: str) -> dict[str, float]:
+    recording = synthesize(exchange, pairs=200, frames=50)
+    times = {"cold": [], "cached": [], "reconnect": []}
+    async with StandInServer(recording, rest_delay=rest_delay) as server:
+        for _ in range(rounds):
+            # cold: nothing cached anywhere, the run leaves the catalog file behind
+            connector = CONNECTORS[exchange](QuoteStore())
+            server.configure(connector)
+            if hasattr(connector, "catalog"):
+                connector.catalog.directory = directory
+                if os.path.exists(connector.catalog.path):
+                    os.remove(connector.catalog.path)
+            await bootstrap.close()
+            times["cold"].append(await first_frame(connector))
+
+            # cached: a fresh connector and session started from that file
+            connector = CONNECTORS[exchange](QuoteStore())
+            server.configure(connector)
+            if hasattr(connector, "catalog"):
+                connector.catalog.directory = directory
+            await bootstrap.close()
+            times["cached"].append(await first_frame(connector))
+            times["reconnect"].append(await first_frame(connector))
+        await bootstrap.close()
+    return {name: min(values) for name, values in times.items()}
+
+
+async def main(rest_delay_ms: float = 100.0, rounds: int = 5) -> None:
+    # one connect line per attempt would bury the table
+    logger.disable("markets")
+    print(f"REST endpoints answer after {rest_delay_ms:.0f} ms, best of {rounds}, ms to the first processed frame")
+    print(f"{'exchange':10} {'cold':>9} {'cached':>9} {'reconnect':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for exchange in sorted(CONNECTORS):
+            result = await measure(exchange, rest_delay_ms / 1000, rounds, directory)
+            print(
+                f"{exchange:10} " + " ".join(f"{result[name] * 1e3:9.1f}" for name in ("cold", "cached", "reconnect"))
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(float(arg) for arg in sys.argv[1:2]), *(int(arg) for arg in sys.argv[2:3])))
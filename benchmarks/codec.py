@@ -0,0 +1,74 @@
+"""
+JSON codec throughput per backend: Binance !ticker@arr frame decode and aggregated /currency/ body encode.
+
+Run: python -m benchmarks.codec [tickers] [rounds]
+"""
+import random
+import sys
+import time
+
+from src.codec import CODECS
+from src.store import QuoteStore
+
+
+def binance_frame(tickers: int) -> bytes:
+    frame = []
+    for i in range(tickers):
+        price = random.uniform(0.0001, 70000)
+        frame.append(
+            {
+                "e": "24hrTicker",
+                "E": 1697000000000 + i,
+                "s": f"PAIR{i}USDT",
+                "p": f"{price * 0.01:.8f}",
+                "P": "1.250",
+                "w": f"{price:.8f}",
+                "x": f"{price:.8f}",
+                "c": f"{price:.8f}",
+                "Q": "0.10000000",
+                "b": f"{price * 0.999:.8f}",
+                "B": "1.00000000",
+                "a": f"{price * 1.001:.8f}",
+                "A": "2.00000000",
+                "o": f"{price:.8f}",
+                "h": f"{price * 1.05:.8f}",
+                "l": f"{price * 0.95:.8f}",
+                "v": "1234.56780000",
+                "q": "98765432.10000000",
+                "O": 1696913600000,
+                "C": 1697000000000,
+                "F": 1,
+                "L": 100000,
+                "n": 100000,
+            }
+        )
+    return CODECS["json"].dumps(frame)
+
+
+def aggregated_body(pairs: int) -> dict:
+    store = QuoteStore()
+    for exchange in ("binance", "kraken", "huobi", "kucoin"):
+        for i in range(pairs):
+            store.update(exchange, f"PAIR{i}USDT", f"{random.uniform(1, 5000):.8f}", f"{random.uniform(1, 5000):.8f}")
+    return {"result": store.aggregated()}
+
+
+def throughput(function, argument, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function(argument)
+    return rounds / (time.perf_counter() - start)
+
+
+def main(tickers: int = 2000, rounds: int = 50) -> None:
+    frame = binance_frame(tickers)
+    body = aggregated_body(tickers)
+    print(f"frame: {tickers} tickers, {len(frame) / 1024:.0f} KiB   body: {len(body['result'])} pairs x 4 exchanges")
+    for name, codec in CODECS.items():
+        decode = throughput(codec.loads, frame, rounds)
+        encode = throughput(codec.dumps, body, rounds)
+        print(f"{name:<8} decode: {decode * tickers:12,.0f} tickers/s   encode: {encode:8,.1f} bodies/s")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
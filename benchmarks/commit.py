@@ -0,0 +1,73 @@
+"""
+Committing Binance-sized frames to the quote store: one update() per tick against one update_many() per frame,
+with the listeners the ingest process runs (the /stream hub and the shared store writer).
+
+Run: python -m benchmarks.commit [pairs] [frames] [ticks_per_frame]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from src.shared import SharedQuoteWriter, remove
+from src.store import QuoteStore
+from src.stream import StreamHub
+
+
+def frames(pairs: int, count: int, size: int) -> list[dict]:
+    names = [f"PAIR{i}USDT" for i in range(pairs)]
+    result = []
+    for _ in range(count):
+        frame = {}
+        for pair in random.sample(names, size):
+            bid = round(random.uniform(1, 5000), 2)
+            frame[pair] = (str(bid + 0.01), str(bid), time.time(), None)
+        result.append(frame)
+    return result
+
+
+def per_tick(store: QuoteStore, data: list[dict]) -> None:
+    update = store.update
+    for frame in data:
+        for pair, (ask, bid, event_time, received_at) in frame.items():
+            update("binance", pair, ask, bid, event_time, received_at)
+
+
+def per_frame(store: QuoteStore, data: list[dict]) -> None:
+    update_many = store.update_many
+    for frame in data:
+        update_many("binance", frame)
+
+
+def measure(name: str, commit, data: list[dict], path: str, shared: bool) -> None:
+    store = QuoteStore()
+    StreamHub(store)
+    writer = SharedQuoteWriter(store, path, capacity=4096) if shared else None
+    commit(store, data[:10])
+    ticks = sum(len(frame) for frame in data)
+
+    start = time.perf_counter()
+    commit(store, data)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<10} {ticks / elapsed:12,.0f} ticks/s   {elapsed / len(data) * 1e6:8.1f} us/frame   "
+        f"versions: {store.version('binance'):,}"
+    )
+    if writer is not None:
+        writer.close()
+        remove(path)
+
+
+def main(pairs: int = 2000, count: int = 2000, size: int = 300) -> None:
+    data = frames(pairs, count, size)
+    path = os.path.join(tempfile.mkdtemp(), "quotes")
+    print(f"frames: {count} x {size} ticks over {pairs} pairs")
+    for shared in (False, True):
+        print("with the shared store writer" if shared else "in-process listeners only")
+        measure("per tick", per_tick, data, path, shared)
+        measure("per frame", per_frame, data, path, shared)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,97 @@
+"""
+Huobi decode pool: how long the event loop is blocked while the connector ingests a replayed stream, with gzip and
+JSON decoding inline, in a thread pool and in a process pool. A 1 ms timer on the connector's loop stands in for
+request handling, its lateness is the time a request would wait.
+
+Run: python -m benchmarks.decode [frames] [pairs] [speed]
+"""
+import asyncio
+import multiprocessing
+import sys
+import time
+
+from benchmarks.ingest import serve
+from benchmarks.replay import Recording, StandInServer, synthesize
+from markets.huobi import HuobiWebSocket, decode_frame
+from src import bootstrap
+from src.ingest import DecodePool
+from src.settings import logger
+from src.store import QuoteStore
+
+
+async def consume(port: int, frames: int, pool: str) -> dict:
+    connector = HuobiWebSocket(QuoteStore(), decoder=DecodePool(decode_frame, pool) if pool else None)
+    StandInServer(Recording("huobi", []), port=port).configure(connector)
+    delays = []
+    running = True
+
+    async def ticker() -> None:
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            delays.append(time.perf_counter() - start - 0.001)
+
+    timer = asyncio.create_task(ticker())
+    wall, cpu = time.perf_counter(), time.process_time()
+    task = asyncio.create_task(connector.connection())
+    while connector.queue.processed + connector.queue.dropped < frames and not task.done():
+        await asyncio.sleep(0.005)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    running = False
+    await timer
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    connector.close()
+    await bootstrap.close()
+    delays.sort()
+    return {
+        "messages": connector.queue.processed,
+        "dropped": connector.queue.dropped,
+        "wall": wall,
+        "cpu": cpu,
+        "p99": delays[int(len(delays) * 0.99)],
+        "worst": delays[-1],
+    }
+
+
+def client(port: int, frames: int, pool: str, results: multiprocessing.Queue) -> None:
+    logger.disable("markets")
+    results.put(asyncio.run(consume(port, frames, pool)))
+
+
+def bench(recording: Recording, speed: float, pool: str) -> dict:
+    context = multiprocessing.get_context("spawn")
+    ports, results = context.Queue(), context.Queue()
+    server = context.Process(target=serve, args=(recording, speed, ports), daemon=True)
+    server.start()
+    try:
+        port = ports.get(timeout=30)
+        worker = context.Process(target=client, args=(port, len(recording), pool, results))
+        worker.start()
+        result = results.get(timeout=600)
+        worker.join()
+        return result
+    finally:
+        server.terminate()
+
+
+def main(frames: int = 20000, pairs: int = 500, speed: float = 0.0) -> None:
+    recording = synthesize("huobi", pairs, frames)
+    print(f"{frames} Huobi frames, {pairs} pairs, speed: {speed or 'max'}")
+    for pool in ("", "thread", "process"):
+        result = bench(recording, speed, pool)
+        print(
+            f"{pool or 'inline':8} {result['messages'] / result['wall']:10,.0f} msg/s   "
+            f"{result['cpu'] / max(result['messages'], 1) * 1e6:6.1f} us CPU/msg (connector process)   "
+            f"loop stall p99 {result['p99'] * 1e3:6.2f} ms, worst {result['worst'] * 1e3:6.2f} ms   "
+            f"dropped: {result['dropped']}"
+        )
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:4]
+    main(
+        int(arguments[0]) if arguments else 20000,
+        int(arguments[1]) if len(arguments) > 1 else 500,
+        float(arguments[2]) if len(arguments) > 2 else 0.0,
+    )
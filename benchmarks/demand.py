@@ -0,0 +1,105 @@
+"""
+Demand mode against subscribing the whole catalog, on a routed Huobi replay (the stand-in server sends a connection
+only the channels it is subscribed to): bytes received, messages decoded, connector CPU and pairs held in the store
+while clients ask for `queried` of the `pairs` symbols, plus how long a first request waits for its quote.
+
+Run: python -m benchmarks.demand [pairs] [queried] [frames] [speed]
+"""
+import asyncio
+import multiprocessing
+import random
+import sys
+import time
+
+from benchmarks.replay import Recording, StandInServer, synthesize
+from benchmarks.sharding import serve
+from markets.huobi import HuobiWebSocket
+from src import bootstrap
+from src.demand import DemandSubscriptions
+from src.settings import logger
+from src.store import QuoteStore
+
+
+async def consume(port: int, demand: bool, queried: list[str], seconds: float) -> dict:
+    store = QuoteStore()
+    connector = HuobiWebSocket(store)
+    StandInServer(Recording("huobi", []), port=port).configure(connector)
+    subscriptions = DemandSubscriptions(store, [connector], always_on=set(), wait=seconds) if demand else None
+    cpu = time.process_time()
+    task = asyncio.create_task(connector.connection())
+    waits = []
+    if subscriptions is not None:
+        while connector.websocket is None:
+            await asyncio.sleep(0.001)
+
+        async def first_request(pair: str) -> None:
+            start = time.perf_counter()
+            await subscriptions.request("huobi", pair)
+            waits.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(first_request(pair) for pair in queried))
+    # the replay is over once no frame arrived for a second
+    while not task.done() and (not connector.last_message_at or time.monotonic() - connector.last_message_at < 1):
+        await asyncio.sleep(0.05)
+    cpu = time.process_time() - cpu
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await bootstrap.close()
+    waits.sort()
+    return {
+        "subscriptions": connector.subscriptions,
+        "messages": connector.queue.processed,
+        "bytes": connector.queue.bytes_received,
+        "cpu": cpu,
+        "pairs": len(store.exchange("huobi")) if "huobi" in store else 0,
+        "wait_p50": waits[len(waits) // 2] if waits else None,
+        "wait_worst": waits[-1] if waits else None,
+    }
+
+
+def client(port: int, demand: bool, queried: list, seconds: float, results: multiprocessing.Queue) -> None:
+    logger.disable("markets")
+    results.put(asyncio.run(consume(port, demand, queried, seconds)))
+
+
+def bench(recording: Recording, demand: bool, queried: list, seconds: float, speed: float) -> dict:
+    context = multiprocessing.get_context("spawn")
+    ports, results = context.Queue(), context.Queue()
+    server = context.Process(target=serve, args=(recording, ports, speed), daemon=True)
+    server.start()
+    try:
+        port = ports.get(timeout=60)
+        worker = context.Process(target=client, args=(port, demand, queried, seconds, results))
+        worker.start()
+        result = results.get(timeout=600)
+        worker.join()
+        return result
+    finally:
+        server.terminate()
+
+
+def main(pairs: int = 1500, queried: int = 100, frames: int = 20000, speed: float = 2.0) -> None:
+    recording = synthesize("huobi", pairs, frames)
+    seconds = recording.frames[-1][0] / speed
+    names = [symbol.upper() for symbol in recording.rest["symbols"]]
+    asked = random.sample(names, queried)
+    print(f"{pairs} symbols, {queried} queried, {frames} frames replayed in {seconds:.0f}s")
+    for name, demand in (("full", False), ("demand", True)):
+        result = bench(recording, demand, asked, seconds, speed)
+        line = (
+            f"{name:7} {result['subscriptions']:5} subscriptions   {result['messages']:7} messages   "
+            f"received {result['bytes'] / 1024:8.1f} KiB   CPU {result['cpu']:5.2f} s   {result['pairs']:5} pairs stored"
+        )
+        if result["wait_p50"] is not None:
+            line += f"   first request wait p50 {result['wait_p50'] * 1e3:.0f} ms, worst {result['wait_worst'] * 1e3:.0f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:5]
+    main(
+        int(arguments[0]) if arguments else 1500,
+        int(arguments[1]) if len(arguments) > 1 else 100,
+        int(arguments[2]) if len(arguments) > 2 else 20000,
+        float(arguments[3]) if len(arguments) > 3 else 2.0,
+    )
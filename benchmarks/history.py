@@ -0,0 +1,65 @@
+"""
+Tick history cost: store commits with and without the history rings attached, ring memory per pair, and /history/
+summary time over a full ring with the NumPy and the plain loop backends.
+
+Run: python -m benchmarks.history [pairs] [depth] [frames]
+"""
+import random
+import sys
+import time
+
+from src import history
+from src.history import TickHistory
+from src.store import QuoteStore
+
+
+def frames(pairs: int, count: int, size: int = 300) -> list[dict]:
+    names = [f"PAIR{i}USDT" for i in range(pairs)]
+    result = []
+    for n in range(count):
+        frame = {}
+        for pair in random.sample(names, min(size, pairs)):
+            bid = round(random.uniform(1, 5000), 2)
+            frame[pair] = (str(bid + 0.01), str(bid), 0.0, n * 0.1)
+        result.append(frame)
+    return result
+
+
+def commit(store: QuoteStore, data: list[dict]) -> float:
+    update_many = store.update_many
+    start = time.perf_counter()
+    for frame in data:
+        update_many("binance", frame)
+    return time.perf_counter() - start
+
+
+def main(pairs: int = 2000, depth: int = 512, count: int = 2000) -> None:
+    data = frames(pairs, count)
+    ticks = sum(len(frame) for frame in data)
+    print(f"frames: {count} x 300 ticks over {pairs} pairs, ring depth {depth}")
+
+    plain = commit(QuoteStore(), data)
+    store = QuoteStore()
+    rings = TickHistory(store, depth=depth)
+    tracked = commit(store, data)
+    print(f"store only    {ticks / plain:12,.0f} ticks/s")
+    print(f"with history  {ticks / tracked:12,.0f} ticks/s   {rings.allocated / pairs / 1024:.1f} KiB/pair")
+
+    numpy = history.np
+    for backend in ("numpy", "python"):
+        if backend == "numpy" and numpy is None:
+            print("numpy         not installed")
+            continue
+        history.np = numpy if backend == "numpy" else None
+        names = random.choices(list(rings.rings["binance"]), k=2000)
+        now = count * 0.1
+        start = time.perf_counter()
+        for pair in names:
+            rings.summary("binance", pair, window=now, now=now)
+        elapsed = time.perf_counter() - start
+        print(f"{backend:<13} {elapsed / len(names) * 1e6:12.1f} us/summary of a full window")
+    history.np = numpy
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,119 @@
+"""
+Ingest benchmark for every connector against the replay stand-in server:
+messages/sec, ticks/sec, CPU time per message and peak memory of the connector process.
+
+Run: python -m benchmarks.ingest [frames] [pairs] [speed]          synthetic streams
+     python -m benchmarks.ingest --recording huobi.jsonl.gz [speed]  a recorded stream
+"""
+import asyncio
+import multiprocessing
+import queue
+import resource
+import sys
+import time
+
+from benchmarks.replay import CONNECTORS, Recording, StandInServer, synthesize
+from src import bootstrap
+from src.store import QuoteStore
+
+
+def serve(recording: Recording, speed: float, ports: multiprocessing.Queue) -> None:
+    async def run() -> None:
+        server = await StandInServer(recording, speed).start()
+        ports.put(server.port)
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+async def consume(exchange: str, port: int, frames: int) -> dict:
+    store = QuoteStore()
+    connector = CONNECTORS[exchange](store)
+    server = StandInServer(Recording(exchange, []), port=port)
+    server.configure(connector)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    task = asyncio.create_task(connector.connection())
+    while connector.queue.processed + connector.queue.dropped < frames and not task.done():
+        await asyncio.sleep(0.005)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await bootstrap.close()
+    return {
+        "messages": connector.queue.processed,
+        "ticks": connector.queue.committed + connector.queue.merged,
+        "dropped": connector.queue.dropped,
+        "pairs": len(store.exchange(connector.name)) if connector.name in store else 0,
+        "wall": wall,
+        "cpu": cpu,
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def client(exchange: str, port: int, frames: int, results: multiprocessing.Queue) -> None:
+    results.put(asyncio.run(consume(exchange, port, frames)))
+
+
+def collect(results: multiprocessing.Queue, worker: multiprocessing.Process, timeout: float = 600.0) -> dict:
+    """
+    Result of a client process, raises as soon as it exits without one instead of waiting out the timeout.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            result = results.get(timeout=0.5)
+        except queue.Empty:
+            if not worker.is_alive():
+                raise RuntimeError(f"{worker.name} exited with code {worker.exitcode} without a result")
+            continue
+        worker.join()
+        return result
+    worker.terminate()
+    raise RuntimeError(f"{worker.name} gave no result within {timeout:.0f}s")
+
+
+def bench(recording: Recording, speed: float) -> dict:
+    """
+    Server and connector run in separate processes, so CPU and memory belong to the connector only.
+    """
+    context = multiprocessing.get_context("spawn")
+    ports, results = context.Queue(), context.Queue()
+    server = context.Process(target=serve, args=(recording, speed, ports), daemon=True)
+    server.start()
+    try:
+        port = ports.get(timeout=30)
+        worker = context.Process(target=client, args=(recording.exchange, port, len(recording), results))
+        worker.start()
+        return collect(results, worker)
+    finally:
+        server.terminate()
+
+
+def report(exchange: str, result: dict) -> None:
+    messages = max(result["messages"], 1)
+    print(
+        f"{exchange:<8} {result['messages'] / result['wall']:10,.0f} msg/s   "
+        f"{result['ticks'] / result['wall']:10,.0f} ticks/s   "
+        f"{result['cpu'] / messages * 1e6:8.1f} us CPU/msg   "
+        f"{result['peak_rss_kib'] / 1024:6.1f} MiB peak RSS   "
+        f"pairs: {result['pairs']}  dropped: {result['dropped']}"
+    )
+
+
+def main(args: list[str]) -> None:
+    if args and args[0] == "--recording":
+        recording = Recording.load(args[1])
+        report(recording.exchange, bench(recording, float(args[2]) if len(args) > 2 else 0.0))
+        return
+    frames, pairs = (int(arg) for arg in (args + ["20000", "500"])[:2])
+    speed = float(args[2]) if len(args) > 2 else 0.0
+    print(f"synthetic streams: {frames} frames, {pairs} pairs, speed: {speed or 'max'}")
+    for exchange in CONNECTORS:
+        # !ticker@arr frames carry up to 200 tickers each
+        count = frames // 100 if exchange == "binance" else frames
+        report(exchange, bench(synthesize(exchange, pairs, count), speed))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,142 @@
+"""
+Overhead of the /metrics instrumentation: connector processing stage with and without timings,
+and the /currency/ latency middleware around a real request.
+
+Run: python -m benchmarks.metrics [frames] [batch] [requests]
+"""
+import asyncio
+import gc
+import sys
+import time
+
+from benchmarks.replay import CONNECTORS, synthesize
+from src.app import DB, LATENCY, app
+from src.metrics import ConnectorMetrics, RequestLatency
+from src.store import QuoteStore
+
+
+async def process(exchange: str, frames: list, batch: int, timed: bool) -> float:
+    """
+    Seconds of the processing stage for the frames fed `batch` at a time.
+    """
+    connector = CONNECTORS[exchange](QuoteStore())
+    connector.metrics = ConnectorMetrics() if timed else None
+    # Huobi pings are answered through the socket, the replayed stream keeps them out of the measurement
+    connector.handle_control = lambda data: asyncio.sleep(0, False)
+    queue = connector.queue
+    start = time.perf_counter()
+    async with connector.processing():
+        for i in range(0, len(frames), batch):
+            for frame in frames[i : i + batch]:
+                queue.put(frame)
+            while queue.processed < i + batch and queue.processed < len(frames):
+                await asyncio.sleep(0)
+    return time.perf_counter() - start
+
+
+async def request(asgi, path: str, query: bytes) -> None:
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query,
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        pass
+
+    await asgi(scope, receive, send)
+
+
+async def requests(asgi, query: bytes, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        await request(asgi, "/currency/", query)
+    return (time.perf_counter() - start) / count
+
+
+async def best_of(run, rounds: int = 7) -> tuple[float, float]:
+    """
+    Fastest of interleaved runs without and with instrumentation, so both see the same machine noise.
+    The collector is paused during a run, its pauses are larger than the difference being measured.
+    """
+    results = {False: [], True: []}
+    for _ in range(rounds):
+        for timed in (False, True):
+            gc.collect()
+            gc.disable()
+            try:
+                results[timed].append(await run(timed))
+            finally:
+                gc.enable()
+    return min(results[False]), min(results[True])
+
+
+def batch_cost(rounds: int = 200000) -> float:
+    """
+    Seconds the processing stage spends on instrumentation per batch: four clock reads and three observations.
+    """
+    metrics = ConnectorMetrics()
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(rounds):
+        started = clock()
+        decoded_at = clock()
+        handled_at = clock()
+        metrics.decode.observe((decoded_at - started) / 50, 50)
+        metrics.handle.observe((handled_at - decoded_at) / 50, 50)
+        metrics.commit.observe(clock() - handled_at)
+    return (clock() - start) / rounds
+
+
+async def noop(scope, receive, send) -> None:
+    pass
+
+
+async def main(frames: int, batch: int, count: int) -> None:
+    # end-to-end on/off differences are within run-to-run noise, so the instrumentation is also timed on its own
+    # and reported as a share of the measured processing and request time
+    cost = batch_cost()
+    print(f"processing stage: {frames} frames, batches of {batch}, instrumentation: {cost * 1e9:.0f} ns per batch")
+    for exchange in CONNECTORS:
+        stream = [
+            frame for _, frame in synthesize(exchange, 500, frames // 100 if exchange == "binance" else frames).frames
+        ]
+        plain, timed = await best_of(lambda timed: process(exchange, stream, batch, timed))
+        batches = -(-len(stream) // batch)
+        print(
+            f"{exchange:<8} off: {len(stream) / plain:10,.0f} msg/s   on: {len(stream) / timed:10,.0f} msg/s   "
+            f"instrumentation share: {cost * batches / timed * 100:.2f}%"
+        )
+
+    for i in range(500):
+        DB.update("binance", f"PAIR{i}USDT", "2.0", "1.0")
+    # the app's middleware stack already contains RequestLatency when METRICS_ENABLED, measure it on its own
+    inner = app.router
+    wrapped = RequestLatency(inner, histograms={})
+    print(f"/currency/ latency middleware: {count} requests per query shape")
+    for query in (b"", b"exchange=binance", b"exchange=binance&since=100", b"pair=PAIR1USDT&exchange=binance"):
+        plain, timed = await best_of(lambda timed: requests(wrapped if timed else inner, query, count))
+        bare, measured = await best_of(
+            lambda timed: requests(RequestLatency(noop, {}) if timed else noop, query, count * 10)
+        )
+        print(
+            f"{(query.decode() or 'all'):<34} off: {plain * 1e6:8.1f} us   on: {timed * 1e6:8.1f} us   "
+            f"middleware: {(measured - bare) * 1e6:.2f} us ({(measured - bare) / plain * 100:.1f}%)"
+        )
+    LATENCY.clear()
+
+
+if __name__ == "__main__":
+    arguments = [int(arg) for arg in sys.argv[1:4]]
+    asyncio.run(main(*(arguments + [20000, 50, 2000][len(arguments) :])))
@@ -0,0 +1,427 @@
+"""
+Offline exchange replay: recorded-frame format, synthetic streams and a local stand-in server.
+
+Recording format (JSON Lines, optionally gzip-compressed when the file name ends with .gz):
+    {"exchange": "huobi", "format": 1}                       header, first line
+    {"rest": "pairs", "body": {...}}                         REST bootstrap payloads (optional)
+    {"t": 0.012, "text": "..."}                              text frame, t = seconds since the first frame
+    {"t": 0.015, "binary": "<base64>"}                       binary frame (Huobi gzip)
+
+Record a live stream:   python -m benchmarks.replay record huobi huobi.jsonl.gz 60
+Generate a synthetic one: python -m benchmarks.replay synth kraken kraken.jsonl.gz 500 20000
+"""
+import asyncio
+import base64
+import functools
+import gzip
+import json
+import random
+import sys
+import time
+
+from aiohttp import WSMsgType, web
+
+from markets.binance import BinanceWebSocket
+from markets.huobi import HuobiWebSocket
+from markets.kraken import KrakenWebSocket
+from markets.kucoin import KucoinWebSocket
+from src import bootstrap
+from src.store import QuoteStore
+
+CONNECTORS = {
+    "binance": BinanceWebSocket,
+    "binance_book": functools.partial(BinanceWebSocket, mode="book"),
+    "kraken": KrakenWebSocket,
+    "huobi": HuobiWebSocket,
+    "kucoin": KucoinWebSocket,
+}
+QUOTES = ("USDT", "USD", "EUR", "BTC")
+
+
+class Recording:
+    def __init__(self, exchange: str, frames: list[tuple[float, str | bytes]], rest: dict | None = None):
+        self.exchange = exchange
+        self.frames = frames
+        self.rest = rest or {}
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def save(self, path: str) -> None:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as file:
+            file.write(json.dumps({"exchange": self.exchange, "format": 1}) + "\n")
+            for name, body in self.rest.items():
+                file.write(json.dumps({"rest": name, "body": body}) + "\n")
+            for offset, frame in self.frames:
+                if isinstance(frame, bytes):
+                    line = {"t": round(offset, 6), "binary": base64.b64encode(frame).decode("ascii")}
+                else:
+                    line = {"t": round(offset, 6), "text": frame}
+                file.write(json.dumps(line) + "\n")
+
+    @classmethod
+    def load(cls, path: str) -> "Recording":
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as file:
+            header = json.loads(file.readline())
+            frames, rest = [], {}
+            for line in file:
+                item = json.loads(line)
+                if "rest" in item:
+                    rest[item["rest"]] = item["body"]
+                elif "binary" in item:
+                    frames.append((item["t"], base64.b64decode(item["binary"])))
+                else:
+                    frames.append((item["t"], item["text"]))
+        return cls(header["exchange"], frames, rest)
+
+    def pairs_payload(self) -> dict:
+        """
+        REST symbol catalog for the stand-in server, recorded or derived from the synthetic pairs.
+        """
+        if "pairs" in self.rest:
+            return self.rest["pairs"]
+        pairs = self.rest.get("symbols", [])
+        if self.exchange == "kraken":
+            return {"error": [], "result": {pair.replace("/", ""): {"wsname": pair} for pair in pairs}}
+        if self.exchange == "huobi":
+            return {"status": "ok", "data": [{"symbol": pair, "state": "online"} for pair in pairs]}
+        if self.exchange == "binance_book":
+            return {"symbols": [{"symbol": pair, "status": "TRADING"} for pair in pairs]}
+        return {}
+
+
+############################################################################
+# Synthetic streams
+############################################################################
+def _symbols(count: int) -> list[tuple[str, str]]:
+    return [(f"C{i}", QUOTES[i % len(QUOTES)]) for i in range(count)]
+
+
+def _price(base: float) -> tuple[str, str]:
+    bid = base * random.uniform(0.999, 1.0)
+    ask = bid * random.uniform(1.0001, 1.001)
+    return f"{ask:.8f}", f"{bid:.8f}"
+
+
+def synthesize(exchange: str, pairs: int, frames: int, interval: float = 0.001) -> Recording:
+    """
+    Frames in the wire format of the exchange with random prices, one tick per frame
+    (Binance: one !ticker@arr array of up to 200 tickers per frame, binance_book: one bookTicker message).
+    The first `pairs` frames go through every pair once, the following ones pick a pair at random.
+    """
+    symbols = _symbols(pairs)
+    bases = [random.uniform(0.0001, 50000) for _ in symbols]
+    now = int(time.time() * 1000)
+    result = []
+    for n in range(frames):
+        i = n if n < pairs else random.randrange(pairs)
+        base, quote = symbols[i]
+        ask, bid = _price(bases[i])
+        event_time = now + int(n * interval * 1000)
+        if exchange == "binance":
+            tickers = []
+            for j in random.sample(range(pairs), min(pairs, 200)):
+                ask, bid = _price(bases[j])
+                tickers.append(
+                    {
+                        "e": "24hrTicker",
+                        "E": event_time,
+                        "s": "".join(symbols[j]),
+                        "c": bid,
+                        "b": bid,
+                        "B": "1.00000000",
+                        "a": ask,
+                        "A": "1.00000000",
+                        "v": "1000.00000000",
+                        "q": "50000.00000000",
+                    }
+                )
+            frame = json.dumps(tickers)
+        elif exchange == "binance_book":
+            symbol = base + quote
+            ticker = {"u": n, "s": symbol, "b": bid, "B": "1.00000000", "a": ask, "A": "1.00000000"}
+            frame = json.dumps({"stream": f"{symbol.lower()}@bookTicker", "data": ticker})
+        elif exchange == "kraken":
+            ticker = {"a": [ask, 1, "1.000"], "b": [bid, 1, "1.000"], "c": [bid, "0.1"], "v": ["10", "100"]}
+            frame = json.dumps([i, ticker, "ticker", f"{base}/{quote}"])
+        elif exchange == "huobi":
+            if n % 100 == 0:
+                frame = gzip.compress(json.dumps({"ping": event_time}).encode())
+            else:
+                tick = {"ask": float(ask), "askSize": 1.0, "bid": float(bid), "bidSize": 1.0, "lastPrice": float(bid)}
+                channel = f"market.{base.lower()}{quote.lower()}.ticker"
+                frame = gzip.compress(json.dumps({"ch": channel, "ts": event_time, "tick": tick}).encode())
+        elif exchange == "kucoin":
+            data = {"bestAsk": ask, "bestAskSize": "1", "bestBid": bid, "bestBidSize": "1", "time": event_time}
+            message = {"type": "message", "topic": "/market/ticker:all", "subject": f"{base}-{quote}", "data": data}
+            frame = json.dumps(message)
+        else:
+            raise ValueError(f"Unknown exchange {exchange}")
+        result.append((n * interval, frame))
+    if exchange == "kraken":
+        rest_symbols = [f"{base}/{quote}" for base, quote in symbols]
+    elif exchange == "binance_book":
+        rest_symbols = [base + quote for base, quote in symbols]
+    else:
+        rest_symbols = [f"{base.lower()}{quote.lower()}" for base, quote in symbols]
+    return Recording(exchange, result, {"symbols": rest_symbols})
+
+
+############################################################################
+# Stand-in server
+############################################################################
+class StandInServer:
+    """
+    Local aiohttp server playing an exchange: a websocket that replays a recording at `speed`
+    (0 - as fast as possible, 1 - recorded pace) and the REST bootstrap endpoints the connectors call,
+    answered after `rest_delay` seconds to play a remote API.
+    Huobi subscriptions and Kraken and KuCoin pings are answered like the exchange does. With `route` a Huobi
+    connection is only sent the ticker frames of the channels it is subscribed to (pings go to every connection),
+    replayed once no subscription arrived for `route_quiet` seconds; later subscriptions and unsubscriptions apply to
+    the rest of the replay. A binance_book connection is replayed once its first SUBSCRIBE is answered, as Binance
+    sends nothing on a combined stream without streams.
+    """
+
+    def __init__(
+        self,
+        recording: Recording,
+        speed: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        rest_delay: float = 0.0,
+        route: bool = False,
+        route_quiet: float = 0.05,
+    ):
+        self.recording = recording
+        self.speed = speed
+        self.rest_delay = rest_delay
+        self.route = route
+        self.route_quiet = route_quiet
+        self.host = host
+        self.port = port
+        self.runner: web.AppRunner | None = None
+        self.messages_received = 0
+        self.rest_requests = 0
+        self.frames_sent = 0
+        self.replays_done = 0
+        self._channels: list[str | None] | None = None
+        # {client port: future of the messages sent on the connection, set when its replay is over}
+        self._replays: dict[int, asyncio.Future] = {}
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+
+    async def start(self) -> "StandInServer":
+        app = web.Application()
+        app.router.add_get("/ws", self.websocket)
+        app.router.add_get("/pairs", self.pairs)
+        app.router.add_post("/bullet-public", self.bullet_public)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+        return self
+
+    async def stop(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    async def __aenter__(self) -> "StandInServer":
+        return await self.start()
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    def configure(self, connector) -> None:
+        """
+        Points a connector at this server instead of the exchange, its symbol catalog is not cached on disk.
+        """
+        connector.uri = self.ws_url
+        if hasattr(connector, "pairs_endpoint"):
+            connector.pairs_endpoint = f"{self.url}/pairs"
+            connector.catalog.directory = None
+        if hasattr(connector, "token_endpoint"):
+            connector.token_endpoint = f"{self.url}/bullet-public"
+
+    async def pairs(self, request: web.Request) -> web.Response:
+        self.rest_requests += 1
+        await asyncio.sleep(self.rest_delay)
+        return web.json_response(self.recording.pairs_payload())
+
+    async def bullet_public(self, request: web.Request) -> web.Response:
+        self.rest_requests += 1
+        await asyncio.sleep(self.rest_delay)
+        server = {"endpoint": self.ws_url, "pingInterval": 18000, "pingTimeout": 10000, "protocol": "websocket"}
+        return web.json_response({"code": "200000", "data": {"token": "replay", "instanceServers": [server]}})
+
+    def replayed(self, port: int) -> asyncio.Future:
+        return self._replays.setdefault(port, asyncio.get_running_loop().create_future())
+
+    def watch(self, connector) -> asyncio.Future:
+        """
+        Future set once the replay on the connector's next connection is over and its processing stage has handled
+        every message sent on it until then (frames, acknowledgements, pongs).
+        """
+        done = asyncio.get_running_loop().create_future()
+        queue = connector.queue
+        subscribe, commit = connector.subscribe, connector.commit
+        # frames queued before the connection, plus the messages sent on it once known
+        expected = [queue.processed + len(queue), None]
+
+        def check() -> None:
+            if expected[1] is not None and not done.done() and not queue and queue.processed >= expected[1]:
+                done.set_result(None)
+
+        def replayed(sent: asyncio.Future) -> None:
+            if not sent.cancelled():
+                expected[1] = expected[0] + sent.result()
+                check()
+
+        async def subscribing(websocket, bootstrapped) -> None:
+            self.replayed(websocket.local_address[1]).add_done_callback(replayed)
+            await subscribe(websocket, bootstrapped)
+
+        def committing(latest: dict) -> None:
+            commit(latest)
+            check()
+
+        connector.subscribe, connector.commit = subscribing, committing
+        return done
+
+    def channels(self) -> list[str | None]:
+        """
+        Channel of every Huobi frame, None for pings.
+        """
+        if self._channels is None:
+            self._channels = [json.loads(gzip.decompress(frame)).get("ch") for _, frame in self.recording.frames]
+        return self._channels
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        routed = self.route and self.recording.exchange == "huobi"
+        replayed = self.replayed(request.transport.get_extra_info("peername")[1])
+        # [channels subscribed on this connection, perf_counter() of the latest subscription, messages sent]
+        subscriptions = [set(), 0.0, 0]
+        # keep reading so subscriptions, pongs and protocol pings are consumed while frames are replayed
+        reader = asyncio.create_task(self._read(ws, subscriptions))
+        try:
+            if routed:
+                while not subscriptions[0] or time.perf_counter() - subscriptions[1] < self.route_quiet:
+                    await asyncio.sleep(self.route_quiet / 5)
+            elif self.recording.exchange == "binance_book":
+                while not subscriptions[1]:
+                    await asyncio.sleep(0.005)
+            channels = self.channels() if routed else None
+            subscribed = subscriptions[0]
+            start = time.perf_counter()
+            for i, (offset, frame) in enumerate(self.recording.frames):
+                if channels is not None and channels[i] is not None and channels[i] not in subscribed:
+                    continue
+                if self.speed:
+                    delay = start + offset / self.speed - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                if isinstance(frame, bytes):
+                    await ws.send_bytes(frame)
+                else:
+                    await ws.send_str(frame)
+                self.frames_sent += 1
+                subscriptions[2] += 1
+            self.replays_done += 1
+            replayed.set_result(subscriptions[2])
+            await reader
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            reader.cancel()
+            if not replayed.done():
+                replayed.cancel()
+        return ws
+
+    async def _read(self, ws: web.WebSocketResponse, subscriptions: list) -> None:
+        async for message in ws:
+            if message.type in (WSMsgType.TEXT, WSMsgType.BINARY):
+                self.messages_received += 1
+                if self.recording.exchange == "huobi" and message.type == WSMsgType.TEXT and '"sub"' in message.data:
+                    channel = json.loads(message.data)["sub"]
+                    subscriptions[0].add(channel)
+                    subscriptions[1] = time.perf_counter()
+                    ack = {"id": None, "status": "ok", "subbed": channel, "ts": int(time.time() * 1000)}
+                    await ws.send_bytes(gzip.compress(json.dumps(ack).encode()))
+                    subscriptions[2] += 1
+                elif (
+                    self.recording.exchange == "huobi" and message.type == WSMsgType.TEXT and '"unsub"' in message.data
+                ):
+                    channel = json.loads(message.data)["unsub"]
+                    subscriptions[0].discard(channel)
+                    ack = {"id": None, "status": "ok", "unsubbed": channel, "ts": int(time.time() * 1000)}
+                    await ws.send_bytes(gzip.compress(json.dumps(ack).encode()))
+                    subscriptions[2] += 1
+                elif self.recording.exchange == "binance_book" and '"SUBSCRIBE"' in message.data:
+                    await ws.send_str(json.dumps({"result": None, "id": json.loads(message.data)["id"]}))
+                    subscriptions[1] = time.perf_counter()
+                    subscriptions[2] += 1
+                elif self.recording.exchange == "kraken" and '"ping"' in message.data:
+                    await ws.send_str(json.dumps({"event": "pong", "reqid": json.loads(message.data)["reqid"]}))
+                    subscriptions[2] += 1
+                elif self.recording.exchange == "kucoin" and '"ping"' in message.data:
+                    await ws.send_str(json.dumps({"id": json.loads(message.data)["id"], "type": "pong"}))
+                    subscriptions[2] += 1
+
+
+############################################################################
+# Recorder
+############################################################################
+async def record(exchange: str, path: str, seconds: float) -> None:
+    """
+    Runs the real connector for `seconds` and stores every raw frame it receives plus its REST catalog.
+    """
+    connector = CONNECTORS[exchange](QuoteStore())
+    frames: list[tuple[float, str | bytes]] = []
+    rest = {}
+    start = time.perf_counter()
+
+    put = connector.queue.put
+
+    def tap(frame) -> None:
+        frames.append((time.perf_counter() - start, frame))
+        put(frame)
+
+    connector.queue.put = tap
+    if hasattr(connector, "catalog"):
+        fetch = connector.catalog.fetch
+
+        async def fetch_and_keep(url):
+            rest["pairs"] = await fetch(url)
+            return rest["pairs"]
+
+        connector.catalog.fetch = fetch_and_keep
+        connector.catalog.directory = None
+
+    task = asyncio.create_task(connector.connection())
+    await asyncio.sleep(seconds)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await bootstrap.close()
+    Recording(exchange, frames, rest).save(path)
+    print(f"{exchange}: {len(frames)} frames in {seconds}s -> {path}")
+
+
+if __name__ == "__main__":
+    command, exchange, path, *args = sys.argv[1:]
+    if command == "record":
+        asyncio.run(record(exchange, path, float(args[0]) if args else 60))
+    elif command == "synth":
+        pairs, frames = (int(arg) for arg in (args + ["500", "20000"])[:2])
+        synthesize(exchange, pairs, frames).save(path)
+    else:
+        raise SystemExit(__doc__)
@@ -0,0 +1,99 @@
+"""
+Huobi subscription sharding: time until every symbol is subscribed (confirmed by the server) and aggregate
+messages/sec of the ticker stream, one connection against the symbols spread over N connections.
+The stand-in server runs in its own process and sends every connection only the channels it subscribed to.
+
+Run: python -m benchmarks.sharding [pairs] [frames] [max_shards]
+"""
+import asyncio
+import multiprocessing
+import sys
+import time
+
+from benchmarks.replay import Recording, StandInServer, synthesize
+from markets.huobi import HuobiWebSocket
+from src import bootstrap
+from src.settings import logger
+from src.store import QuoteStore
+
+
+def serve(recording: Recording, ports: multiprocessing.Queue, speed: float = 0.0) -> None:
+    async def run() -> None:
+        server = await StandInServer(recording, speed, route=True).start()
+        ports.put(server.port)
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+async def consume(port: int, shards: int, pairs: int, data_frames: int) -> dict:
+    store = QuoteStore()
+    connectors = HuobiWebSocket.sharded(store, shards)
+    server = StandInServer(Recording("huobi", []), port=port)
+    for connector in connectors:
+        server.configure(connector)
+
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(connector.connection()) for connector in connectors]
+    subscribed = None
+    while subscribed is None:
+        if sum(connector.subscribed for connector in connectors) >= pairs:
+            subscribed = time.perf_counter() - start
+        await asyncio.sleep(0.0005)
+
+    # the server starts replaying once the subscriptions went quiet, rate is taken from the first ticker on
+    def committed() -> int:
+        return sum(connector.queue.committed + connector.queue.merged for connector in connectors)
+
+    while committed() == 0:
+        await asyncio.sleep(0.0005)
+    first, cpu = time.perf_counter(), time.process_time()
+    while committed() < data_frames and not any(task.done() for task in tasks):
+        await asyncio.sleep(0.001)
+    wall, cpu = time.perf_counter() - first, time.process_time() - cpu
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await bootstrap.close()
+    return {"subscribed": subscribed, "messages": committed(), "wall": wall, "cpu": cpu}
+
+
+def client(port: int, shards: int, pairs: int, data_frames: int, results: multiprocessing.Queue) -> None:
+    logger.disable("markets")
+    results.put(asyncio.run(consume(port, shards, pairs, data_frames)))
+
+
+def bench(recording: Recording, shards: int, pairs: int) -> dict:
+    context = multiprocessing.get_context("spawn")
+    ports, results = context.Queue(), context.Queue()
+    server = context.Process(target=serve, args=(recording, ports), daemon=True)
+    server.start()
+    try:
+        port = ports.get(timeout=60)
+        # every 100th synthetic Huobi frame is a ping
+        data_frames = len(recording) - len(recording) // 100
+        worker = context.Process(target=client, args=(port, shards, pairs, data_frames, results))
+        worker.start()
+        result = results.get(timeout=600)
+        worker.join()
+        return result
+    finally:
+        server.terminate()
+
+
+def main(pairs: int = 1500, frames: int = 30000, max_shards: int = 8) -> None:
+    recording = synthesize("huobi", pairs, frames)
+    print(f"{pairs} symbols, {frames} frames")
+    shards = 1
+    while shards <= max_shards:
+        result = bench(recording, shards, pairs)
+        print(
+            f"{shards} connection(s): subscribed in {result['subscribed'] * 1e3:8.1f} ms   "
+            f"{result['messages'] / result['wall']:10,.0f} msg/s   "
+            f"{result['cpu'] / max(result['messages'], 1) * 1e6:6.1f} us CPU/msg"
+        )
+        shards *= 2
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,115 @@
+"""
+Shared-memory quote store: cost of mirroring a write in the ingest process and pair reads/sec
+across 1..N reader processes while a writer process keeps updating.
+
+Run: python -m benchmarks.shared [pairs_per_exchange] [seconds] [max_readers]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+from src.shared import EXCHANGES, SharedQuoteStore, SharedQuoteWriter
+from src.store import QuoteStore
+
+
+def prices(count: int) -> list[tuple[str, str]]:
+    return [(f"{random.uniform(1, 5000):.8f}", f"{random.uniform(1, 5000):.8f}") for _ in range(count)]
+
+
+def write_cost(pairs: int, updates: int = 200000) -> tuple[float, float]:
+    """
+    Seconds per store.update without and with the shared writer attached.
+    """
+    names = [f"PAIR{i}USDT" for i in range(pairs)]
+    ticks = [(EXCHANGES[i % len(EXCHANGES)], names[i % pairs], *price) for i, price in enumerate(prices(updates))]
+    result = []
+    with tempfile.TemporaryDirectory() as directory:
+        for shared in (False, True):
+            store = QuoteStore()
+            writer = SharedQuoteWriter(store, os.path.join(directory, "quotes")) if shared else None
+            update = store.update
+            start = time.perf_counter()
+            for tick in ticks:
+                update(*tick)
+            result.append((time.perf_counter() - start) / updates)
+            if writer is not None:
+                writer.close()
+    return result[0], result[1]
+
+
+def writer(path: str, pairs: int, ready, stop, counts) -> None:
+    store = QuoteStore()
+    SharedQuoteWriter(store, path)
+    names = [f"PAIR{i}USDT" for i in range(pairs)]
+    ticks = prices(10000)
+    for exchange in EXCHANGES:
+        for name in names:
+            store.update(exchange, name, *ticks[0])
+    ready.set()
+    writes = 0
+    while not stop.is_set():
+        for i, (ask, bid) in enumerate(ticks):
+            store.update(EXCHANGES[i % len(EXCHANGES)], names[i % pairs], ask, bid)
+        writes += len(ticks)
+    counts.put(("writes", writes))
+
+
+def reader(path: str, pairs: int, start, seconds: float, counts) -> None:
+    store = SharedQuoteStore(path)
+    tables = [store.exchange(exchange) for exchange in EXCHANGES]
+    names = [f"PAIR{random.randrange(pairs)}USDT" for _ in range(1000)]
+    start.wait()
+    reads = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for i, name in enumerate(names):
+            tables[i % len(tables)].get(name)
+        reads += len(names)
+    counts.put(("reads", reads))
+
+
+def scaling(pairs: int, seconds: float, readers: int) -> tuple[float, float]:
+    context = multiprocessing.get_context("spawn")
+    ready, stop, start, counts = context.Event(), context.Event(), context.Event(), context.Queue()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "quotes")
+        processes = [context.Process(target=writer, args=(path, pairs, ready, stop, counts))]
+        processes[0].start()
+        ready.wait(60)
+        for _ in range(readers):
+            processes.append(context.Process(target=reader, args=(path, pairs, start, seconds, counts)))
+            processes[-1].start()
+        time.sleep(1)
+        start.set()
+        time.sleep(seconds)
+        stop.set()
+        totals = {"reads": 0, "writes": 0}
+        for _ in processes:
+            kind, count = counts.get(timeout=60)
+            totals[kind] += count
+        for process in processes:
+            process.join()
+    return totals["reads"] / seconds, totals["writes"]
+
+
+def main(pairs: int = 2000, seconds: float = 3.0, max_readers: int = 4) -> None:
+    plain, mirrored = write_cost(pairs)
+    print(f"store.update: {plain * 1e6:.2f} us, with the shared writer: {mirrored * 1e6:.2f} us")
+    print(f"{pairs} pairs x {len(EXCHANGES)} exchanges, writer process updating continuously, {os.cpu_count()} CPUs")
+    readers = 1
+    while readers <= max_readers:
+        reads, _ = scaling(pairs, seconds, readers)
+        print(f"{readers} reader(s): {reads:12,.0f} pair reads/s   {reads / readers:12,.0f} per reader")
+        readers *= 2
+
+
+if __name__ == "__main__":
+    arguments = sys.argv[1:4]
+    main(
+        int(arguments[0]) if arguments else 2000,
+        float(arguments[1]) if len(arguments) > 1 else 3.0,
+        int(arguments[2]) if len(arguments) > 2 else 4,
+    )
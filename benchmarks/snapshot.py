@@ -0,0 +1,106 @@
+"""
+Warm-start snapshot cost: time the event loop is blocked while a snapshot is taken, the encode + write time
+in the worker thread, file size and load time, against dumping the store as JSON on the loop.
+
+Run: python -m benchmarks.snapshot [pairs_per_exchange] [rounds]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from src.codec import dumps
+from src.persistence import Snapshotter, capture, encode, load
+from src.store import QuoteStore
+
+EXCHANGES = ("binance", "kraken", "huobi", "kucoin")
+
+
+def filled_store(pairs: int) -> QuoteStore:
+    store = QuoteStore()
+    now = time.time()
+    for exchange in EXCHANGES:
+        for i in range(pairs):
+            price = random.uniform(0.0001, 50000)
+            # Huobi sends numbers, the other exchanges strings
+            ask, bid = (price * 1.001, price) if exchange == "huobi" else (f"{price * 1.001:.8f}", f"{price:.8f}")
+            store.update(exchange, f"PAIR{i}USDT", ask, bid, now - 0.2, now)
+    return store
+
+
+async def loop_stall(save, rounds: int) -> float:
+    """
+    Largest delay of a 1 ms ticker while `save` runs, the time the loop could not serve requests.
+    """
+    worst = 0.0
+    running = True
+
+    async def ticker() -> None:
+        nonlocal worst
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst = max(worst, time.perf_counter() - start - 0.001)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    for _ in range(rounds):
+        await save()
+        await asyncio.sleep(0.005)
+    running = False
+    await task
+    return worst
+
+
+def best(function, rounds: int) -> float:
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+async def main(pairs: int = 2000, rounds: int = 20) -> None:
+    store = filled_store(pairs)
+    quotes = pairs * len(EXCHANGES)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "quotes.snapshot")
+        snapshotter = Snapshotter(store, path)
+
+        async def save() -> None:
+            snapshotter.written_version = -1
+            await snapshotter.save()
+
+        async def save_json() -> None:
+            body = dumps({name: table.as_dict() for name, table in store.exchanges.items()})
+            with open(path + ".json", "wb") as file:
+                file.write(body)
+
+        tables = capture(store)
+        captured = best(lambda: capture(store), rounds)
+        encoded = best(lambda: b"".join(encode(tables, time.time())), rounds)
+        await save()
+        size = os.path.getsize(path)
+        loaded = best(lambda: load(QuoteStore(), path), max(1, rounds // 4))
+
+        async def idle() -> None:
+            pass
+
+        baseline = await loop_stall(idle, rounds)
+        stall = await loop_stall(save, rounds)
+        json_stall = await loop_stall(save_json, rounds)
+
+    print(f"{quotes} quotes, snapshot file: {size / 1024:.0f} KiB ({size / quotes:.0f} B/quote)")
+    print(f"capture on the loop:      {captured * 1e3:8.2f} ms")
+    print(f"encode in the thread:     {encoded * 1e3:8.2f} ms")
+    print(f"load on startup:          {loaded * 1e3:8.2f} ms")
+    print(f"worst loop stall, idle:   {baseline * 1e3:8.2f} ms  (timer and scheduler noise of this machine)")
+    print(f"worst loop stall, binary: {stall * 1e3:8.2f} ms")
+    print(f"worst loop stall, JSON:   {json_stall * 1e3:8.2f} ms  (as_dict + dump on the loop)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:3])))
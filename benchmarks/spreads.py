@@ -0,0 +1,93 @@
+"""
+Best quotes and widest cross-exchange spreads: answered from the SpreadIndex kept at write time against a scan of
+the aggregated view per request, plus the commit cost of keeping the index and the read cost once a spread changed.
+
+Run: python -m benchmarks.spreads [pairs] [frames]
+"""
+import random
+import sys
+import time
+
+from src.spreads import SpreadIndex
+from src.store import QuoteStore
+
+EXCHANGES = ("binance", "kraken", "huobi", "kucoin")
+
+
+def frames(pairs: int, count: int, size: int = 300) -> list[tuple[str, dict]]:
+    names = [f"PAIR{i}USDT" for i in range(pairs)]
+    result = []
+    for n in range(count):
+        frame = {}
+        for pair in random.sample(names, min(size, pairs)):
+            bid = round(random.uniform(100, 101), 2)
+            frame[pair] = (str(round(bid + random.uniform(0.01, 0.5), 2)), str(bid), 0.0, None)
+        result.append((EXCHANGES[n % len(EXCHANGES)], frame))
+    return result
+
+
+def commit(store: QuoteStore, data: list) -> float:
+    update_many = store.update_many
+    start = time.perf_counter()
+    for exchange, frame in data:
+        update_many(exchange, frame)
+    return time.perf_counter() - start
+
+
+def scan_best(store: QuoteStore, pair: str) -> tuple:
+    quotes = store.aggregated()[pair]
+    bid = max(quotes.items(), key=lambda item: float(item[1]["bid"]))
+    ask = min(quotes.items(), key=lambda item: float(item[1]["ask"]))
+    return bid, ask
+
+
+def scan_spreads(store: QuoteStore, top: int) -> list:
+    ranked = []
+    for pair, quotes in store.aggregated().items():
+        if len(quotes) < 2:
+            continue
+        bid = max(float(quote["bid"]) for quote in quotes.values())
+        ask = min(float(quote["ask"]) for quote in quotes.values())
+        ranked.append(((bid - ask) / ((bid + ask) / 2), pair))
+    ranked.sort(reverse=True)
+    return ranked[:top]
+
+
+def timed(call, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(pairs: int = 2000, count: int = 2000) -> None:
+    data = frames(pairs, count)
+    ticks = sum(len(frame) for _, frame in data)
+    print(f"frames: {count} x 300 ticks over {pairs} pairs on {len(EXCHANGES)} exchanges")
+
+    plain = commit(QuoteStore(), data)
+    store = QuoteStore()
+    index = SpreadIndex(store)
+    indexed = commit(store, data)
+    print(f"store only        {ticks / plain:12,.0f} ticks/s")
+    print(f"with the index    {ticks / indexed:12,.0f} ticks/s")
+
+    pair = random.choice(list(index.best))
+    print(f"best, scan        {timed(lambda: scan_best(store, pair), 20):12.1f} us/request")
+    print(f"best, index       {timed(lambda: index.quote(pair), 20000):12.1f} us/request")
+    print(f"top 10, scan      {timed(lambda: scan_spreads(store, 10), 20):12.1f} us/request")
+    print(f"top 10, index     {timed(lambda: index.widest(10), 20000):12.1f} us/request")
+    # a tick between requests widening the spread of a pair, the ranking is sorted again on read
+    exchange, pair = data[0][0], random.choice(list(index.ranked))
+    ticks = iter(range(10**9))
+
+    def tick_and_read() -> list:
+        bid = 200 + next(ticks) * 1e-6
+        store.update(exchange, pair, str(bid + 0.01), str(bid))
+        return index.widest(10)
+
+    print(f"top 10, changed   {timed(tick_and_read, 2000):12.1f} us/request, ranking sorted again")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
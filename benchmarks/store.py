@@ -0,0 +1,127 @@
+"""
+Quote store memory and update throughput: legacy dict-of-dicts DB vs. the column-backed QuoteStore
+with float and fixed-point price columns, written a tick at a time and in 100-tick frames the way connectors commit.
+
+Run: python -m benchmarks.store [pairs_per_exchange] [updates]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+from src.store import QuoteStore
+from src.utils import calculate_average_value
+
+EXCHANGES = ("binance", "kraken", "huobi", "kucoin")
+
+
+def ticks(pairs: int, updates: int) -> list[tuple[str, str, str, str]]:
+    names = [f"PAIR{i}USDT" for i in range(pairs)]
+    return [
+        (
+            EXCHANGES[i % len(EXCHANGES)],
+            names[random.randrange(pairs)],
+            str(round(random.uniform(1, 5000), 2)),
+            str(round(random.uniform(1, 5000), 2)),
+        )
+        for i in range(updates)
+    ]
+
+
+def legacy_update(db: dict, exchange: str, pair: str, ask: str, bid: str) -> None:
+    cache = db.setdefault(exchange, {})
+    cache[pair] = {"ask": ask, "bid": bid, "ask_bid_average": calculate_average_value(bid, ask)}
+
+
+def legacy_layout_bytes(db: dict) -> int:
+    size = sys.getsizeof(db)
+    for cache in db.values():
+        size += sys.getsizeof(cache)
+        for quote in cache.values():
+            size += sys.getsizeof(quote) + sys.getsizeof(quote["ask_bid_average"])
+    return size
+
+
+def store_layout_bytes(store: QuoteStore) -> int:
+    return sys.getsizeof(store.exchanges) + sum(table.nbytes() for table in store.exchanges.values())
+
+
+def frames(data: list, size: int = 100) -> list[tuple[str, dict]]:
+    """
+    Ticks grouped per exchange into frames of `size`, {pair: (ask, bid, event_time, received_at)}.
+    """
+    result, pending = [], {}
+    for exchange, pair, ask, bid in data:
+        frame = pending.setdefault(exchange, {})
+        frame[pair] = (ask, bid, 0.0, None)
+        if len(frame) == size:
+            result.append((exchange, pending.pop(exchange)))
+    result.extend(pending.items())
+    return result
+
+
+def measure(name: str, apply, data: list, layout_bytes, updates: int | None = None) -> None:
+    start = time.perf_counter()
+    apply(data)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    target = apply(data)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    quotes = (
+        sum(len(cache) for cache in target.exchanges.values())
+        if isinstance(target, QuoteStore)
+        else sum(len(cache) for cache in target.values())
+    )
+    # tick strings belong to the decoded frames, both layouts only reference them
+    print(
+        f"{name:<8} {(updates or len(data)) / elapsed:12,.0f} updates/s   "
+        f"quote layout: {layout_bytes(target) / quotes:7.1f} B/quote   "
+        f"retained incl. indexes: {retained / 1024:10,.1f} KiB"
+    )
+
+
+def run_legacy(data: list) -> dict:
+    db = {}
+    for tick in data:
+        legacy_update(db, *tick)
+    return db
+
+
+def run_store(data: list) -> QuoteStore:
+    store = QuoteStore(fixed_point=set())
+    update = store.update
+    for tick in data:
+        update(*tick)
+    return store
+
+
+def run_fixed_store(data: list) -> QuoteStore:
+    store = QuoteStore(fixed_point=set(EXCHANGES))
+    update = store.update
+    for tick in data:
+        update(*tick)
+    return store
+
+
+def run_store_frames(data: list) -> QuoteStore:
+    store = QuoteStore(fixed_point=set())
+    update_many = store.update_many
+    for exchange, frame in data:
+        update_many(exchange, frame)
+    return store
+
+
+def main(pairs: int = 2000, updates: int = 500_000) -> None:
+    data = ticks(pairs, updates)
+    print(f"pairs: {pairs} x {len(EXCHANGES)} exchanges, updates: {updates}")
+    measure("legacy", run_legacy, data, legacy_layout_bytes)
+    measure("columns", run_store, data, store_layout_bytes)
+    measure("fixed", run_fixed_store, data, store_layout_bytes)
+    batched = frames(data)
+    measure("frames", run_store_frames, batched, store_layout_bytes, sum(len(frame) for _, frame in batched))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
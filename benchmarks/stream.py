@@ -0,0 +1,33 @@
+"""
+/stream fan-out cost: store writes per second with many subscribers attached.
+
+Run: python -m benchmarks.stream [subscribers] [updates]
+"""
+import asyncio
+import sys
+import time
+
+from src.store import QuoteStore
+from src.stream import StreamHub, Subscriber
+
+
+async def run(subscribers: int, updates: int) -> None:
+    store = QuoteStore()
+    hub = StreamHub(store)
+    clients = [Subscriber() for _ in range(subscribers)]
+    for i, client in enumerate(clients):
+        # half of the clients follow the whole exchange, the rest a handful of pairs
+        hub.subscribe(client, "binance", None if i % 2 else [f"PAIR{j}USDT" for j in range(i % 50, i % 50 + 5)])
+
+    start = time.perf_counter()
+    for i in range(updates):
+        store.update("binance", f"PAIR{i % 100}USDT", "2.0", "1.0")
+    elapsed = time.perf_counter() - start
+
+    buffered = sum(len(client.pending) for client in clients)
+    print(f"subscribers: {subscribers}  updates: {updates}")
+    print(f"write + fan-out: {elapsed / updates * 1e6:9.2f} us/update   buffered quotes: {buffered}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(*(int(arg) for arg in sys.argv[1:3])) if len(sys.argv) > 2 else run(5000, 20000))
@@ -0,0 +1,55 @@
+"""
+Pair name normalization per tick: the string rewriting the handlers did (replace/upper) against the registry lookup
+of src/symbols.py, on the raw names of the synthetic Kraken, Huobi and KuCoin streams.
+
+Run: python -m benchmarks.symbols [pairs] [lookups]
+"""
+import random
+import sys
+import time
+
+from src.symbols import SymbolRegistry
+
+REWRITES = {
+    "kraken": lambda raw: raw.replace("/", ""),
+    "huobi": lambda raw: raw.replace("market.", "").replace(".ticker", "").upper(),
+    "kucoin": lambda raw: raw.replace("-", ""),
+}
+
+
+def raw_names(exchange: str, pairs: int) -> list[str]:
+    symbols = [(f"C{i}", ("USDT", "USD", "EUR", "BTC")[i % 4]) for i in range(pairs)]
+    if exchange == "kraken":
+        return [f"{base}/{quote}" for base, quote in symbols]
+    if exchange == "huobi":
+        return [f"market.{base.lower()}{quote.lower()}.ticker" for base, quote in symbols]
+    return [f"{base}-{quote}" for base, quote in symbols]
+
+
+def main(pairs: int = 2000, lookups: int = 1_000_000) -> None:
+    registry = SymbolRegistry()
+    for exchange, rewrite in REWRITES.items():
+        names = raw_names(exchange, pairs)
+        channels = registry.channels(exchange)
+        for raw in names:
+            registry.add_symbol(exchange, raw, rewrite(raw))
+        stream = random.choices(names, k=lookups)
+
+        start = time.perf_counter()
+        for raw in stream:
+            rewrite(raw)
+        rewritten = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for raw in stream:
+            channels.get(raw)
+        looked_up = time.perf_counter() - start
+
+        print(
+            f"{exchange:7} rewrite {rewritten / lookups * 1e9:6.0f} ns/tick   "
+            f"registry lookup {looked_up / lookups * 1e9:6.0f} ns/tick"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
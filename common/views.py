@@ -1,5 +1,319 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+import websockets
+
+from src.codec import loads
+from src.exceptions import WebsocketConnectionError, WebsocketMessageSendingError
+from src.heartbeat import Heartbeat
+from src.ingest import DecodePool, IngestQueue
+from src.metrics import ConnectorMetrics
+from src.settings import METRICS_ENABLED, logger
+from src.store import QuoteStore
+from src.symbols import registry
+
+
 class BaseWebSocketMixin:
-    def __init__(self, name: str, db: dict, uri):
+    """
+    Connector runtime shared by every exchange. An exchange class only fills in the hooks:
+        endpoint()      websocket URI, for exchanges that hand one out per connection
+        bootstrap()     REST data the subscriptions need (a symbol catalog), fetched while the handshake runs
+        subscribe()     subscription requests, sent while the connection already receives
+        decode()        raw frame -> data, run on the loop or in self.decoder
+        handle_control() service messages (pings, pongs, acknowledgements)
+        extract_ticks() (pair, ask, bid, event_time) of a data frame
+    The runtime connects, receives into the ingest queue, runs the heartbeat, and batches, merges and commits the
+    ticks to the store; the supervisor restarts connection() with backoff.
+    """
+
+    # keyword arguments of websockets.connect()
+    connect_options: dict = {}
+
+    def __init__(self, name: str, db: QuoteStore, uri):
         self.name = name
+        # supervisor and metrics key, differs from the exchange name for the connections of a sharded exchange
+        self.label = name
+        # {raw symbol or channel: canonical pair} of the exchange, shared with its other connections (src/symbols.py)
+        self.symbols = registry.channels(name)
         self.uri = uri
-        self.db = db
\ No newline at end of file
+        self.db = db
+        # time.monotonic() of the last frame received, watched by the supervisor for stalled feeds
+        self.last_message_at = 0.0
+        self.queue = IngestQueue(control=self.control_frame)
+        # processing stage timings for /metrics, None when disabled
+        self.metrics = ConnectorMetrics() if METRICS_ENABLED else None
+        # keepalive of the live connection, run by processing() next to the receive loop
+        self.heartbeat = Heartbeat()
+        # frames are decoded in this pool instead of on the event loop when set
+        self.decoder: DecodePool | None = None
+        # demand mode (src/demand.py): store names of the pairs subscribed on connect, None subscribes the whole catalog
+        self.wanted: set[str] | None = None
+        # the live connection, demand-mode subscriptions are sent on it
+        self.websocket = None
+        # (catalog list, {store name: catalog symbol}) of the last symbols_of() call
+        self._symbols: tuple[list, dict[str, str]] | None = None
+
+    ############################################################################
+    # Connection
+    ############################################################################
+    async def endpoint(self) -> str:
+        return self.uri
+
+    async def bootstrap(self) -> Any:
+        return None
+
+    async def subscribe(self, websocket: websockets.WebSocketClientProtocol, bootstrapped: Any) -> None:
+        pass
+
+    def refused(self) -> None:
+        """
+        Called when the server refused the websocket handshake.
+        """
+
+    async def connection(self) -> None:
+        uri = await self.endpoint()
+        # the bootstrap data (cached or requested) is fetched while the websocket handshake runs
+        bootstrapping = asyncio.create_task(self.bootstrap())
+        try:
+            options = self.connect_options
+            if self.heartbeat.protocol_pings:
+                # the heartbeat sends the protocol pings, the library's own ping loop would double them
+                options = {"ping_interval": None, **options}
+            async with websockets.connect(uri, **options) as websocket:
+                logger.info(f"Websocket Connection to {self.label} successful")
+                bootstrapped = await bootstrapping
+                self.websocket = websocket
+                async with self.processing(websocket):
+                    # data flows (and pings are answered) while the subscriptions are still being sent
+                    receiving = asyncio.create_task(self.receive(websocket))
+                    subscribing = asyncio.create_task(self.subscribe(websocket, bootstrapped))
+                    try:
+                        done, _ = await asyncio.wait({receiving, subscribing}, return_when=asyncio.FIRST_EXCEPTION)
+                        for task in done:
+                            task.result()
+                        await receiving
+                    except WebsocketMessageSendingError as e:
+                        logger.error(str(e))
+                        raise e
+                    finally:
+                        for task in (receiving, subscribing):
+                            task.cancel()
+                        await asyncio.gather(receiving, subscribing, return_exceptions=True)
+        except websockets.InvalidHandshake:
+            self.refused()
+            raise
+        except WebsocketConnectionError as e:
+            logger.critical(str(e))
+            raise e
+        finally:
+            self.websocket = None
+            bootstrapping.cancel()
+            await asyncio.gather(bootstrapping, return_exceptions=True)
+
+    async def receive(self, websocket: websockets.WebSocketClientProtocol) -> None:
+        # the socket loop only queues raw frames, decoding is left to the processing stage
+        recv = websocket.recv
+        put = self.queue.put
+        clock = time.monotonic
+        while True:
+            try:
+                frame = await recv()
+            except Exception as e:
+                logger.error(f"Error while receiving {self.label} WebSocket data: {e}")
+                raise e
+            self.last_message_at = clock()
+            put(frame)
+
+    ############################################################################
+    # Frames
+    ############################################################################
+    def decode(self, frame) -> Any:
+        return loads(frame)
+
+    def control_frame(self, frame) -> bool:
+        """
+        True for a raw frame the keepalive depends on (a server ping, a pong), kept by the queue when it overflows.
+        """
+        return False
+
+    def register(self, raw: str) -> str:
+        """
+        Canonical pair of a raw symbol or channel met for the first time, registered for the next lookups.
+        """
+        raise NotImplementedError
+
+    def pair_of(self, raw: str) -> str:
+        return self.symbols.get(raw) or self.register(raw)
+
+    def close(self) -> None:
+        if self.decoder is not None:
+            self.decoder.close()
+
+    ############################################################################
+    # Demand mode, for connectors subscribing per symbol from a catalog
+    ############################################################################
+    def pair_name(self, symbol: str) -> str:
+        """
+        Store name of a catalog symbol, the pair extract_ticks reports its quotes under.
+        """
+        return self.pair_of(symbol)
+
+    def owns(self, symbol: str) -> bool:
+        # the connections of a sharded exchange each subscribe a part of the catalog
+        return True
+
+    async def subscribe_symbols(self, websocket, symbols: list[str]) -> None:
+        raise NotImplementedError
+
+    async def unsubscribe_symbols(self, websocket, symbols: list[str]) -> None:
+        raise NotImplementedError
+
+    def demanded(self, symbols: list[str]) -> list[str]:
+        """
+        The catalog symbols this connector subscribes on connect, the canonical pair of every symbol is registered.
+        """
+        wanted = self.wanted
+        subscribed = []
+        for symbol in symbols:
+            pair = self.pair_name(symbol)
+            if self.owns(symbol) and (wanted is None or pair in wanted):
+                subscribed.append(symbol)
+        return subscribed
+
+    async def symbols_of(self, pairs) -> list[str]:
+        """
+        Catalog symbols of this connector for the given store names, unknown pairs are left out.
+        """
+        items = await self.catalog.get(self.pairs_endpoint)
+        if self._symbols is None or self._symbols[0] is not items:
+            self._symbols = items, {self.pair_name(symbol): symbol for symbol in items}
+        index = self._symbols[1]
+        return [index[pair] for pair in pairs if pair in index and self.owns(index[pair])]
+
+    async def want(self, pairs) -> list[str]:
+        """
+        Adds pairs to the demand-mode subscriptions, subscribed at once when connected.
+        Returns the pairs this connector serves.
+        """
+        symbols = await self.symbols_of(pairs)
+        added = [symbol for symbol in symbols if self.pair_name(symbol) not in self.wanted]
+        self.wanted.update(map(self.pair_name, symbols))
+        if added and self.websocket is not None:
+            await self.subscribe_symbols(self.websocket, added)
+        return [self.pair_name(symbol) for symbol in symbols]
+
+    async def unwant(self, pairs) -> None:
+        symbols = [symbol for symbol in await self.symbols_of(pairs) if self.pair_name(symbol) in self.wanted]
+        self.wanted.difference_update(map(self.pair_name, symbols))
+        if symbols and self.websocket is not None:
+            await self.unsubscribe_symbols(self.websocket, symbols)
+
+    def extract_ticks(self, data) -> list[tuple[str, Any, Any, float]]:
+        """
+        (pair, ask, bid, event_time) of every ticker in a decoded frame, empty for service messages.
+        event_time is the exchange timestamp in unix seconds, 0.0 when the feed has none.
+        """
+        raise NotImplementedError
+
+    async def handle_control(self, data) -> bool:
+        """
+        Answers service messages that need a reply (pings), True when the frame was one.
+        """
+        return False
+
+    async def handler_data(self, data) -> None:
+        """
+        Direct path without the ingest queue: commits the tickers of a decoded frame as one store update,
+        a bad one raises once the others are written.
+        """
+        quotes = {pair: (ask, bid, event_time, None) for pair, ask, bid, event_time in self.extract_ticks(data)}
+        for pair, e in self.db.update_many(self.name, quotes):
+            logger.error(f"Error calculating average price for ticker {pair}: {e}  {self.name}")
+            raise e
+
+    @asynccontextmanager
+    async def processing(self, websocket=None) -> AsyncIterator[None]:
+        """
+        Runs the processing stage while the socket loop only puts raw frames into self.queue,
+        and the heartbeat of the given connection.
+        """
+        tasks = [asyncio.create_task(self.process(), name=f"process-{self.label}")]
+        if websocket is not None:
+            tasks.append(asyncio.create_task(self.heartbeat.run(websocket), name=f"heartbeat-{self.label}"))
+        try:
+            yield
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def process(self) -> None:
+        queue = self.queue
+        clock = time.perf_counter
+        while True:
+            frames = await queue.get_batch()
+            # timings are taken per batch and recorded as per-frame averages, a few clock reads per batch
+            started = clock()
+            decoded = []
+            if self.decoder is None:
+                for frame, received_at in frames:
+                    queue.processed += 1
+                    try:
+                        decoded.append((self.decode(frame), received_at))
+                    except Exception as e:
+                        queue.errors += 1
+                        logger.error(f"Error while processing {self.name} frame: {e}")
+            else:
+                # the loop serves other tasks meanwhile, a frame that failed comes back as its exception
+                results = await self.decoder.decode([frame for frame, _ in frames])
+                for data, (_, received_at) in zip(results, frames):
+                    queue.processed += 1
+                    if isinstance(data, Exception):
+                        queue.errors += 1
+                        logger.error(f"Error while processing {self.name} frame: {data}")
+                    else:
+                        decoded.append((data, received_at))
+            decoded_at = clock()
+            # merge the batch down to the latest quote per symbol before touching the store,
+            # re-inserting a merged symbol keeps the commit order equal to the receive order
+            latest = {}
+            for data, received_at in decoded:
+                try:
+                    if await self.handle_control(data):
+                        continue
+                    ticks = self.extract_ticks(data)
+                except Exception as e:
+                    queue.errors += 1
+                    logger.error(f"Error while processing {self.name} frame: {e}")
+                    continue
+                for pair, ask, bid, event_time in ticks:
+                    if pair in latest:
+                        queue.merged += 1
+                        del latest[pair]
+                    latest[pair] = (ask, bid, event_time, received_at)
+            handled_at = clock()
+            self.commit(latest)
+            metrics = self.metrics
+            if metrics is not None:
+                count = len(frames)
+                metrics.decode.observe((decoded_at - started) / count, count)
+                metrics.handle.observe((handled_at - decoded_at) / count, count)
+                metrics.commit.observe(clock() - handled_at)
+
+    def commit(self, latest: dict) -> None:
+        # the merged batch goes into the store as one frame, a quote that does not parse is counted and left out
+        rejected = self.db.update_many(self.name, latest)
+        queue = self.queue
+        queue.committed += len(latest) - len(rejected)
+        queue.errors += len(rejected)
+        for pair, e in rejected:
+            logger.error(f"Error calculating average price for ticker {pair}: {e}  {self.name}")
+        lag = self.metrics.lag if self.metrics is not None else None
+        if lag is not None:
+            failed = {pair for pair, _ in rejected}
+            now = time.time()
+            for pair, (_, _, event_time, _) in latest.items():
+                if event_time and pair not in failed:
+                    lag.add(now - event_time)
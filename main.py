@@ -1,8 +1,24 @@
+import os
+
 import uvicorn
-from src.app import app
+
+from src import ingestor, shared
+from src.settings import API_WORKERS, SHARED_STORE_PATH
 
 if __name__ == "__main__":
     try:
-        uvicorn.run(app, host="0.0.0.0", port=5000, log_level="info")
+        if API_WORKERS > 1:
+            # one process runs the exchange connectors, the API workers read its shared quote file
+            ingest = ingestor.start(SHARED_STORE_PATH)
+            os.environ["SHARED_STORE_READER"] = "1"
+            try:
+                uvicorn.run("src.app:app", host="0.0.0.0", port=5000, log_level="info", workers=API_WORKERS)
+            finally:
+                ingestor.stop(ingest)
+                shared.remove(SHARED_STORE_PATH)
+        else:
+            from src.app import app
+
+            uvicorn.run(app, host="0.0.0.0", port=5000, log_level="info")
     except Exception as e:
         print(e)
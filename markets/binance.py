@@ -1,51 +1,119 @@
-import json
+import asyncio
+import zlib
 
 import websockets
 
 from common.views import BaseWebSocketMixin
-from src.exceptions import WebsocketConnectionError
+from src.bootstrap import Catalog
+from src.codec import dumps_str
+from src.exceptions import WebsocketMessageSendingError
 from src.settings import MARKETS, logger
-from src.utils import calculate_average_value
+from src.store import QuoteStore
+from src.symbols import registry
 
 
 class BinanceWebSocket(BaseWebSocketMixin):
-    def __init__(self, db: dict):
-        super().__init__(name=MARKETS["Binance"]["name"], uri=MARKETS["Binance"]["endpoint"], db=db)
+    def __init__(
+        self,
+        db: QuoteStore,
+        mode: str = MARKETS["Binance"]["mode"],
+        shard: int = 0,
+        shards: int = 1,
+        catalog: Catalog | None = None,
+    ):
+        if mode not in ("ticker", "book"):
+            raise ValueError(f"Unknown Binance mode {mode!r}, choose ticker or book")
+        endpoint = MARKETS["Binance"]["endpoint" if mode == "ticker" else "book_endpoint"]
+        super().__init__(name=MARKETS["Binance"]["name"], uri=endpoint, db=db)
+        self.mode = mode
+        self.shard = shard
+        self.shards = shards
+        if shards > 1:
+            self.label = f"{self.name}-{shard}"
+        if mode == "book":
+            self.pairs_endpoint = MARKETS["Binance"]["pairs_endpoint"]
+            self.catalog = catalog or Catalog(self.name, self.parse_symbols)
+            self.extract_ticks = self.extract_book_ticks
+            # permessage-deflate costs more CPU than it saves on ~150 byte messages
+            self.connect_options = {"compression": None}
+            self.handle_control = self.handle_book_control
+        # book mode: SUBSCRIBE requests sent on the current connection and confirmed by the server so far
+        self.subscriptions = 0
+        self.subscribed = 0
 
     """
-    Binance has !ticker@arr endpoint which response for all current pairs with have updates. 
+    Binance has !ticker@arr endpoint which response for all current pairs with have updates.
     No need request any pairs before or subscribe for all pairs one by one.
+    The book mode subscribes to the <symbol>@bookTicker stream of every trading symbol instead: a message per change
+    of the best bid/ask without the 24h statistics, sent as it happens rather than once a second. The symbols are
+    spread over `book_connections` combined-stream connections (see sharded()) within Binance's limits of streams per
+    connection and of SUBSCRIBE requests per second.
     """
 
-    # method for establishing the WebSocket connection.
-    async def connection(self) -> None:
-        try:
-            async with websockets.connect(self.uri) as websocket:
-                logger.info("Websocket Connection to BinanceAPI successful")
-                while True:
-                    try:
-                        # Receive WebSocket data from the connection.
-                        response = await websocket.recv()
-                        await self.handler_data(json.loads(response))
-                    except Exception as error:
-                        logger.error(f"Error while processing WebSocket data: {error}")
-                        raise error
-        except WebsocketConnectionError as e:
-            logger.critical(str(e))
-            raise e
-
-    # handling WebSocket data
-    async def handler_data(self, data: list[dict]) -> None:
-        cache = self.db.setdefault(self.name, {})
-        for ticker in data:
+    @classmethod
+    def sharded(cls, db: QuoteStore, mode: str = MARKETS["Binance"]["mode"]) -> list["BinanceWebSocket"]:
+        if mode != "book":
+            return [cls(db, mode)]
+        shards = MARKETS["Binance"]["book_connections"]
+        catalog = Catalog(MARKETS["Binance"]["name"], cls.parse_symbols)
+        return [cls(db, mode, shard, shards, catalog) for shard in range(shards)]
+
+    @staticmethod
+    def parse_symbols(data: dict) -> list:
+        return [symbol["symbol"] for symbol in data["symbols"] if symbol["status"] == "TRADING"]
+
+    def owns(self, symbol: str) -> bool:
+        return self.shards == 1 or zlib.crc32(symbol.encode()) % self.shards == self.shard
+
+    async def bootstrap(self) -> list | None:
+        # !ticker@arr needs no symbol list
+        return await self.catalog.get(self.pairs_endpoint) if self.mode == "book" else None
+
+    async def subscribe(self, websocket: websockets.WebSocketClientProtocol, symbols: list | None) -> None:
+        if symbols is None:
+            return
+        owned = self.demanded(symbols)
+        limit = MARKETS["Binance"]["streams_per_connection"]
+        if len(owned) > limit:
+            logger.error(f"[{self.label}] {len(owned)} symbols, only the first {limit} are subscribed")
+            owned = owned[:limit]
+        await self.subscribe_streams(websocket, owned)
+
+    async def subscribe_streams(self, websocket: websockets.WebSocketClientProtocol, symbols: list) -> None:
+        streams = [f"{symbol.lower()}@bookTicker" for symbol in symbols]
+        self.subscriptions, self.subscribed = 0, 0
+        batch = MARKETS["Binance"]["subscribe_batch"]
+        interval = 1 / MARKETS["Binance"]["subscribe_rate"]
+        for request_id, start in enumerate(range(0, len(streams), batch), 1):
+            if request_id > 1:
+                await asyncio.sleep(interval)
+            message = {"method": "SUBSCRIBE", "params": streams[start : start + batch], "id": request_id}
             try:
-                # Calculate the average price from the 'ask' and 'bid' values in the ticker data.
-                average_price = calculate_average_value(ticker["b"], ticker["a"])
-            except (ValueError, TypeError) as e:
-                logger.error(f"Error calculating average price for ticker {ticker['s']}: {e}")
-                raise e
-            cache[ticker["s"]] = {
-                "ask": ticker["a"],
-                "bid": ticker["b"],
-                "ask_bid_average": average_price,
-            }
+                await websocket.send(dumps_str(message))
+            except Exception as e:
+                raise WebsocketMessageSendingError(e, msg=f"Subscription request {request_id} failed. ")
+            self.subscriptions += 1
+
+    async def handle_book_control(self, data: dict) -> bool:
+        # {"result": null, "id": 1} confirms a SUBSCRIBE request
+        if "result" in data:
+            self.subscribed += 1
+            return True
+        return False
+
+    def extract_ticks(self, data: list[dict]) -> list[tuple]:
+        symbols, register = self.symbols, self.register
+        return [
+            (symbols.get(ticker["s"]) or register(ticker["s"]), ticker["a"], ticker["b"], ticker.get("E", 0) / 1000)
+            for ticker in data
+        ]
+
+    def extract_book_ticks(self, data: dict) -> list[tuple]:
+        # {"stream": "bnbusdt@bookTicker", "data": {"u": 400900217, "s": "BNBUSDT", "b": "25.35", "a": "25.36", ...}}
+        # bookTicker carries no event time
+        ticker = data["data"]
+        symbol = ticker["s"]
+        return [(self.symbols.get(symbol) or self.register(symbol), ticker["a"], ticker["b"], 0.0)]
+
+    def register(self, raw: str) -> str:
+        return registry.add_symbol(self.name, raw, raw)
@@ -1,14 +1,23 @@
 import asyncio
 import gzip
-import json
+import zlib
 
-import aiohttp
 import websockets
 
 from common.views import BaseWebSocketMixin
-from src.exceptions import WebsocketConnectionError, WebsocketMessageSendingError
+from src.bootstrap import Catalog
+from src.codec import dumps_str, loads
+from src.exceptions import WebsocketMessageSendingError
+from src.heartbeat import Heartbeat
+from src.ingest import DecodePool
 from src.settings import MARKETS, logger
-from src.utils import calculate_average_value
+from src.store import QuoteStore
+from src.symbols import registry
+
+
+def decode_frame(frame: bytes) -> dict:
+    # every Huobi frame is gzip-compressed, both codecs parse utf-8 bytes directly
+    return loads(gzip.decompress(frame))
 
 
 class HuobiWebSocket(BaseWebSocketMixin):
@@ -16,84 +25,133 @@ class HuobiWebSocket(BaseWebSocketMixin):
     Huobi WebSocket requires REST API request for symbols.
     Huobi haven't connection to all trading pairs or ticker, which response with trading symbols for
     Websocket Market Data subscribe.
-    We Need to create a subscription request for each trading pair
+    We Need to create a subscription request for each trading pair.
+    With shards > 1 the symbols are spread over that many connections (see sharded()), each one is a connector of
+    its own for the supervisor and subscribes only to the symbols whose hash falls on its shard.
     """
 
-    def __init__(self, db: dict):
+    def __init__(
+        self,
+        db: QuoteStore,
+        shard: int = 0,
+        shards: int = 1,
+        catalog: Catalog | None = None,
+        decoder: DecodePool | None = None,
+    ):
         super().__init__(name=MARKETS["Huobi"]["name"], uri=MARKETS["Huobi"]["endpoint"], db=db)
+        self.pairs_endpoint = MARKETS["Huobi"]["pairs_endpoint"]
+        self.shard = shard
+        self.shards = shards
+        if shards > 1:
+            self.label = f"{self.name}-{shard}"
+        self.catalog = catalog or Catalog(self.name, self.parse_symbols)
+        pool = MARKETS["Huobi"]["decode_pool"]
+        self.decoder = decoder or (DecodePool(decode_frame, pool) if pool else None)
+        # the server pings every 5 seconds, a connection without pings is closed
+        self.heartbeat = Heartbeat(server_pings=True)
+        # subscriptions sent on the current connection and confirmed by the server so far
+        self.subscriptions = 0
+        self.subscribed = 0
+
+    @classmethod
+    def sharded(cls, db: QuoteStore, shards: int = MARKETS["Huobi"]["shards"]) -> list["HuobiWebSocket"]:
+        # the connections share one symbol catalog (a cold start makes one request) and one decode pool
+        catalog = Catalog(MARKETS["Huobi"]["name"], cls.parse_symbols)
+        pool = MARKETS["Huobi"]["decode_pool"]
+        decoder = DecodePool(decode_frame, pool) if pool else None
+        return [cls(db, shard, shards, catalog, decoder) for shard in range(shards)]
+
+    def owns(self, symbol: str) -> bool:
+        return self.shards == 1 or zlib.crc32(symbol.encode()) % self.shards == self.shard
 
     @staticmethod
-    async def fetch(session: aiohttp.ClientSession, url: str) -> dict:
-        async with session.get(url) as response:
-            return await response.json()
+    def parse_symbols(data: dict) -> list:
+        # only online symbols can be subscribed
+        return [asset["symbol"] for asset in data["data"] if asset["state"] == "online"]
 
-    async def fetch_huobi_assets(self) -> tuple:
-        url = MARKETS["Huobi"]["pairs_endpoint"]
-        tasks = []
+    async def fetch_huobi_assets(self) -> list:
         try:
-            async with aiohttp.ClientSession() as session:
-                tasks.append(self.fetch(session, url))
-                data = await asyncio.gather(*tasks)
-                return data
+            return await self.catalog.get(self.pairs_endpoint)
         except Exception as e:
-            logger.error("Error while fetching assets for Huobi", str(e))
-
-    # method for establishing the WebSocket connection.
-    async def connection(self) -> None:
-        try:
-            async with websockets.connect(self.uri) as websocket:
-                logger.info("Websocket Connection to HuobiAPI successful")
-                try:
-                    await self.send_websocket_message(websocket)
-                except WebsocketMessageSendingError as e:
-                    logger.error(str(e))
-                    return await self.connection()
-                while True:
-                    try:
-                        response = await websocket.recv()
-                        decoded_response = gzip.decompress(response).decode("utf-8")
-                    except Exception as e:
-                        logger.error("Error while decoding response from HuobiAPI", str(e))
-                        raise e
-                    try:
-                        await self.handler_data(websocket, json.loads(decoded_response))
-                    except Exception as e:
-                        logger.error(f"Error while processing WebSocket data: {e}")
-                        raise e
-        except WebsocketConnectionError as e:
-            logger.critical(str(e))
+            logger.error(f"Error while fetching assets for Huobi: {e}")
             raise e
 
-    # send list of assets to websocket
-    async def send_websocket_message(self, websocket: websockets.WebSocketClientProtocol) -> None:
-        assets_list = await self.fetch_huobi_assets()
-        for element in assets_list:
-            for asset in element["data"]:
-                if asset["state"] == "online":
-                    try:
-                        subscribe = {"sub": f"market.{asset['symbol']}.ticker"}
-                        await websocket.send(json.dumps(subscribe))
-                    except Exception as e:
-                        raise e
+    async def bootstrap(self) -> list:
+        return await self.fetch_huobi_assets()
 
-    async def handler_data(self, websocket: websockets.WebSocketClientProtocol, data: dict) -> None:
-        cache = self.db.setdefault(self.name, {})
-        if "ping" in data:
+    async def subscribe(self, websocket: websockets.WebSocketClientProtocol, symbols: list) -> None:
+        self.subscriptions, self.subscribed = 0, 0
+        await self.send_websocket_message(websocket, self.demanded(symbols))
+
+    # send list of assets to websocket
+    async def send_websocket_message(self, websocket: websockets.WebSocketClientProtocol, symbols: list) -> None:
+        # requests are encoded up front and sent back to back without waiting for their confirmations,
+        # the receive loop gets a turn after every batch
+        messages = [dumps_str({"sub": f"market.{symbol}.ticker"}) for symbol in symbols]
+        self.subscriptions += len(messages)
+        batch = MARKETS["Huobi"]["subscribe_batch"]
+        for i, message in enumerate(messages, 1):
             try:
-                await websocket.send(json.dumps({"pong": data["ping"]}))
+                await websocket.send(message)
             except Exception as e:
-                logger.error(str(e))
-                raise e
+                raise WebsocketMessageSendingError(e, msg=f"Subscription {i} of {len(messages)} failed. ")
+            if i % batch == 0:
+                await asyncio.sleep(0)
+
+    subscribe_symbols = send_websocket_message
 
-        elif "ch" in data:
-            name = data["ch"].replace("market.", "").replace(".ticker", "").upper()
+    async def unsubscribe_symbols(self, websocket: websockets.WebSocketClientProtocol, symbols: list[str]) -> None:
+        for symbol in symbols:
             try:
-                average = calculate_average_value(data["tick"]["ask"], data["tick"]["bid"])
-            except (ValueError, TypeError, KeyError) as e:
-                logger.error(f"Error calculating average price for ticker {name}: {e}  Huobi")
-                raise e
-            cache[name] = {
-                "ask": data["tick"]["ask"],
-                "bid": data["tick"]["bid"],
-                "ask_bid_average": average,
-            }
+                await websocket.send(dumps_str({"unsub": f"market.{symbol}.ticker"}))
+            except Exception as e:
+                raise WebsocketMessageSendingError(e, msg=f"Unsubscribing {symbol} failed. ")
+
+    def pair_name(self, symbol: str) -> str:
+        return self.pair_of(f"market.{symbol}.ticker")
+
+    def register(self, raw: str) -> str:
+        # ticker channels are market.btcusdt.ticker
+        return registry.add_symbol(self.name, raw, raw.removeprefix("market.").removesuffix(".ticker"))
+
+    def decode(self, frame: bytes) -> dict:
+        return decode_frame(frame)
+
+    @staticmethod
+    def control_frame(frame: bytes) -> bool:
+        # pings are only answered once decoded, a dropped one gets the connection closed by the server
+        return b'"ch"' not in gzip.decompress(frame)
+
+    async def handle_control(self, data: dict) -> bool:
+        # answered on the event loop as soon as the batch holding the ping is decoded, also with a decode pool
+        if "ping" in data:
+            await self.pong(self.websocket, data)
+            self.heartbeat.server_ping()
+            return True
+        if "subbed" in data:
+            self.subscribed += 1
+            return True
+        if "unsubbed" in data:
+            return True
+        return False
+
+    @staticmethod
+    async def pong(websocket: websockets.WebSocketClientProtocol, data: dict) -> None:
+        try:
+            await websocket.send(dumps_str({"pong": data["ping"]}))
+        except Exception as e:
+            logger.error(str(e))
+            raise e
+
+    def extract_ticks(self, data: dict) -> list[tuple]:
+        if "ch" in data:
+            channel = data["ch"]
+            name = self.symbols.get(channel) or self.register(channel)
+            return [(name, data["tick"]["ask"], data["tick"]["bid"], data.get("ts", 0) / 1000)]
+        return []
+
+    async def handler_data(self, websocket: websockets.WebSocketClientProtocol, data: dict) -> None:
+        if "ping" in data:
+            await self.pong(websocket, data)
+        else:
+            await super().handler_data(data)
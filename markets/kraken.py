@@ -1,13 +1,12 @@
-import asyncio
-import json
-
-import aiohttp
 import websockets
 
 from common.views import BaseWebSocketMixin
-from src.exceptions import WebsocketConnectionError, WebsocketMessageSendingError
+from src.bootstrap import Catalog
+from src.codec import dumps_str
+from src.heartbeat import Heartbeat
 from src.settings import MARKETS, logger
-from src.utils import calculate_average_value
+from src.store import QuoteStore
+from src.symbols import registry
 
 
 class KrakenWebSocket(BaseWebSocketMixin):
@@ -17,67 +16,75 @@ class KrakenWebSocket(BaseWebSocketMixin):
     we collect primary information about all assets
     """
 
-    def __init__(self, db):
+    def __init__(self, db: QuoteStore):
         super().__init__(name=MARKETS["Kraken"]["name"], uri=MARKETS["Kraken"]["endpoint"], db=db)
+        self.pairs_endpoint = MARKETS["Kraken"]["pairs_endpoint"]
+        self.catalog = Catalog(self.name, self.parse_pairs)
+        self.heartbeat = Heartbeat(message=self.ping_message)
 
     @staticmethod
-    async def fetch(session: aiohttp.ClientSession, url: str) -> dict:
-        async with session.get(url) as response:
-            return await response.json()
+    def parse_pairs(data: dict) -> list:
+        return [pair["wsname"] for pair in data["result"].values()]
 
     async def fetch_kraken_pairs(self) -> list:
-        url = MARKETS["Kraken"]["pairs_endpoint"]
-        tasks = []
         try:
-            async with aiohttp.ClientSession() as session:
-                tasks.append(self.fetch(session, url))
-                data = await asyncio.gather(*tasks)
-                pairs = data[0]["result"]
-                assets = [pairs[pair]["wsname"] for pair in pairs]
-                return assets
+            return await self.catalog.get(self.pairs_endpoint)
         except Exception as e:
-            logger.error("Error while fetching assets for Kraken", str(e))
-
-    async def connection(self) -> None:
-        try:
-            async with websockets.connect(self.uri) as websocket:
-                logger.info("Websocket Connection to KrakenAPI successful")
-                try:
-                    await self.send_websocket_message(websocket)
-                except WebsocketMessageSendingError as e:
-                    logger.error(str(e))
-                    return await self.connection()
-                while True:
-                    try:
-                        response = await websocket.recv()
-                        await self.handler_data(json.loads(response))
-                    except Exception as e:
-                        logger.error(f"Error while processing WebSocket data: {e}")
-                        raise e
-        except WebsocketConnectionError as e:
-            logger.critical(str(e))
+            logger.error(f"Error while fetching assets for Kraken: {e}")
             raise e
 
-    async def send_websocket_message(self, websocket: websockets.WebSocketClientProtocol) -> None:
-        pairs = await self.fetch_kraken_pairs()
-        message = {"event": "subscribe", "pair": pairs, "subscription": {"name": "ticker"}}
+    async def bootstrap(self) -> list:
+        return await self.fetch_kraken_pairs()
+
+    async def subscribe(self, websocket: websockets.WebSocketClientProtocol, pairs: list) -> None:
+        await self.send_websocket_message(websocket, self.demanded(pairs))
+
+    async def send_websocket_message(
+        self, websocket: websockets.WebSocketClientProtocol, pairs: list, event: str = "subscribe"
+    ) -> None:
+        # Kraken rejects a request without pairs, demand mode can start with none of its pairs listed
+        if not pairs:
+            return
+        message = {"event": event, "pair": pairs, "subscription": {"name": "ticker"}}
         try:
-            await websocket.send(json.dumps(message))
+            await websocket.send(dumps_str(message))
         except Exception as e:
             logger.error("Error while sending message to Kraken websocket", str(e))
 
-    async def handler_data(self, data: list) -> None:
-        cache = self.db.setdefault(self.name, {})
+    async def subscribe_symbols(self, websocket: websockets.WebSocketClientProtocol, symbols: list[str]) -> None:
+        await self.send_websocket_message(websocket, symbols)
+
+    async def unsubscribe_symbols(self, websocket: websockets.WebSocketClientProtocol, symbols: list[str]) -> None:
+        await self.send_websocket_message(websocket, symbols, "unsubscribe")
+
+    def register(self, raw: str) -> str:
+        # catalog and ticker names are the wsname, XBT/USD
+        if "/" in raw:
+            return registry.add(self.name, raw, *raw.split("/", 1))
+        return registry.add_symbol(self.name, raw, raw)
+
+    @staticmethod
+    def ping_message(sequence: int) -> str:
+        return dumps_str({"event": "ping", "reqid": sequence})
+
+    @staticmethod
+    def control_frame(frame: str) -> bool:
+        # tickers are arrays, events (pong, heartbeat, statuses) objects
+        return frame[:1] == "{"
+
+    async def handle_control(self, data: list | dict) -> bool:
+        if isinstance(data, dict):
+            if data.get("event") == "pong":
+                self.heartbeat.pong(data.get("reqid"))
+            # heartbeat (sent once a second without ticker traffic), system and subscription statuses
+            return True
+        return False
+
+    def extract_ticks(self, data: list | dict) -> list[tuple]:
+        # [channelID, ticker, "ticker", "XBT/USD"], events (heartbeat, statuses) come as dicts
         if isinstance(data, list):
             currency_data = data[1]
-            for _ in currency_data:
-                try:
-                    average_price = calculate_average_value(currency_data["b"][0], currency_data["a"][0])
-                except (ValueError, TypeError, KeyError) as e:
-                    logger.error(f"Error calculating average price for ticker {data[-1]}: {e}  Kraken")
-                    raise e
-                cache[data[-1].replace("/", "")] = {
-                    "ask": currency_data["a"][0],
-                    "bid": currency_data["b"][0],
-                    "ask_bid_average": average_price,
-                }
+            ask, bid = currency_data["a"][0], currency_data["b"][0]
+            # the ticker channel carries no event time
+            return [(self.symbols.get(data[-1]) or self.register(data[-1]), ask, bid, 0.0)]
+        return []
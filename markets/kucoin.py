@@ -1,13 +1,15 @@
-import json
 import time
 
-import aiohttp
 import websockets
 
 from common.views import BaseWebSocketMixin
-from src.exceptions import WebsocketConnectionError, WebsocketMessageSendingError
-from src.settings import MARKETS, logger
-from src.utils import calculate_average_value
+from src import bootstrap
+from src.codec import dumps_str, loads
+from src.exceptions import WebsocketMessageSendingError
+from src.heartbeat import Heartbeat
+from src.settings import KUCOIN_TOKEN_TTL, MARKETS, logger
+from src.store import QuoteStore
+from src.symbols import registry
 
 
 class KucoinWebSocket(BaseWebSocketMixin):
@@ -16,90 +18,89 @@ class KucoinWebSocket(BaseWebSocketMixin):
     We need to subscribe to channel and receive the information.
     """
 
-    def __init__(self, db: dict):
+    def __init__(self, db: QuoteStore):
         super().__init__(name=MARKETS["Kucoin"]["name"], db=db, uri=None)
+        self.token_endpoint = MARKETS["Kucoin"]["token_endpoint"]
+        # (time.monotonic() of the request, connection data), reused by reconnects for KUCOIN_TOKEN_TTL seconds
+        self.access: tuple[float, dict] | None = None
+        self.heartbeat = Heartbeat(message=self.ping_message)
 
-    @staticmethod
-    async def get_access_token() -> dict:
+    async def get_access_token(self) -> dict:
         """
         KuCoin requires an access token from a REST API empty post request for connection to Websocket
         """
+        if self.access is not None and time.monotonic() - self.access[0] < KUCOIN_TOKEN_TTL:
+            return self.access[1]
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post("https://api.kucoin.com/api/v1/bullet-public") as response:
-                    response_data = await response.json()
-                    ws_token_access = response_data["data"]["token"]
-                    url = f"wss://ws-api-spot.kucoin.com/?token={ws_token_access}"
-                    ping_interval = response_data["data"]["instanceServers"][0]["pingInterval"]
-                    data = {
-                        "url": url,
-                        "ping_interval": ping_interval,
-                    }
-                    return data
+            response_data = await bootstrap.request("POST", self.token_endpoint)
+            ws_token_access = response_data["data"]["token"]
+            instance_server = response_data["data"]["instanceServers"][0]
         except Exception as e:
-            logger.error("Error while fetching assets for Kukoin", str(e))
+            logger.error(f"Error while fetching assets for Kukoin: {e}")
+            raise e
+        url = f"{instance_server['endpoint']}?token={ws_token_access}"
+        data = {
+            "url": url,
+            "ping_interval": instance_server["pingInterval"],
+            "ping_timeout": instance_server["pingTimeout"],
+        }
+        self.access = time.monotonic(), data
+        return data
 
-    async def connection(self) -> None:
+    async def endpoint(self) -> str:
         api_data = await self.get_access_token()
+        # KuCoin gives both in milliseconds
+        self.heartbeat.interval = api_data["ping_interval"] / 1000
+        self.heartbeat.timeout = api_data["ping_timeout"] / 1000
         self.uri = api_data["url"]
-        ping_interval = api_data["ping_interval"]
-        last_ping_time = None
-
-        async def hold_server_connection(
-            websocket: websockets.WebSocketClientProtocol,
-            ping_interval: int,
-        ) -> None:
-            # [PING] - Sending message to the websocket for holding connection with the server
-            message = {"type": "ping"}
-            nonlocal last_ping_time
-            try:
-                if last_ping_time is None or time.time() - last_ping_time >= ping_interval:
-                    last_ping_time = time.time()
-
-                    await websocket.send(json.dumps(message))
+        return self.uri
 
-                    logger.info("[KukoinAPI Connection] - Sending Ping")
-            except Exception as e:
-                logger.error(f"Error while sending periodical message: {e}")
+    def refused(self) -> None:
+        # the token may have expired: the next attempt requests a new one
+        self.access = None
 
+    async def subscribe(self, websocket: websockets.WebSocketClientProtocol, bootstrapped: None) -> None:
         try:
-            async with websockets.connect(self.uri) as websocket:
-                logger.info("Websocket Connection to KucoinAPI successful")
-                try:
-                    await self.subscribe_event(websocket)
-                except WebsocketMessageSendingError as e:
-                    logger.error(str(e))
-                    return await self.connection()
-                while True:
-                    try:
-                        await hold_server_connection(websocket, ping_interval)
-                    except Exception as e:
-                        raise e
-                    try:
-                        response = await websocket.recv()
-                        await self.handler_data(json.loads(response))
-                    except Exception as e:
-                        logger.error(f"Error while processing WebSocket data: {e}")
-                        raise e
-        except WebsocketConnectionError as e:
-            logger.critical(str(e))
-            raise e
+            await self.subscribe_event(websocket)
+        except Exception as e:
+            raise WebsocketMessageSendingError(e, msg="Subscription to /market/ticker:all failed. ")
+
+    @staticmethod
+    def ping_message(sequence: int) -> str:
+        # [PING] - holds the connection with the server, answered with {"id": ..., "type": "pong"}
+        return dumps_str({"id": str(sequence), "type": "ping"})
 
     async def subscribe_event(self, websocket: websockets.WebSocketClientProtocol) -> None:
         message = {"id": 1545910660739, "type": "subscribe", "topic": "/market/ticker:all", "response": True}
-        await websocket.send(json.dumps(message))
+        await websocket.send(dumps_str(message))
+
+    @staticmethod
+    def control_frame(frame: str) -> bool:
+        # tickers are {"type": "message", ...}, the rest are pongs, welcome and acks; only called when the queue is full
+        try:
+            return loads(frame).get("type") != "message"
+        except (ValueError, AttributeError):
+            return False
+
+    async def handle_control(self, data: dict) -> bool:
+        kind = data.get("type")
+        if kind == "pong":
+            self.heartbeat.pong(int(data["id"]))
+            return True
+        # welcome on connect, ack of the subscription
+        return kind in ("welcome", "ack")
 
-    async def handler_data(self, data: dict) -> None:
-        cache = self.db.setdefault(self.name, {})
+    def extract_ticks(self, data: dict) -> list[tuple]:
+        # /market/ticker:all puts the symbol into "subject"
         if "subject" in data:
-            for _ in data["data"]:
-                try:
-                    average_price = calculate_average_value(data["data"]["bestBid"], data["data"]["bestAsk"])
-                except (ValueError, TypeError, KeyError) as e:
-                    logger.error(f"Error calculating average price for ticker {data['subject']}: {e}  Kucoin")
-                    raise e
-                cache[data["subject"].replace("-", "")] = {
-                    "ask": data["data"]["bestAsk"],
-                    "bid": data["data"]["bestBid"],
-                    "ask_bid_average": average_price,
-                }
+            ticker = data["data"]
+            subject = data["subject"]
+            pair = self.symbols.get(subject) or self.register(subject)
+            return [(pair, ticker["bestAsk"], ticker["bestBid"], ticker.get("time", 0) / 1000)]
+        return []
+
+    def register(self, raw: str) -> str:
+        # subjects are BTC-USDT
+        if "-" in raw:
+            return registry.add(self.name, raw, *raw.split("-", 1))
+        return registry.add_symbol(self.name, raw, raw)
@@ -1,91 +1,263 @@
 import asyncio
+import time
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket
+from fastapi.responses import PlainTextResponse
 
-from markets.binance import BinanceWebSocket
-from markets.huobi import HuobiWebSocket
-from markets.kraken import KrakenWebSocket
-from markets.kucoin import KucoinWebSocket
+from . import bootstrap, metrics, persistence
+from .demand import DemandSubscriptions
+from .history import TickHistory
+from .ingestor import connectors
+from .settings import (
+    DEMAND_SUBSCRIPTIONS,
+    HISTORY_DEPTH,
+    METRICS_ENABLED,
+    SHARED_STORE_PATH,
+    SHARED_STORE_POLL_INTERVAL,
+    SHARED_STORE_READER,
+    SNAPSHOT_PATH,
+)
+from .shared import SharedQuoteStore
+from .snapshots import AggregatedBody, CodecJSONResponse, SnapshotCache, snapshot_response
+from .spreads import SpreadIndex
+from .store import AGGREGATED, QuoteStore
+from .stream import StreamHub
+from .supervisor import Supervisor
+from .symbols import registry
+from .utils import validate_crypto_pair
 
-from .settings import logger
-from .utils import CurrencyAggregation, validate_crypto_pair
+# API workers of the multi-worker mode read the quotes the ingest process writes into the shared file
+DB = SharedQuoteStore(SHARED_STORE_PATH) if SHARED_STORE_READER else QuoteStore()
+SNAPSHOTS = SnapshotCache(DB)
+AGGREGATED_BODY = AggregatedBody(DB)
+STREAM = StreamHub(DB)
+# kept by the process that runs the connectors, the API workers of the multi-worker mode have no history
+HISTORY = TickHistory(DB) if HISTORY_DEPTH and isinstance(DB, QuoteStore) else None
+SPREADS = SpreadIndex(DB) if isinstance(DB, QuoteStore) else None
+SUPERVISOR: Supervisor | None = None
+POLLER: asyncio.Task | None = None
+SNAPSHOTTER: persistence.Snapshotter | None = None
+DEMAND: DemandSubscriptions | None = None
+# {(path, query shape): latency histogram}, filled by the RequestLatency middleware
+LATENCY: dict[tuple[str, str], metrics.Histogram] = {}
 
-DB = {}
-
-app = FastAPI()
+app = FastAPI(default_response_class=CodecJSONResponse)
+if METRICS_ENABLED:
+    app.add_middleware(metrics.RequestLatency, histograms=LATENCY)
 
 
 @app.on_event("startup")
 async def run_ws():
-    binance = BinanceWebSocket(DB)
-    kraken = KrakenWebSocket(DB)
-    huobi = HuobiWebSocket(DB)
-    kucoin = KucoinWebSocket(DB)
-    try:
-        asyncio.create_task(binance.connection())
-        asyncio.create_task(huobi.connection())
-        asyncio.create_task(kraken.connection())
-        asyncio.create_task(kucoin.connection())
-    except asyncio.exceptions.TimeoutError as e:
-        logger.critical(f"Connection failed: {e}")
-        return run_ws()
-
-
-@app.get("/currency/")
-async def main(pair: str = Query(None), exchange: str = Query(None)) -> dict:
-    aggregated_prices = {}
+    global SUPERVISOR, POLLER, SNAPSHOTTER, DEMAND
+    if isinstance(DB, SharedQuoteStore):
+        POLLER = asyncio.create_task(poll_shared_store(DB))
+        return
+    if SNAPSHOT_PATH:
+        # serve the last known quotes, flagged as stale, until the feeds resubscribe
+        persistence.load(DB, SNAPSHOT_PATH)
+        SNAPSHOTTER = persistence.Snapshotter(DB, SNAPSHOT_PATH)
+        SNAPSHOTTER.start()
+    connector_list = connectors(DB)
+    if DEMAND_SUBSCRIPTIONS:
+        DEMAND = DemandSubscriptions(DB, connector_list)
+        DEMAND.start()
+    SUPERVISOR = Supervisor(connector_list)
+    SUPERVISOR.start()
+
+
+@app.on_event("shutdown")
+async def stop_ws():
+    if DEMAND is not None:
+        await DEMAND.stop()
+    if SUPERVISOR is not None:
+        await SUPERVISOR.stop()
+    if SNAPSHOTTER is not None:
+        await SNAPSHOTTER.stop()
+    await bootstrap.close()
+    if POLLER is not None:
+        POLLER.cancel()
+        await asyncio.gather(POLLER, return_exceptions=True)
+
+
+async def poll_shared_store(store: SharedQuoteStore) -> None:
+    # feeds /stream subscribers of this worker with the writes of the ingest process
+    while True:
+        store.poll()
+        await asyncio.sleep(SHARED_STORE_POLL_INTERVAL)
+
+
+def since_version(since: str) -> int:
+    """
+    `since` is the "<epoch>-<version>" token of a previous delta response. Versions restart with the process,
+    a token of another epoch (a restart in between) starts over from 0. A bare version is taken as one of this epoch.
+    """
+    epoch, _, version = since.rpartition("-")
+    if not version.isdigit():
+        raise HTTPException(status_code=400, detail="Please pass the version of a previous response as since")
+    if epoch and epoch != DB.epoch:
+        return 0
+    return int(version)
+
+
+@app.get("/currency/", response_model=None)
+async def main(
+    request: Request,
+    pair: str = Query(None),
+    exchange: str = Query(None),
+    since: str = Query(None),
+    max_age_ms: int = Query(None, ge=0),
+) -> Response:
+    max_age = max_age_ms / 1000 if max_age_ms is not None else None
     if pair and exchange:
         if not validate_crypto_pair(pair):
             raise HTTPException(
                 status_code=400, detail="Please specify the pair in format: a-z; A-Z; or a-z-0-9, example: BTCUSDT"
             )
-        pair = pair.upper()
+        # exchange-specific names such as XBTUSD are served under the canonical pair
+        pair = registry.resolve(pair.upper())
         exchange = exchange.lower()
-        if exchange not in DB.keys():
-            raise HTTPException(status_code=404, detail=f"Pleasy specify one of available exchanges {list(DB.keys())}")
-        if pair not in DB[exchange]:
+        if DEMAND is not None:
+            # subscribes a pair of a demand-mode exchange on its first request and waits for its first quote
+            await DEMAND.request(exchange, pair)
+        if exchange not in DB:
+            raise HTTPException(status_code=404, detail=f"Pleasy specify one of available exchanges {DB.names()}")
+        table = DB.exchange(exchange)
+        slot = table.ids.get(pair)
+        if slot is None:
             raise HTTPException(status_code=404, detail="Pair not found")
-        return {
-            "ticket": pair,
-            "price": {
-                "ask": DB[exchange][pair]["ask"],
-                "bid": DB[exchange][pair]["bid"],
-                "ask_bid_average": DB[exchange][pair]["ask_bid_average"],
-            },
-        }
+        if max_age is not None and table.age(slot, time.time()) > max_age:
+            raise HTTPException(status_code=404, detail=f"Quote is older than {max_age_ms} ms")
+        return CodecJSONResponse({"ticket": pair, "price": table.quote(slot)})
     if not pair and exchange:
         exchange = exchange.lower()
-        if exchange in DB.keys():
-            return {"result": DB[exchange]}
+        if exchange in DB and since is not None:
+            version = DB.version(exchange)
+            result = DB.changed_since(exchange, since_version(since), max_age)
+            return CodecJSONResponse({"result": result, "version": f"{DB.epoch}-{version}"})
+        if exchange in DB and max_age is not None:
+            # depends on the clock, not only on the store version, so it is never served from the snapshot cache
+            return CodecJSONResponse({"result": DB.changed_since(exchange, 0, max_age)})
+        if exchange in DB:
+            snapshot = SNAPSHOTS.get(exchange, lambda: {"result": DB.exchange(exchange).as_dict()})
+            return snapshot_response(request, snapshot)
         else:
-            raise HTTPException(status_code=404, detail=f"Please choose one of available exchanges: {list(DB.keys())}")
+            raise HTTPException(status_code=404, detail=f"Please choose one of available exchanges: {DB.names()}")
 
-    if pair and not exchange:
+    if (pair or since is not None) and not exchange:
         raise HTTPException(status_code=400, detail="Please specify the exchange")
-    for exchange in DB:
-        for currency in DB[exchange]:
-            cur_dict = {currency: DB[exchange][currency]}
-            aggregate = CurrencyAggregation(exchange, cur_dict, aggregated_prices)
-            try:
-                aggregate.aggregation
-            except Exception as e:
-                raise e
 
-    return {"result": aggregated_prices}
+    if max_age is not None:
+        return CodecJSONResponse({"result": DB.aggregated(max_age)})
+    # only the pairs written since the previous body are serialized again
+    snapshot = SNAPSHOTS.get_encoded(AGGREGATED, AGGREGATED_BODY.build)
+    return snapshot_response(request, snapshot)
+
+
+@app.get("/history/", response_model=None)
+async def history(
+    exchange: str = Query(...),
+    pair: str = Query(...),
+    window: float = Query(60.0, gt=0),
+) -> Response:
+    if HISTORY is None:
+        raise HTTPException(status_code=404, detail="Tick history is not kept by this process")
+    if not validate_crypto_pair(pair):
+        raise HTTPException(
+            status_code=400, detail="Please specify the pair in format: a-z; A-Z; or a-z-0-9, example: BTCUSDT"
+        )
+    pair = registry.resolve(pair.upper())
+    exchange = exchange.lower()
+    summary = HISTORY.summary(exchange, pair, window)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Pair not found")
+    return CodecJSONResponse({"exchange": exchange, "ticket": pair, "window": window, **summary})
+
+
+@app.get("/best/", response_model=None)
+async def best(pair: str = Query(...)) -> Response:
+    if SPREADS is None:
+        raise HTTPException(status_code=404, detail="Best quotes are not kept by this process")
+    if not validate_crypto_pair(pair):
+        raise HTTPException(
+            status_code=400, detail="Please specify the pair in format: a-z; A-Z; or a-z-0-9, example: BTCUSDT"
+        )
+    pair = registry.resolve(pair.upper())
+    quote = SPREADS.quote(pair)
+    if quote is None:
+        raise HTTPException(status_code=404, detail="Pair not found")
+    return CodecJSONResponse({"ticket": pair, **quote})
+
+
+@app.get("/spreads/", response_model=None)
+async def spreads(top: int = Query(10, ge=1, le=1000)) -> Response:
+    if SPREADS is None:
+        raise HTTPException(status_code=404, detail="Spreads are not kept by this process")
+    return CodecJSONResponse({"result": SPREADS.widest(top)})
+
+
+@app.get("/status/")
+async def status() -> dict:
+    if isinstance(DB, SharedQuoteStore):
+        return {"connectors": DB.status().get("connectors", {})}
+    result = {"connectors": SUPERVISOR.status() if SUPERVISOR is not None else {}}
+    if DEMAND is not None:
+        result["demand"] = DEMAND.status()
+    if HISTORY is not None:
+        result["history"] = HISTORY.status()
+    return result
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    if isinstance(DB, SharedQuoteStore):
+        # ingest metrics come from the ingest process, request latency is this worker's own
+        text = DB.status().get("metrics", "") + metrics.render(None, {}, {}, LATENCY)
+    else:
+        connectors = SUPERVISOR.connectors if SUPERVISOR is not None else {}
+        states = SUPERVISOR.states if SUPERVISOR is not None else {}
+        text = metrics.render(DB, connectors, states, LATENCY)
+    return PlainTextResponse(text, media_type=metrics.CONTENT_TYPE)
+
+
+@app.websocket("/stream")
+async def stream(websocket: WebSocket):
+    await STREAM.serve(websocket)
 
 
 @app.get("/")
 async def info():
     info = {
-        "exchanges": list(DB.keys()),
+        "exchanges": DB.names(),
         "requestsLinks": {
             "/currency/": {
                 "params": {
                     "pair": "str",
                     "exchange": "str",
+                    "since": "str",
+                    "max_age_ms": "int",
                 }
             },
+            "/history/": {
+                "params": {
+                    "exchange": "str",
+                    "pair": "str",
+                    "window": "float",
+                }
+            },
+            "/best/": {"params": {"pair": "str"}},
+            "/spreads/": {"params": {"top": "int"}},
+            "/status/": {},
+            "/metrics": {},
             "allowedMethods": "GET",
         },
+        "websocketLinks": {
+            "/stream": {
+                "message": {
+                    "action": "subscribe | unsubscribe",
+                    "exchange": "str",
+                    "pairs": "list[str] | null",
+                }
+            },
+        },
     }
     return info
@@ -0,0 +1,132 @@
+"""
+REST bootstrap of the connectors: one pooled HTTP session and symbol catalogs cached in memory and on disk.
+
+A reconnect reuses the catalog and the pooled (keep-alive) connection instead of creating a session and downloading
+the symbol list again; a cold start with a cached file only waits for the websocket handshake.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Callable
+
+import aiohttp
+
+from .codec import dumps, loads
+from .settings import CATALOG_CACHE_DIR, CATALOG_TTL, HTTP_KEEPALIVE, HTTP_POOL_SIZE, HTTP_TIMEOUT, logger
+
+# (event loop, session), a session can only be used on the loop it was created on
+_session: tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession] | None = None
+
+
+def session() -> aiohttp.ClientSession:
+    """
+    The HTTP session shared by every connector of the running event loop.
+    """
+    global _session
+    loop = asyncio.get_running_loop()
+    if _session is None or _session[0] is not loop or _session[1].closed:
+        connector = aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, keepalive_timeout=HTTP_KEEPALIVE, ttl_dns_cache=300)
+        _session = loop, aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT))
+    return _session[1]
+
+
+async def close() -> None:
+    global _session
+    if _session is not None:
+        loop, current = _session
+        _session = None
+        if loop is asyncio.get_running_loop():
+            await current.close()
+
+
+async def request(method: str, url: str) -> Any:
+    async with session().request(method, url) as response:
+        response.raise_for_status()
+        return loads(await response.read())
+
+
+class Catalog:
+    """
+    Symbol list of an exchange built by `parse` from the JSON of a REST endpoint.
+    It is kept in memory and in `directory` for `ttl` seconds. An expired list is returned at once and refreshed in
+    the background, only a start without any cached list waits for the request. Concurrent callers (the connections
+    of a sharded exchange) share one request.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        parse: Callable[[Any], list],
+        ttl: float = CATALOG_TTL,
+        directory: str | None = CATALOG_CACHE_DIR,
+    ):
+        self.name = name
+        self.parse = parse
+        self.ttl = ttl
+        self.directory = directory
+        self.url: str | None = None
+        self.items: list | None = None
+        self.fetched_at = 0.0
+        self.refreshing: asyncio.Task | None = None
+
+    @property
+    def path(self) -> str | None:
+        return os.path.join(self.directory, f"{self.name}.json") if self.directory else None
+
+    async def fetch(self, url: str) -> Any:
+        return await request("GET", url)
+
+    async def get(self, url: str) -> list:
+        if self.url != url:
+            self.url, self.items, self.fetched_at, self.refreshing = url, None, 0.0, None
+            self._load()
+        if self.items is None:
+            if self.refreshing is None or self.refreshing.done():
+                self.refreshing = asyncio.create_task(self.refresh(), name=f"catalog-{self.name}")
+            # a cancelled caller leaves the request running for the others
+            return await asyncio.shield(self.refreshing)
+        if time.time() - self.fetched_at > self.ttl and (self.refreshing is None or self.refreshing.done()):
+            self.refreshing = asyncio.create_task(self._refresh_in_background(), name=f"catalog-{self.name}")
+        return self.items
+
+    async def refresh(self) -> list:
+        url = self.url
+        items = self.parse(await self.fetch(url))
+        if url == self.url:
+            self.items, self.fetched_at = items, time.time()
+            self._save()
+        return items
+
+    async def _refresh_in_background(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"[Catalog] keeping the cached {self.name} symbols, refresh failed: {e}")
+
+    def _load(self) -> None:
+        path = self.path
+        if path is None:
+            return
+        try:
+            with open(path, "rb") as file:
+                cached = loads(file.read())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"[Catalog] ignoring unreadable {path}: {e}")
+            return
+        if isinstance(cached, dict) and cached.get("url") == self.url and isinstance(cached.get("items"), list):
+            self.items, self.fetched_at = cached["items"], cached.get("fetched_at", 0.0)
+
+    def _save(self) -> None:
+        path = self.path
+        if path is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temporary = f"{path}.tmp"
+            with open(temporary, "wb") as file:
+                file.write(dumps({"url": self.url, "fetched_at": self.fetched_at, "items": self.items}))
+            os.replace(temporary, path)
+        except OSError as e:
+            logger.warning(f"[Catalog] could not write {path}: {e}")
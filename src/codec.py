@@ -0,0 +1,48 @@
+import json
+from typing import Any, Callable
+
+from .settings import JSON_CODEC
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class Codec:
+    """
+    JSON backend used for exchange frames and API responses.
+    dumps() returns bytes for HTTP bodies, dumps_str() text for websocket frames.
+    """
+
+    def __init__(self, name: str, loads: Callable[[str | bytes], Any], dumps: Callable[[Any], bytes]):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def dumps_str(self, obj: Any) -> str:
+        return self.dumps(obj).decode("utf-8")
+
+
+def _json_dumps(obj: Any) -> bytes:
+    # same output as starlette JSONResponse
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+CODECS = {"json": Codec("json", json.loads, _json_dumps)}
+if orjson is not None:
+    CODECS["orjson"] = Codec("orjson", orjson.loads, orjson.dumps)
+
+
+def get_codec(name: str = "auto") -> Codec:
+    if name == "auto":
+        return CODECS.get("orjson", CODECS["json"])
+    if name not in CODECS:
+        raise ValueError(f"JSON codec {name!r} is not available, choose one of {sorted(CODECS)}")
+    return CODECS[name]
+
+
+codec = get_codec(JSON_CODEC)
+loads = codec.loads
+dumps = codec.dumps
+dumps_str = codec.dumps_str
@@ -0,0 +1,143 @@
+"""
+Demand-driven subscriptions: the connectors of DEMAND_EXCHANGES subscribe only to the always-on pairs and to the
+pairs clients ask for, instead of to every symbol of their catalog.
+
+The first request of a pair subscribes it and waits up to `wait` seconds for its first quote. A pair nobody asked for
+within `ttl` seconds is unsubscribed; its last quote stays in the store flagged as stale (like a snapshot quote)
+until it is asked for again. Requested pairs are kept in least recently used order per exchange, so a request costs
+a dict move and a sweep only looks at the pairs it evicts.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+
+from .settings import DEMAND_ALWAYS_ON, DEMAND_EXCHANGES, DEMAND_TTL, DEMAND_WAIT, logger
+from .store import QuoteStore
+from .symbols import registry
+
+
+class DemandSubscriptions:
+    def __init__(
+        self,
+        store: QuoteStore,
+        connectors: list,
+        exchanges: tuple[str, ...] = DEMAND_EXCHANGES,
+        always_on: set[str] = DEMAND_ALWAYS_ON,
+        wait: float = DEMAND_WAIT,
+        ttl: float = DEMAND_TTL,
+    ):
+        self.store = store
+        self.always_on = {registry.resolve(pair) for pair in always_on}
+        self.wait = wait
+        self.ttl = ttl
+        # {exchange: its connectors}, the connections of a sharded exchange each serve a part of the pairs
+        self.connectors: dict[str, list] = {}
+        for connector in connectors:
+            if connector.name in exchanges:
+                connector.wanted = set(self.always_on)
+                self.connectors.setdefault(connector.name, []).append(connector)
+        # {exchange: {pair: time.monotonic() of the last request}}, least recently requested first
+        self.requested: dict[str, OrderedDict[str, float]] = {name: OrderedDict() for name in self.connectors}
+        # requests waiting for the first quote of a pair they subscribed
+        self.waiting: dict[tuple[str, str], asyncio.Future] = {}
+        self.subscribed = 0
+        self.evicted = 0
+        self.task: asyncio.Task | None = None
+        store.subscribe(self.updated)
+
+    def updated(self, exchange: str, pairs: list[str]) -> None:
+        if self.waiting:
+            for pair in pairs:
+                future = self.waiting.pop((exchange, pair), None)
+                if future is not None and not future.done():
+                    future.set_result(None)
+
+    async def request(self, exchange: str, pair: str) -> None:
+        """
+        Called for every /currency/ request of a pair, returns once the pair has a fresh quote or after `wait`.
+        """
+        requested = self.requested.get(exchange)
+        if requested is None or pair in self.always_on:
+            return
+        if pair in requested:
+            requested[pair] = time.monotonic()
+            requested.move_to_end(pair)
+            future = self.waiting.get((exchange, pair))
+        else:
+            future = await self.subscribe(exchange, pair)
+        if future is not None:
+            try:
+                # a timed out request is answered with what the store has, the subscription stays
+                await asyncio.wait_for(asyncio.shield(future), self.wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def subscribe(self, exchange: str, pair: str) -> asyncio.Future | None:
+        key = (exchange, pair)
+        future = self.waiting.get(key)
+        if future is not None:
+            # a concurrent request is subscribing the pair
+            return future
+        future = self.waiting[key] = asyncio.get_running_loop().create_future()
+        try:
+            served = [name for connector in self.connectors[exchange] for name in await connector.want([pair])]
+        except Exception as e:
+            logger.error(f"[Demand] could not subscribe {exchange} {pair}: {e}")
+            served = []
+        if not served:
+            # not listed by the exchange (or its catalog is unavailable), the request gets the store's answer
+            self.waiting.pop(key, None)
+            future.set_result(None)
+            return None
+        self.requested[exchange][pair] = time.monotonic()
+        self.subscribed += 1
+        return future
+
+    async def evict(self, now: float | None = None) -> dict[str, list[str]]:
+        """
+        Unsubscribes the pairs not requested within `ttl` seconds and flags their quotes as stale.
+        """
+        cutoff = (time.monotonic() if now is None else now) - self.ttl
+        evicted = {}
+        for exchange, requested in self.requested.items():
+            pairs = []
+            while requested:
+                pair, last = next(iter(requested.items()))
+                if last > cutoff:
+                    break
+                requested.popitem(last=False)
+                pairs.append(pair)
+            if not pairs:
+                continue
+            for connector in self.connectors[exchange]:
+                try:
+                    await connector.unwant(pairs)
+                except Exception as e:
+                    # the pairs are off the connector's list, a reconnect does not subscribe them again
+                    logger.warning(f"[Demand] could not unsubscribe {len(pairs)} {connector.label} pairs: {e}")
+            for pair in pairs:
+                self.waiting.pop((exchange, pair), None)
+                self.store.mark_stale(exchange, pair)
+            self.evicted += len(pairs)
+            evicted[exchange] = pairs
+        return evicted
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl / 10)
+            await self.evict()
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run(), name="demand")
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def status(self) -> dict:
+        return {
+            exchange: {"always_on": len(self.always_on), "requested": len(requested)}
+            for exchange, requested in self.requested.items()
+        }
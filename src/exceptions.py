@@ -15,3 +15,7 @@ class WebsocketConnectionError(ConnectionError):
 
 class WebsocketMessageSendingError(CryptoBaseException):
     message = "Error sending message. "
+
+
+class SharedStoreError(CryptoBaseException):
+    message = "Shared quote store error. "
@@ -0,0 +1,106 @@
+"""
+Connection keepalive, run as a task of its own next to a connector's receive loop, so receiving a frame costs no
+keepalive work and a quiet connection is still pinged on time.
+"""
+import asyncio
+import time
+from typing import Callable
+
+from .metrics import LagWindow
+from .settings import HEARTBEAT_INTERVAL, HEARTBEAT_TIMEOUT, logger
+
+
+class Heartbeat:
+    """
+    Every `interval` seconds sends a ping: the application-level message made by `message(sequence)` (KuCoin,
+    Kraken), or a websocket protocol ping when there is none. The connector's processing stage reports the answer
+    with pong(sequence) and its round-trip time is recorded.
+    Exchanges that ping the client instead (Huobi) report every ping with server_ping().
+    A connection whose ping stays unanswered for `timeout` seconds, or that expects server pings and got none for
+    `timeout` seconds, is closed; its receive loop then fails and the supervisor reconnects it.
+    """
+
+    def __init__(
+        self,
+        interval: float = HEARTBEAT_INTERVAL,
+        timeout: float = HEARTBEAT_TIMEOUT,
+        message: Callable[[int], str] | None = None,
+        server_pings: bool = False,
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self.message = message
+        self.server_pings = server_pings
+        self.sequence = 0
+        # {sequence: perf_counter() when sent} of the pings not answered yet on the current connection
+        self.pending: dict[int, float] = {}
+        self.last_server_ping = 0.0
+        self.rtt = LagWindow()
+        self.pings = 0
+        self.pongs = 0
+        self.server_pings_received = 0
+        self.timeouts = 0
+
+    @property
+    def protocol_pings(self) -> bool:
+        return self.message is None and not self.server_pings
+
+    async def run(self, websocket) -> None:
+        self.pending.clear()
+        self.last_server_ping = time.monotonic()
+        while True:
+            if not self.server_pings:
+                await self.ping(websocket)
+            await asyncio.sleep(self.interval)
+            reason = self.expired()
+            if reason is not None:
+                self.timeouts += 1
+                logger.warning(f"[Heartbeat] closing the connection: {reason}")
+                await websocket.close()
+                return
+
+    def expired(self) -> str | None:
+        if self.server_pings:
+            silence = time.monotonic() - self.last_server_ping
+            return f"no ping from the server for {silence:.1f}s" if silence > self.timeout else None
+        if self.pending:
+            waited = time.perf_counter() - min(self.pending.values())
+            if waited > self.timeout:
+                return f"ping unanswered for {waited:.1f}s"
+        return None
+
+    async def ping(self, websocket) -> None:
+        self.sequence += 1
+        sequence = self.sequence
+        self.pending[sequence] = time.perf_counter()
+        self.pings += 1
+        if self.message is not None:
+            await websocket.send(self.message(sequence))
+            return
+        waiter = await websocket.ping()
+
+        def answered(done: asyncio.Future) -> None:
+            # the protocol pong is handled by the websockets library, a closed connection fails the waiter
+            if not done.cancelled() and done.exception() is None:
+                self.pong(sequence)
+
+        waiter.add_done_callback(answered)
+
+    def pong(self, sequence) -> None:
+        sent = self.pending.pop(sequence, None)
+        if sent is not None:
+            self.rtt.add(time.perf_counter() - sent)
+            self.pongs += 1
+
+    def server_ping(self) -> None:
+        self.last_server_ping = time.monotonic()
+        self.server_pings_received += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "pings": self.pings,
+            "pongs": self.pongs,
+            "server_pings": self.server_pings_received,
+            "timeouts": self.timeouts,
+            "rtt_ms": self.rtt.to_dict(),
+        }
@@ -0,0 +1,198 @@
+"""
+Tick history: the last ticks of every pair in preallocated rings, summarized over a time window for /history/.
+Summaries are computed with NumPy over the ring when it is installed and with a plain loop otherwise.
+"""
+import time
+from array import array
+
+from .settings import HISTORY_DEPTH, HISTORY_MEMORY_BUDGET, logger
+from .store import QuoteStore
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+# values per ring entry: receive time, bid, ask
+FIELDS = 3
+
+
+class TickRing:
+    """
+    The last `depth` ticks of one pair as (received_at, bid, ask) in one preallocated array of doubles.
+    `head` counts every tick written, the oldest kept tick is at head % depth once the ring is full.
+    """
+
+    __slots__ = ("data", "head")
+
+    def __init__(self, depth: int):
+        self.data = array("d", bytes(8 * FIELDS * depth))
+        self.head = 0
+
+
+class TickHistory:
+    """
+    Store listener appending every quote written by the feeds to the ring of its pair.
+    Restored quotes (snapshots, unsubscribed pairs) are not ticks and are left out. Ticks are kept in receive order,
+    so a window is the newest run of a ring.
+    """
+
+    def __init__(self, store: QuoteStore, depth: int = HISTORY_DEPTH, budget: int = HISTORY_MEMORY_BUDGET):
+        self.store = store
+        self.depth = depth
+        self.ring_bytes = 8 * FIELDS * depth
+        self.budget = budget
+        # {exchange: {pair: ring}}
+        self.rings: dict[str, dict[str, TickRing | None]] = {}
+        self.allocated = 0
+        # pairs that got no ring because the budget was spent
+        self.untracked = 0
+        store.subscribe(self.record)
+
+    def record(self, exchange: str, pairs: list[str]) -> None:
+        table = self.store.exchanges[exchange]
+        rings = self.rings.get(exchange)
+        if rings is None:
+            rings = self.rings[exchange] = {}
+        ids, bid, ask, updated, restored = table.ids, table.bid, table.ask, table.updated, table.restored
+        scale = table.price_scale
+        depth = self.depth
+        for pair in pairs:
+            slot = ids[pair]
+            if restored and slot in restored:
+                continue
+            ring = rings.get(pair)
+            if ring is None:
+                if pair in rings:
+                    # refused a ring when the budget was spent
+                    continue
+                ring = self._allocate(rings, exchange, pair)
+                if ring is None:
+                    continue
+            i = ring.head % depth * FIELDS
+            data = ring.data
+            data[i] = updated[slot]
+            data[i + 1] = bid[slot] / scale
+            data[i + 2] = ask[slot] / scale
+            ring.head += 1
+
+    def _allocate(self, rings: dict[str, TickRing | None], exchange: str, pair: str) -> TickRing | None:
+        if self.allocated + self.ring_bytes > self.budget:
+            rings[pair] = None
+            self.untracked += 1
+            if self.untracked == 1:
+                logger.warning(
+                    f"[History] memory budget of {self.budget} bytes spent, {exchange} {pair} has no history"
+                )
+            return None
+        ring = rings[pair] = TickRing(self.depth)
+        self.allocated += self.ring_bytes
+        return ring
+
+    def summary(self, exchange: str, pair: str, window: float, now: float | None = None) -> dict | None:
+        """
+        OHLC and time-weighted average of the mid, spread range and tick count of the ticks received in the last
+        `window` seconds, None for a pair without history.
+        `truncated` is set when the ring already dropped ticks of the window.
+        """
+        ring = self.rings.get(exchange, {}).get(pair)
+        if ring is None:
+            return None
+        now = time.time() if now is None else now
+        summarize = _summarize_numpy if np is not None else _summarize_python
+        return summarize(ring, self.depth, now - window, now)
+
+    def status(self) -> dict:
+        return {
+            "pairs": sum(ring is not None for rings in self.rings.values() for ring in rings.values()),
+            "untracked": self.untracked,
+            "depth": self.depth,
+            "bytes": self.allocated,
+        }
+
+
+def _summary(ticks: int, first: float, last: float, mids: tuple, spreads: tuple, twap: float, truncated: bool) -> dict:
+    # mids: (open, high, low, close), spreads: (min, max)
+    return {
+        "ticks": ticks,
+        "from": first,
+        "to": last,
+        "open": mids[0],
+        "high": mids[1],
+        "low": mids[2],
+        "close": mids[3],
+        "twap": twap,
+        "spread": {"min": spreads[0], "max": spreads[1]},
+        "truncated": truncated,
+    }
+
+
+def _summarize_python(ring: TickRing, depth: int, cutoff: float, now: float) -> dict:
+    data, head = ring.data, ring.head
+    start = max(head - depth, 0)
+    times, mids, spreads = [], [], []
+    # newest first, back to the first tick older than the window
+    position = head - 1
+    while position >= start:
+        i = position % depth * FIELDS
+        received = data[i]
+        if received < cutoff:
+            break
+        bid, ask = data[i + 1], data[i + 2]
+        times.append(received)
+        mids.append((bid + ask) / 2)
+        spreads.append(ask - bid)
+        position -= 1
+    times.reverse()
+    mids.reverse()
+    spreads.reverse()
+    truncated = start > 0 and position < start
+    if not times:
+        return {"ticks": 0, "truncated": truncated}
+    # every mid holds until the next tick, the last one until now
+    weighted = total = 0.0
+    for k, mid in enumerate(mids):
+        held = (times[k + 1] if k + 1 < len(times) else now) - times[k]
+        weighted += mid * held
+        total += held
+    twap = weighted / total if total > 0 else sum(mids) / len(mids)
+    return _summary(
+        len(times),
+        times[0],
+        times[-1],
+        (mids[0], max(mids), min(mids), mids[-1]),
+        (min(spreads), max(spreads)),
+        twap,
+        truncated,
+    )
+
+
+def _summarize_numpy(ring: TickRing, depth: int, cutoff: float, now: float) -> dict:
+    entries = np.frombuffer(ring.data, dtype=np.float64).reshape(depth, FIELDS)
+    head = ring.head
+    if head <= depth:
+        ticks = entries[:head]
+    else:
+        # oldest first
+        oldest = head % depth
+        ticks = np.concatenate((entries[oldest:], entries[:oldest]))
+    first = int(np.searchsorted(ticks[:, 0], cutoff, side="left"))
+    truncated = head > depth and first == 0
+    window = ticks[first:]
+    if not len(window):
+        return {"ticks": 0, "truncated": truncated}
+    times, bids, asks = window[:, 0], window[:, 1], window[:, 2]
+    mids = (bids + asks) / 2
+    held = np.diff(times, append=now)
+    total = held.sum()
+    twap = float((mids * held).sum() / total) if total > 0 else float(mids.mean())
+    spreads = asks - bids
+    return _summary(
+        len(window),
+        float(times[0]),
+        float(times[-1]),
+        (float(mids[0]), float(mids.max()), float(mids.min()), float(mids[-1])),
+        (float(spreads.min()), float(spreads.max())),
+        twap,
+        truncated,
+    )
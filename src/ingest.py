@@ -0,0 +1,145 @@
+import asyncio
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from .settings import DECODE_POOL_CHUNK, DECODE_POOL_WORKERS, INGEST_QUEUE_SIZE
+
+
+class IngestQueue:
+    """
+    Bounded buffer of raw frames between a connector's socket loop and its processing stage.
+    put() never blocks the socket: when the buffer is full the oldest data frame is dropped,
+    its symbols are refreshed by later frames of the same feed.
+    Frames for which control(frame) is true (pings, pongs) are never dropped, the keepalive depends on them.
+    Frames are kept with their local receive time (unix seconds).
+    """
+
+    def __init__(self, maxsize: int = INGEST_QUEUE_SIZE, control: Callable[[Any], bool] | None = None):
+        self.frames: deque = deque()
+        self.maxsize = maxsize
+        self.control = control
+        self.ready = asyncio.Event()
+        self.received = 0
+        self.bytes_received = 0
+        self.dropped = 0
+        self.processed = 0
+        self.merged = 0
+        self.committed = 0
+        self.errors = 0
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def put(self, frame) -> None:
+        self.received += 1
+        self.bytes_received += len(frame)
+        if len(self.frames) >= self.maxsize:
+            self.drop()
+        self.frames.append((frame, time.time()))
+        if not self.ready.is_set():
+            self.ready.set()
+
+    def drop(self) -> None:
+        # raw frames are only classified on overflow, the socket loop does not pay for it otherwise
+        frames, control = self.frames, self.control
+        kept = []
+        if control is not None:
+            while frames and control(frames[0][0]):
+                kept.append(frames.popleft())
+        if frames:
+            frames.popleft()
+            self.dropped += 1
+        # a buffer holding only control frames grows past maxsize rather than losing one
+        frames.extendleft(reversed(kept))
+
+    async def get_batch(self) -> list:
+        """
+        (frame, received_at) of everything queued since the last call, waits while the queue is empty.
+        """
+        while not self.frames:
+            self.ready.clear()
+            await self.ready.wait()
+        frames = list(self.frames)
+        self.frames.clear()
+        return frames
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self.frames),
+            "received": self.received,
+            "bytes_received": self.bytes_received,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "merged": self.merged,
+            "committed": self.committed,
+            "errors": self.errors,
+        }
+
+
+def decode_many(decode: Callable[[Any], Any], frames: list) -> list:
+    """
+    Runs in a pool worker, a frame that fails to decode is returned as its exception.
+    """
+    results = []
+    for frame in frames:
+        try:
+            results.append(decode(frame))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+class DecodePool:
+    """
+    Decodes a connector's frames in a thread or process pool instead of on the event loop.
+    A batch is split into chunks of `chunk` frames, results come back in the order of the frames.
+    Threads help as far as the decoder releases the GIL (zlib does, JSON parsing does not); processes take the whole
+    decode off the loop's interpreter at the cost of pickling frames and results.
+    `decode` must be a module-level function for the process pool.
+    """
+
+    def __init__(
+        self,
+        decode: Callable[[Any], Any],
+        kind: str = "thread",
+        workers: int = DECODE_POOL_WORKERS,
+        chunk: int = DECODE_POOL_CHUNK,
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown decode pool {kind!r}, choose thread or process")
+        self.decode_frame = decode
+        self.kind = kind
+        self.workers = workers
+        self.chunk = chunk
+        self.executor: Executor | None = None
+
+    def _executor(self) -> Executor:
+        if self.executor is None:
+            if self.kind == "thread":
+                self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="decode")
+            else:
+                # forking a process that runs threads (uvicorn, the HTTP pool) is unsafe
+                self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+
+    async def decode(self, frames: list) -> list:
+        loop = asyncio.get_running_loop()
+        executor = self._executor()
+        chunk = self.chunk
+        if len(frames) <= chunk:
+            return await loop.run_in_executor(executor, decode_many, self.decode_frame, frames)
+        parts = await asyncio.gather(
+            *(
+                loop.run_in_executor(executor, decode_many, self.decode_frame, frames[i : i + chunk])
+                for i in range(0, len(frames), chunk)
+            )
+        )
+        return [result for part in parts for result in part]
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
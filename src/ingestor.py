@@ -0,0 +1,105 @@
+import asyncio
+import multiprocessing
+import signal
+
+from markets.binance import BinanceWebSocket
+from markets.huobi import HuobiWebSocket
+from markets.kraken import KrakenWebSocket
+from markets.kucoin import KucoinWebSocket
+
+from . import bootstrap, metrics, persistence
+from .settings import DEMAND_SUBSCRIPTIONS, SHARED_STORE_PATH, SHARED_STORE_STATUS_INTERVAL, SNAPSHOT_PATH, logger
+from .shared import SharedQuoteWriter
+from .store import QuoteStore
+from .supervisor import Supervisor
+
+
+def connectors(db: QuoteStore) -> list:
+    return [
+        *BinanceWebSocket.sharded(db),
+        *HuobiWebSocket.sharded(db),
+        KrakenWebSocket(db),
+        KucoinWebSocket(db),
+    ]
+
+
+async def ingest(path: str, ready=None) -> None:
+    """
+    Runs every connector under a supervisor and mirrors the store into the shared file at `path`.
+    Connector status and the ingest metrics are published into the file for the API workers.
+    """
+    if DEMAND_SUBSCRIPTIONS:
+        logger.warning("[Ingest] DEMAND_SUBSCRIPTIONS is ignored in multi-worker mode, every pair is subscribed")
+    store = QuoteStore()
+    writer = SharedQuoteWriter(store, path)
+    snapshotter = None
+    if SNAPSHOT_PATH:
+        persistence.load(store, SNAPSHOT_PATH)
+        snapshotter = persistence.Snapshotter(store, SNAPSHOT_PATH)
+        snapshotter.start()
+    supervisor = Supervisor(connectors(store))
+    supervisor.start()
+    logger.info(f"[Ingest] writing quotes to {path}")
+    if ready is not None:
+        ready.set()
+    try:
+        while True:
+            text = metrics.render(store, supervisor.connectors, supervisor.states, {})
+            writer.write_status({"connectors": supervisor.status(), "metrics": text})
+            await asyncio.sleep(SHARED_STORE_STATUS_INTERVAL)
+    finally:
+        await supervisor.stop()
+        if snapshotter is not None:
+            await snapshotter.stop()
+        await bootstrap.close()
+        writer.close()
+
+
+async def serve(path: str, ready=None) -> None:
+    """
+    ingest() until SIGTERM or SIGINT, which cancel it: its finally still stops the connectors and their decode pools
+    and writes the last snapshot, where the default handler would kill the process on the spot.
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    signals = (signal.SIGTERM, signal.SIGINT)
+    for signum in signals:
+        loop.add_signal_handler(signum, task.cancel)
+    try:
+        await ingest(path, ready)
+    finally:
+        for signum in signals:
+            loop.remove_signal_handler(signum)
+
+
+def run(path: str = SHARED_STORE_PATH, ready=None) -> None:
+    try:
+        asyncio.run(serve(path, ready))
+    except asyncio.CancelledError:
+        logger.info("[Ingest] stopped")
+
+
+def start(path: str = SHARED_STORE_PATH, timeout: float = 30.0) -> multiprocessing.Process:
+    """
+    Starts the ingest process and returns once the shared file exists.
+    """
+    context = multiprocessing.get_context("spawn")
+    ready = context.Event()
+    process = context.Process(target=run, args=(path, ready), name="ingest", daemon=True)
+    process.start()
+    if not ready.wait(timeout):
+        process.terminate()
+        raise RuntimeError("Ingest process did not start")
+    return process
+
+
+def stop(process: multiprocessing.Process, timeout: float = 30.0) -> None:
+    """
+    Asks the ingest process to shut down and waits for it, it is killed if it has not exited after `timeout` seconds.
+    """
+    process.terminate()
+    process.join(timeout)
+    if process.is_alive():
+        logger.warning(f"[Ingest] process did not stop within {timeout}s, killing it")
+        process.kill()
+        process.join()
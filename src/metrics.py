@@ -0,0 +1,235 @@
+import time
+from array import array
+from bisect import bisect_left
+
+from .settings import METRICS_LAG_WINDOW, METRICS_LATENCY_BUCKETS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus sense, an observation is one bisect and two additions.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = METRICS_LATENCY_BUCKETS):
+        self.buckets = buckets
+        # the last counter is the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float, count: int = 1) -> None:
+        """
+        Records `count` observations of `value`, used for per-frame averages of a measured batch.
+        """
+        self.counts[bisect_left(self.buckets, value)] += count
+        self.sum += value * count
+        self.count += count
+
+
+class LagWindow:
+    """
+    Ring buffer of the latest lag samples in seconds, percentiles are computed over it when read.
+    """
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, size: int = METRICS_LAG_WINDOW):
+        self.samples = array("d", bytes(8 * size))
+        self.size = size
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self.samples[self.count % self.size] = value
+        self.count += 1
+
+    def quantiles(self) -> dict[float, float]:
+        if not self.count:
+            return {}
+        ordered = sorted(self.samples[: min(self.count, self.size)])
+        last = len(ordered) - 1
+        return {q: ordered[round(q * last)] for q in self.QUANTILES}
+
+    def to_dict(self) -> dict:
+        """
+        Percentiles in milliseconds for /status/.
+        """
+        return {f"p{round(q * 100)}": round(value * 1000, 3) for q, value in self.quantiles().items()}
+
+
+class ConnectorMetrics:
+    """
+    Timings of a connector's processing stage, counters live in its IngestQueue.
+    """
+
+    def __init__(self):
+        # exchange event time -> quote written to the store
+        self.lag = LagWindow()
+        self.decode = Histogram()
+        self.handle = Histogram()
+        self.commit = Histogram()
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+class Exposition:
+    """
+    Builder of the Prometheus text format, samples are grouped under one HELP/TYPE header per metric family.
+    """
+
+    def __init__(self):
+        self.families: dict[str, list[str]] = {}
+
+    def _family(self, name: str, kind: str, help: str) -> list[str]:
+        lines = self.families.get(name)
+        if lines is None:
+            lines = self.families[name] = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        return lines
+
+    def sample(self, name: str, kind: str, help: str, value: float, **labels) -> None:
+        self._family(name, kind, help).append(f"{name}{_labels(labels)} {value}")
+
+    def summary(self, name: str, help: str, window: LagWindow, **labels) -> None:
+        lines = self._family(name, "summary", help)
+        for q, value in window.quantiles().items():
+            lines.append(f"{name}{_labels({**labels, 'quantile': q})} {value}")
+
+    def histogram(self, name: str, help: str, histogram: Histogram, **labels) -> None:
+        lines = self._family(name, "histogram", help)
+        total = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            total += count
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {total}")
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        return "\n".join(line for lines in self.families.values() for line in lines) + "\n"
+
+
+############################################################################
+# /currency/ request latency
+############################################################################
+def query_shape(query_string: bytes) -> str:
+    """
+    all | exchange | delta | pair, the same dispatch as the /currency/ endpoint.
+    """
+    if not query_string:
+        return "all"
+    # names of the non-empty parameters, without percent-decoding: the endpoint's parameter names are plain ascii
+    params = {name for name, _, value in (item.partition(b"=") for item in query_string.split(b"&")) if value}
+    if b"exchange" not in params:
+        return "all" if not params else "invalid"
+    if b"pair" in params:
+        return "pair"
+    if b"since" in params:
+        return "delta"
+    return "exchange"
+
+
+class RequestLatency:
+    """
+    Pure ASGI middleware timing requests to the given paths from the call until the response is sent,
+    one histogram per (path, query shape) in the shared `histograms` dict.
+    """
+
+    def __init__(self, app, histograms: dict[tuple[str, str], Histogram], paths: tuple[str, ...] = ("/currency/",)):
+        self.app = app
+        self.histograms = histograms
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            key = (scope["path"], query_shape(scope["query_string"]))
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(time.perf_counter() - start)
+
+
+############################################################################
+# /metrics
+############################################################################
+def render(store, connectors: dict, states: dict, latency: dict[tuple[str, str], Histogram]) -> str:
+    """
+    Connectors: {label: connector}, states: {label: supervisor ConnectorState}, store may be None.
+    """
+    out = Exposition()
+    for name, connector in connectors.items():
+        # connections of a sharded exchange report under the exchange name and their own label
+        labels = (
+            {"exchange": connector.name} if name == connector.name else {"exchange": connector.name, "connection": name}
+        )
+        queue = connector.queue
+        counters = (
+            ("ingest_messages_total", "Frames received from the exchange socket.", queue.received),
+            ("ingest_bytes_total", "Bytes of frames received from the exchange socket.", queue.bytes_received),
+            ("ingest_dropped_total", "Frames dropped because the ingest queue was full.", queue.dropped),
+            ("ingest_processed_total", "Frames decoded by the processing stage.", queue.processed),
+            ("ingest_ticks_committed_total", "Quotes written to the store.", queue.committed),
+            ("ingest_errors_total", "Frames or quotes rejected by the processing stage.", queue.errors),
+        )
+        for metric, help, value in counters:
+            out.sample(metric, "counter", help, value, **labels)
+        out.sample("ingest_queue_depth", "gauge", "Frames waiting in the ingest queue.", len(queue), **labels)
+        state = states.get(name)
+        if state is not None:
+            out.sample("connector_reconnects_total", "counter", "Connector restarts.", state.restarts, **labels)
+            out.sample(
+                "connector_up",
+                "gauge",
+                "1 while the connector is receiving data.",
+                int(state.status == "running"),
+                **labels,
+            )
+        heartbeat = connector.heartbeat
+        out.summary("connector_heartbeat_rtt_seconds", "Keepalive ping round-trip time.", heartbeat.rtt, **labels)
+        out.sample(
+            "connector_heartbeat_timeouts_total",
+            "counter",
+            "Connections closed because a keepalive ping went unanswered.",
+            heartbeat.timeouts,
+            **labels,
+        )
+        metrics = connector.metrics
+        if metrics is not None:
+            out.summary(
+                "ingest_lag_seconds", "Exchange event time to store write, recent quotes.", metrics.lag, **labels
+            )
+            out.histogram("ingest_decode_seconds", "Frame decode time.", metrics.decode, **labels)
+            out.histogram(
+                "ingest_handle_seconds",
+                "Per-frame time from decoded data to merged ticks.",
+                metrics.handle,
+                **labels,
+            )
+            out.histogram("ingest_commit_seconds", "Store commit time of a processed batch.", metrics.commit, **labels)
+
+    # None in the API workers of the multi-worker mode, the ingest process reports the store
+    for name, table in store.exchanges.items() if store is not None else ():
+        out.sample("store_pairs", "gauge", "Pairs cached per exchange.", len(table), exchange=name)
+        out.sample(
+            "store_bytes", "gauge", "Approximate memory of the exchange quote table.", table.nbytes(), exchange=name
+        )
+        out.sample(
+            "store_version", "gauge", "Updates applied to the exchange since start.", store.version(name), exchange=name
+        )
+    if store is not None:
+        out.sample("store_index_pairs", "gauge", "Pairs in the cross-exchange index.", len(store.index))
+
+    for (path, shape), histogram in latency.items():
+        out.histogram(
+            "http_request_duration_seconds", "Request latency by query shape.", histogram, path=path, shape=shape
+        )
+    return out.render()
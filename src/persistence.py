@@ -0,0 +1,219 @@
+"""
+Warm-start snapshots of the quote store.
+
+File format (little endian), one block per exchange after the header:
+    header      magic, format, exchange count, written at (unix seconds)
+    exchange    name length + name, pair count, price mode,
+                received-at column (float64), event-time column (float64), then by price mode:
+                TEXT_PRICES     flags (uint8: ask/bid were JSON numbers),
+                                length + newline-separated text: the symbols, then the raw asks, then the raw bids
+                NUMBER_PRICES   ask and bid columns (float64), length + newline-separated symbols
+Exchanges sending prices as JSON numbers (Huobi) have them written as the float columns of the table,
+formatting thousands of floats as text would cost more than the rest of the snapshot.
+
+Taking a snapshot copies the columns on the event loop (list and array copies, no per-quote Python work);
+encoding and the atomic file replace run in a worker thread.
+"""
+import asyncio
+import os
+import struct
+import time
+from array import array
+from typing import Iterator
+
+from .settings import SNAPSHOT_INTERVAL, SNAPSHOT_MAX_AGE, SNAPSHOT_PATH, logger
+from .store import QuoteStore
+from .symbols import registry
+
+MAGIC = b"CMSSNAP1"
+FORMAT = 1
+HEADER = struct.Struct("<8sIId")
+COUNT = struct.Struct("<I")
+NAME = struct.Struct("<H")
+MODE = struct.Struct("<B")
+TEXT_PRICES = 0
+NUMBER_PRICES = 1
+ASK_NUMBER = 1
+BID_NUMBER = 2
+
+
+def capture(store: QuoteStore) -> list[tuple]:
+    """
+    Copies of every table's columns, cheap enough to take on the event loop.
+    """
+    tables = []
+    for name, table in store.exchanges.items():
+        count = len(table.symbols)
+        tables.append(
+            (
+                name,
+                table.symbols[:],
+                table.raw_ask[:],
+                table.raw_bid[:],
+                table.updated[:count],
+                table.event[:count],
+                # the float columns hold the exact values of numeric raw prices, scaled integer columns do not
+                table.ask[:count] if table.price_type == "d" else None,
+                table.bid[:count] if table.price_type == "d" else None,
+            )
+        )
+    return tables
+
+
+def _kinds(asks: list, bids: list) -> set[type]:
+    return set(map(type, asks)) | set(map(type, bids))
+
+
+def encode(tables: list[tuple], written_at: float) -> Iterator[bytes]:
+    """
+    The snapshot file in parts, one per exchange.
+    """
+    yield HEADER.pack(MAGIC, FORMAT, len(tables), written_at)
+    for name, symbols, asks, bids, updated, event, ask_column, bid_column in tables:
+        encoded_name = name.encode()
+        parts = [NAME.pack(len(encoded_name)), encoded_name, COUNT.pack(len(symbols))]
+        kinds = _kinds(asks, bids)
+        if ask_column is not None and kinds and str not in kinds:
+            text = "\n".join(symbols).encode()
+            parts += (MODE.pack(NUMBER_PRICES), updated.tobytes(), event.tobytes())
+            parts += (ask_column.tobytes(), bid_column.tobytes())
+        else:
+            if kinds <= {str}:
+                flags = bytes(len(symbols))
+            else:
+                flags = bytes(
+                    (ASK_NUMBER if not isinstance(ask, str) else 0) | (BID_NUMBER if not isinstance(bid, str) else 0)
+                    for ask, bid in zip(asks, bids)
+                )
+            text = "\n".join((*symbols, *map(str, asks), *map(str, bids))).encode()
+            parts += (MODE.pack(TEXT_PRICES), updated.tobytes(), event.tobytes(), flags)
+        parts += (COUNT.pack(len(text)), text)
+        yield b"".join(parts)
+
+
+def _column(data: bytes, offset: int, count: int) -> array:
+    column = array("d")
+    column.frombytes(data[offset : offset + 8 * count])
+    return column
+
+
+def decode(data: bytes) -> tuple[float, list[tuple]]:
+    """
+    (written at, [(exchange, symbols, asks, bids, received at, event time)]).
+    """
+    magic, version, exchanges, written_at = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != FORMAT:
+        raise ValueError("Not a quote store snapshot")
+    offset = HEADER.size
+    tables = []
+    for _ in range(exchanges):
+        (length,) = NAME.unpack_from(data, offset)
+        offset += NAME.size
+        name = data[offset : offset + length].decode()
+        offset += length
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        (mode,) = MODE.unpack_from(data, offset)
+        offset += MODE.size
+        updated, event = _column(data, offset, count), _column(data, offset + 8 * count, count)
+        offset += 16 * count
+        if mode == NUMBER_PRICES:
+            asks, bids = _column(data, offset, count).tolist(), _column(data, offset + 8 * count, count).tolist()
+            offset += 16 * count
+        else:
+            flags = data[offset : offset + count]
+            offset += count
+        (length,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        lines = data[offset : offset + length].decode().split("\n") if count else []
+        offset += length
+        symbols = lines[:count]
+        if mode != NUMBER_PRICES:
+            asks = [float(ask) if flag & ASK_NUMBER else ask for ask, flag in zip(lines[count : 2 * count], flags)]
+            bids = [float(bid) if flag & BID_NUMBER else bid for bid, flag in zip(lines[2 * count :], flags)]
+        tables.append((name, symbols, asks, bids, updated, event))
+    return written_at, tables
+
+
+def write(path: str, tables: list[tuple], written_at: float) -> int:
+    """
+    Runs in a worker thread. Encoding holds the GIL, so it is handed back to the event loop after every exchange
+    instead of after the interpreter's switch interval.
+    """
+    size = 0
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        for part in encode(tables, written_at):
+            size += file.write(part)
+            time.sleep(0)
+    os.replace(temporary, path)
+    return size
+
+
+def load(store: QuoteStore, path: str = SNAPSHOT_PATH, max_age: float = SNAPSHOT_MAX_AGE) -> int:
+    """
+    Fills the store from a snapshot, quotes older than max_age seconds are left out.
+    Loaded quotes keep their original receive and event times and are flagged as stale until the feed updates them.
+    """
+    try:
+        with open(path, "rb") as file:
+            written_at, tables = decode(file.read())
+    except FileNotFoundError:
+        return 0
+    except (ValueError, struct.error, UnicodeDecodeError) as e:
+        logger.error(f"[Snapshot] ignoring unreadable snapshot {path}: {e}")
+        return 0
+    cutoff = time.time() - max_age
+    loaded = 0
+    for name, symbols, asks, bids, updated, event in tables:
+        quotes = {}
+        for i, pair in enumerate(symbols):
+            # snapshots written before the canonical names (src/symbols.py) hold exchange names such as XBTUSD
+            pair = registry.resolve(pair)
+            if updated[i] < cutoff or pair in store.exchanges.get(name, ()):
+                continue
+            quotes[pair] = (asks[i], bids[i], event[i], updated[i])
+        if quotes:
+            loaded += len(quotes) - len(store.update_many(name, quotes, restored=True))
+    logger.info(f"[Snapshot] loaded {loaded} quotes written {time.time() - written_at:.0f}s ago from {path}")
+    return loaded
+
+
+class Snapshotter:
+    """
+    Writes the store to `path` every `interval` seconds while it changed, and once more when stopped.
+    """
+
+    def __init__(self, store: QuoteStore, path: str = SNAPSHOT_PATH, interval: float = SNAPSHOT_INTERVAL):
+        self.store = store
+        self.path = path
+        self.interval = interval
+        self.written_version = -1
+        self.task: asyncio.Task | None = None
+
+    async def save(self) -> None:
+        version = self.store.version()
+        if version == self.written_version:
+            return
+        tables = capture(self.store)
+        try:
+            await asyncio.to_thread(write, self.path, tables, time.time())
+        except OSError as e:
+            logger.error(f"[Snapshot] could not write {self.path}: {e}")
+            return
+        self.written_version = version
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.save()
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self.run(), name="snapshot")
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await self.save()
@@ -0,0 +1,29 @@
+from decimal import ROUND_HALF_EVEN, Decimal, InvalidOperation
+
+# Scaled integer prices: 10 decimal places fit every spot market quoted by the supported exchanges
+PRICE_DECIMALS = 10
+PRICE_SCALE = 10**PRICE_DECIMALS
+# ask + bid of two max prices must still fit a signed 64-bit column
+MAX_PRICE = (2**63 - 1) // (2 * PRICE_SCALE)
+# below 2^51 units float(text) * PRICE_SCALE is off by less than half a unit, so rounding it is exact
+FAST_PATH_LIMIT = 2**51 / PRICE_SCALE
+
+_QUANTUM = Decimal(1).scaleb(-PRICE_DECIMALS)
+
+
+def parse_price(value) -> int:
+    """
+    Exchange price ("65000.01000000", or a number) to an integer count of 10^-PRICE_DECIMALS units.
+    Decimal strings with up to PRICE_DECIMALS places convert exactly, extra places are rounded half-even.
+    """
+    price = float(value)
+    if 0 <= price < FAST_PATH_LIMIT:
+        return round(price * PRICE_SCALE)
+    # big prices, negatives, nan and inf
+    try:
+        scaled = int(Decimal(str(value)).quantize(_QUANTUM, rounding=ROUND_HALF_EVEN).scaleb(PRICE_DECIMALS))
+    except (InvalidOperation, ValueError) as e:
+        raise ValueError(f"could not convert to price: {value!r}") from e
+    if not 0 <= scaled <= MAX_PRICE * PRICE_SCALE:
+        raise ValueError(f"price out of range: {value!r}")
+    return scaled
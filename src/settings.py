@@ -1,4 +1,6 @@
 import logging.config
+import os
+import tempfile
 
 from loguru import logger
 
@@ -27,19 +29,179 @@ logger.level("INFO" if not DEBUG else "DEBUG")
 MARKETS = {
     "Kraken": {
         "name": "kraken",
+        "fixed_point_prices": False,
         "endpoint": "wss://ws.kraken.com/",
         "pairs_endpoint": "https://api.kraken.com/0/public/AssetPairs",
     },
     "Binance": {
         "name": "binance",
+        "fixed_point_prices": False,
         "endpoint": "wss://stream.binance.com:9443/ws/!ticker@arr",
+        # "ticker": !ticker@arr, every symbol's 24h ticker about once a second
+        # "book": <symbol>@bookTicker streams, best bid/ask as they change, over combined-stream connections
+        "mode": os.environ.get("BINANCE_MODE", "ticker"),
+        "book_endpoint": "wss://stream.binance.com:9443/stream",
+        "pairs_endpoint": "https://api.binance.com/api/v3/exchangeInfo?permissions=SPOT",
+        "book_connections": 3,
+        # Binance limits: 1024 streams per connection, 5 incoming messages (pongs included) per second per connection
+        "streams_per_connection": 1024,
+        "subscribe_rate": 4,
+        # streams per SUBSCRIBE request
+        "subscribe_batch": 200,
     },
     "Huobi": {
         "name": "huobi",
+        "fixed_point_prices": False,
         "endpoint": "wss://api.huobi.pro/ws",
         "pairs_endpoint": "https://api.huobi.pro/v1/common/symbols",
+        # connections the symbol subscriptions are spread over, each one is supervised on its own
+        "shards": int(os.environ.get("HUOBI_SHARDS", "1")),
+        # subscription requests sent before the receive loop gets a turn
+        "subscribe_batch": 100,
+        # "thread" or "process" decodes the gzip-compressed frames off the event loop, empty decodes them inline
+        "decode_pool": os.environ.get("HUOBI_DECODE_POOL", ""),
     },
     "Kucoin": {
         "name": "kucoin",
+        "fixed_point_prices": False,
+        # returns the websocket endpoint and a connection token
+        "token_endpoint": "https://api.kucoin.com/api/v1/bullet-public",
     },
 }
+
+# Exchanges whose prices are parsed into exact scaled integers instead of floats (see src/prices.py).
+# The ask_bid_average is then exact instead of rounded to 5 decimals, which matters for low-priced assets.
+FIXED_POINT_EXCHANGES = {market["name"] for market in MARKETS.values() if market.get("fixed_point_prices")}
+
+# Serialized /currency/ bodies are cached per store version, big bodies are also kept gzip-compressed
+RESPONSE_GZIP = True
+RESPONSE_GZIP_MIN_SIZE = 1024
+RESPONSE_GZIP_LEVEL = 5
+
+# /stream: a client buffers only the latest quote per pair, this caps the pairs it can subscribe to one by one
+STREAM_MAX_SUBSCRIPTIONS = 1000
+
+# Canonical pair names (src/symbols.py): exchange-specific asset codes mapped to the common code, and the quote assets
+# a symbol without separator (Binance BTCUSDT, Huobi btcusdt) is split on, longest match first
+ASSET_ALIASES = {"XBT": "BTC", "XDG": "DOGE"}
+QUOTE_ASSETS = (
+    "USDT",
+    "USDC",
+    "USDD",
+    "BUSD",
+    "FDUSD",
+    "TUSD",
+    "DAI",
+    "USD",
+    "EUR",
+    "GBP",
+    "JPY",
+    "TRY",
+    "BRL",
+    "BTC",
+    "ETH",
+    "BNB",
+    "HT",
+    "TRX",
+    "KCS",
+    "DOT",
+)
+
+# Initial number of pair slots per exchange in the quote store, columns double when full
+QUOTE_TABLE_CAPACITY = 1024
+
+# JSON backend for exchange frames and responses: "auto" picks orjson when installed, otherwise "json"
+JSON_CODEC = os.environ.get("JSON_CODEC", "auto")
+
+# Connector supervisor: restart delay doubles from the initial value up to the max (with jitter),
+# a feed without any frame for STALL_TIMEOUT seconds is treated as dead and reconnected
+SUPERVISOR_BACKOFF_INITIAL = 1.0
+SUPERVISOR_BACKOFF_MAX = 60.0
+SUPERVISOR_STALL_TIMEOUT = 60.0
+
+# Connection keepalive (src/heartbeat.py): a ping every HEARTBEAT_INTERVAL seconds, a connection whose ping is not
+# answered within HEARTBEAT_TIMEOUT seconds is closed and reconnected. KuCoin's interval and timeout come with its
+# connection token, Huobi pings the client and is closed after HEARTBEAT_TIMEOUT seconds without a ping.
+HEARTBEAT_INTERVAL = 15.0
+HEARTBEAT_TIMEOUT = 30.0
+
+# Raw frames buffered between a connector's socket loop and its processing stage, the oldest are dropped when full
+INGEST_QUEUE_SIZE = 1000
+# Connectors with a decode pool (Huobi: HUOBI_DECODE_POOL=thread|process) decode frames in this many workers,
+# a processed batch is split into chunks of DECODE_POOL_CHUNK frames
+DECODE_POOL_WORKERS = 2
+DECODE_POOL_CHUNK = 512
+
+# /metrics: per-connector processing timings and /currency/ latency histograms, counters are always kept
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+# lag percentiles are taken over the latest samples per exchange
+METRICS_LAG_WINDOW = 1024
+METRICS_LATENCY_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+# Multi-worker mode: with API_WORKERS > 1 main.py runs the connectors in one ingest process that mirrors the store
+# into a memory-mapped file, the API workers read quotes from it (src/shared.py)
+API_WORKERS = int(os.environ.get("API_WORKERS", "1"))
+SHARED_STORE_PATH = os.environ.get(
+    "SHARED_STORE_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "coin_market_scraper.quotes"),
+)
+# set by main.py for the API workers
+SHARED_STORE_READER = os.environ.get("SHARED_STORE_READER") == "1"
+# pair slots per exchange, the shared file is sized once
+SHARED_STORE_CAPACITY = 8192
+SHARED_STORE_STATUS_SIZE = 256 * 1024
+# workers check the shared versions this often to feed /stream, the ingest process publishes /status/ this often
+SHARED_STORE_POLL_INTERVAL = 0.05
+SHARED_STORE_STATUS_INTERVAL = 1.0
+
+# Warm start: the quote store is written to SNAPSHOT_PATH every SNAPSHOT_INTERVAL seconds and loaded on startup,
+# quotes older than SNAPSHOT_MAX_AGE seconds are not loaded. An empty path turns snapshots off.
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", "quotes.snapshot")
+SNAPSHOT_INTERVAL = 10.0
+SNAPSHOT_MAX_AGE = 3600.0
+
+# REST bootstrap: every connector shares one pooled HTTP session. Symbol catalogs are cached in memory and in
+# CATALOG_CACHE_DIR for CATALOG_TTL seconds; an expired catalog is still used while it is refreshed in the background.
+# An empty directory keeps catalogs in memory only.
+HTTP_TIMEOUT = 10.0
+HTTP_POOL_SIZE = 16
+HTTP_KEEPALIVE = 60.0
+CATALOG_CACHE_DIR = os.environ.get("CATALOG_CACHE_DIR", "catalogs")
+CATALOG_TTL = 3600.0
+# a Kucoin connection token is reused by reconnects for this long, a connection refused with it fetches a new one
+KUCOIN_TOKEN_TTL = 3600.0
+
+# Demand mode: the DEMAND_EXCHANGES connectors subscribe only to DEMAND_ALWAYS_ON and to the pairs clients ask for
+# with /currency/?exchange=&pair=. The first request of a pair waits up to DEMAND_WAIT seconds for its first quote,
+# pairs nobody asked for within DEMAND_TTL seconds are unsubscribed and their last quote is flagged as stale.
+# Single-process mode only, the API workers of the multi-worker mode cannot reach the connectors.
+DEMAND_SUBSCRIPTIONS = os.environ.get("DEMAND_SUBSCRIPTIONS") == "1"
+DEMAND_EXCHANGES = ("kraken", "huobi")
+DEMAND_ALWAYS_ON = {
+    pair for pair in os.environ.get("DEMAND_ALWAYS_ON", "BTCUSDT,ETHUSDT,BTCUSD,ETHUSD").split(",") if pair
+}
+DEMAND_WAIT = 2.0
+DEMAND_TTL = 600.0
+
+# Tick history (src/history.py): the last HISTORY_DEPTH (receive time, bid, ask) ticks of every pair are kept in
+# preallocated rings for /history/. Rings are allocated on a pair's first tick until they take HISTORY_MEMORY_BUDGET
+# bytes, later pairs get no history. HISTORY_DEPTH=0 turns it off. Single-process mode only.
+HISTORY_DEPTH = int(os.environ.get("HISTORY_DEPTH", "512"))
+HISTORY_MEMORY_BUDGET = int(os.environ.get("HISTORY_MEMORY_BUDGET", str(64 * 1024 * 1024)))
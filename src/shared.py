@@ -0,0 +1,462 @@
+"""
+Quote store shared between one ingest process and the API workers through a memory-mapped file.
+
+Layout (little endian, every field 8-byte aligned):
+    header      magic, capacity, ring size, aggregated version, store epoch, exchange names, status blob seq/length
+    status      JSON blob written by the ingest process (/status/ and the ingest part of /metrics)
+    per exchange, in MARKETS order:
+        counters    slots in use, exchange version, ring head, frame sequence
+        records     `capacity` fixed-size quote records, a record keeps the slot of the QuoteTable it mirrors
+        ring        the last `ring size` writes as version << 20 | slot, the change log readers walk for deltas
+
+Records and the status blob are seqlocks: the writer makes the sequence odd, writes, makes it even again,
+a reader retries while the sequence is odd or changed under it. Readers never take a lock and never block the writer.
+A store update (a connector's frame) is a seqlock over the whole exchange section too: readers of several records
+(a whole exchange, a delta) copy the section under the frame sequence and see a frame entirely or not at all.
+Counters are single aligned 8-byte stores. Python has no memory fences, so this relies on the writer's stores becoming
+visible in program order (x86 TSO, and in practice the mmap writes CPython issues on arm64).
+"""
+import mmap
+import os
+import struct
+import time
+from typing import Callable, Iterator
+
+from .codec import dumps, loads
+from .exceptions import SharedStoreError
+from .settings import MARKETS, SHARED_STORE_CAPACITY, SHARED_STORE_STATUS_SIZE, logger
+from .store import AGGREGATED, QuoteStore
+
+MAGIC = b"CMSQUOT1"
+EXCHANGES = tuple(market["name"] for market in MARKETS.values())
+NAME_SIZE = 16
+TEXT_SIZE = 32
+SLOT_BITS = 20
+
+U64 = struct.Struct("<Q")
+# slots in use, exchange version, ring head, frame sequence
+COUNTERS = struct.Struct("<QQQQ")
+HEADER = struct.Struct(f"<8sQQQ{TEXT_SIZE}s" + f"{NAME_SIZE}s" * len(EXCHANGES) + "QQ")
+HEADER_SIZE = 4096
+# version, ask_bid_average, received at, event time, flags, symbol, ask, bid
+BODY = struct.Struct(f"<QdddB7x{TEXT_SIZE}s{TEXT_SIZE}s{TEXT_SIZE}s")
+RECORD_SIZE = 8 + BODY.size
+COUNTERS_SIZE = 64
+# raw ask/bid came as JSON numbers (Huobi), not strings
+ASK_NUMBER = 1
+BID_NUMBER = 2
+# restored from a snapshot, not refreshed by the feed yet
+STALE = 4
+# header offsets
+AGGREGATED_OFFSET = 8 + 8 + 8
+STATUS_SEQ_OFFSET = HEADER.size - 16
+STATUS_LENGTH_OFFSET = HEADER.size - 8
+RETRIES = 100000
+
+
+def _exchange_size(capacity: int, ring_size: int) -> int:
+    return COUNTERS_SIZE + capacity * RECORD_SIZE + ring_size * 8
+
+
+def segment_size(capacity: int, ring_size: int) -> int:
+    return HEADER_SIZE + SHARED_STORE_STATUS_SIZE + len(EXCHANGES) * _exchange_size(capacity, ring_size)
+
+
+def _text(value: bytes) -> str:
+    return value.rstrip(b"\0").decode("ascii")
+
+
+class Segment:
+    """
+    Mapped file and the offsets of every exchange section.
+    """
+
+    def __init__(self, path: str, writable: bool):
+        self.path = path
+        with open(path, "r+b" if writable else "rb") as file:
+            access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            self.buf = mmap.mmap(file.fileno(), 0, access=access)
+        magic, self.capacity, self.ring_size, _, epoch, *names, _, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC:
+            raise SharedStoreError(path, msg="Not a shared quote store. ")
+        self.epoch = _text(epoch)
+        self.names = [_text(name) for name in names]
+        size = _exchange_size(self.capacity, self.ring_size)
+        base = HEADER_SIZE + SHARED_STORE_STATUS_SIZE
+        # {exchange: (counters offset, records offset, ring offset)}
+        self.sections = {
+            name: (
+                base + i * size,
+                base + i * size + COUNTERS_SIZE,
+                base + i * size + COUNTERS_SIZE + self.capacity * RECORD_SIZE,
+            )
+            for i, name in enumerate(self.names)
+        }
+
+    @classmethod
+    def create(cls, path: str, epoch: str, capacity: int = SHARED_STORE_CAPACITY) -> "Segment":
+        ring_size = 4 * capacity
+        with open(path, "wb") as file:
+            file.truncate(segment_size(capacity, ring_size))
+            names = [name.encode("ascii") for name in EXCHANGES]
+            file.write(HEADER.pack(MAGIC, capacity, ring_size, 0, epoch.encode("ascii"), *names, 0, 0))
+        return cls(path, writable=True)
+
+    def close(self) -> None:
+        self.buf.close()
+
+    def read_record(self, offset: int) -> tuple:
+        buf = self.buf
+        for _ in range(RETRIES):
+            seq = U64.unpack_from(buf, offset)[0]
+            if not seq & 1:
+                fields = BODY.unpack_from(buf, offset + 8)
+                if U64.unpack_from(buf, offset)[0] == seq:
+                    return fields
+            # a writer thread of this process may have been switched out mid-record
+            time.sleep(0)
+        raise SharedStoreError(offset, msg="Shared record kept changing, the writer may have died mid-write. ")
+
+    def read_status(self) -> dict:
+        buf = self.buf
+        for _ in range(RETRIES):
+            seq = U64.unpack_from(buf, STATUS_SEQ_OFFSET)[0]
+            if seq & 1:
+                continue
+            length = U64.unpack_from(buf, STATUS_LENGTH_OFFSET)[0]
+            blob = buf[HEADER_SIZE : HEADER_SIZE + length]
+            if U64.unpack_from(buf, STATUS_SEQ_OFFSET)[0] == seq:
+                return loads(blob) if blob else {}
+        raise SharedStoreError(msg="Shared status kept changing. ")
+
+
+class SharedQuoteWriter:
+    """
+    Mirrors every write of a QuoteStore into the segment, registered as a store listener in the ingest process.
+    """
+
+    def __init__(self, store: QuoteStore, path: str, capacity: int = SHARED_STORE_CAPACITY):
+        self.store = store
+        self.segment = Segment.create(path, store.epoch, capacity)
+        self.capacity = capacity
+        self.ring_size = self.segment.ring_size
+        # slots in use and ring heads, mirrored in the segment counters
+        self.counts = dict.fromkeys(self.segment.sections, 0)
+        self.heads = dict.fromkeys(self.segment.sections, 0)
+        # frame sequence of every exchange, odd while an update is being written
+        self.frames = dict.fromkeys(self.segment.sections, 0)
+        self.skipped: set[tuple[str, str]] = set()
+        store.subscribe(self.write)
+
+    def write(self, exchange: str, pairs: list[str]) -> None:
+        """
+        Writes the records of one store update, then publishes them: the ring heads and the versions readers
+        follow are moved once, after the last record of the update. The frame sequence is odd meanwhile.
+        """
+        section = self.segment.sections.get(exchange)
+        if section is None:
+            return
+        table = self.store.exchanges[exchange]
+        buf = self.segment.buf
+        counters, records, ring = section
+        versions = self.store.versions
+        version = versions[exchange]
+        count = self.counts[exchange]
+        head = self.heads[exchange]
+        frame = self.frames[exchange]
+        U64.pack_into(buf, counters + 24, frame + 1)
+        for pair in pairs:
+            slot = table.ids[pair]
+            ask, bid = table.raw_ask[slot], table.raw_bid[slot]
+            flags = (ASK_NUMBER if not isinstance(ask, str) else 0) | (BID_NUMBER if not isinstance(bid, str) else 0)
+            if table.restored and slot in table.restored:
+                flags |= STALE
+            ask = (ask if isinstance(ask, str) else str(ask)).encode("ascii")
+            bid = (bid if isinstance(bid, str) else str(bid)).encode("ascii")
+            if slot >= self.capacity or len(pair) > TEXT_SIZE or len(ask) > TEXT_SIZE or len(bid) > TEXT_SIZE:
+                if (exchange, pair) not in self.skipped:
+                    self.skipped.add((exchange, pair))
+                    logger.error(
+                        f"[SharedStore] {exchange} {pair} does not fit the shared store, capacity: {self.capacity}"
+                    )
+                continue
+
+            offset = records + slot * RECORD_SIZE
+            # the writer is the only one touching the segment, the sequence of a record is derived from its version
+            U64.pack_into(buf, offset, 2 * version - 1)
+            BODY.pack_into(
+                buf,
+                offset + 8,
+                version,
+                table.mid[slot] / table.mid_scale,
+                table.updated[slot],
+                table.event[slot],
+                flags,
+                pair.encode("ascii"),
+                ask,
+                bid,
+            )
+            U64.pack_into(buf, offset, 2 * version)
+            if slot >= count:
+                count = slot + 1
+            U64.pack_into(buf, ring + (head % self.ring_size) * 8, version << SLOT_BITS | slot)
+            head += 1
+
+        if head != self.heads[exchange]:
+            if count != self.counts[exchange]:
+                self.counts[exchange] = count
+                U64.pack_into(buf, counters, count)
+            self.heads[exchange] = head
+            U64.pack_into(buf, counters + 16, head)
+            U64.pack_into(buf, counters + 8, version)
+            U64.pack_into(buf, AGGREGATED_OFFSET, versions[AGGREGATED])
+        self.frames[exchange] = frame + 2
+        U64.pack_into(buf, counters + 24, frame + 2)
+
+    def write_status(self, status: dict) -> None:
+        blob = dumps(status)
+        if len(blob) > SHARED_STORE_STATUS_SIZE:
+            logger.error(f"[SharedStore] status of {len(blob)} bytes does not fit SHARED_STORE_STATUS_SIZE")
+            return
+        buf = self.segment.buf
+        seq = U64.unpack_from(buf, STATUS_SEQ_OFFSET)[0]
+        U64.pack_into(buf, STATUS_SEQ_OFFSET, seq + 1)
+        buf[HEADER_SIZE : HEADER_SIZE + len(blob)] = blob
+        U64.pack_into(buf, STATUS_LENGTH_OFFSET, len(blob))
+        U64.pack_into(buf, STATUS_SEQ_OFFSET, seq + 2)
+
+    def close(self) -> None:
+        self.segment.close()
+
+
+class SharedQuoteTable:
+    """
+    Read side of one exchange section with the QuoteTable read interface.
+    Symbols never move once a slot is assigned, so the pair -> slot map is only extended when the slot count grows.
+    """
+
+    def __init__(self, segment: Segment, name: str):
+        self.segment = segment
+        self.name = name
+        self.counters, self.records, self.ring = segment.sections[name]
+        self._ids: dict[str, int] = {}
+        self.symbols: list[str] = []
+
+    def count(self) -> int:
+        return U64.unpack_from(self.segment.buf, self.counters)[0]
+
+    def version(self) -> int:
+        return U64.unpack_from(self.segment.buf, self.counters + 8)[0]
+
+    def refresh(self) -> None:
+        count = self.count()
+        for slot in range(len(self.symbols), count):
+            symbol = _text(self.record(slot)[5])
+            # empty for a slot the writer had to skip
+            if symbol:
+                self._ids[symbol] = slot
+            self.symbols.append(symbol)
+
+    @property
+    def ids(self) -> dict[str, int]:
+        self.refresh()
+        return self._ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, pair: str) -> bool:
+        return pair in self.ids
+
+    def __iter__(self) -> Iterator[str]:
+        self.refresh()
+        return iter(list(self.symbols))
+
+    def record(self, slot: int) -> tuple:
+        return self.segment.read_record(self.records + slot * RECORD_SIZE)
+
+    @staticmethod
+    def _quote(fields: tuple) -> dict:
+        _, mid, received, _, flags, _, ask, bid = fields
+        ask, bid = _text(ask), _text(bid)
+        quote = {
+            "ask": float(ask) if flags & ASK_NUMBER else ask,
+            "bid": float(bid) if flags & BID_NUMBER else bid,
+            "ask_bid_average": mid,
+        }
+        if flags & STALE:
+            quote["stale"] = True
+            quote["updated_at"] = received
+        return quote
+
+    def quote(self, slot: int) -> dict:
+        return self._quote(self.record(slot))
+
+    def get(self, pair: str) -> dict | None:
+        slot = self.ids.get(pair)
+        return None if slot is None else self.quote(slot)
+
+    def age(self, slot: int, now: float) -> float:
+        _, _, received, event, *_ = self.record(slot)
+        return now - (event if event and event < received else received)
+
+    def frame(self) -> tuple[int, int, bytes, bytes]:
+        """
+        (slots in use, ring head, records, ring) copied between two store updates, so the copy holds every update
+        entirely or not at all. The copy is a memcpy, short enough to fit between the writer's frames.
+        """
+        buf, counters = self.segment.buf, self.counters
+        for _ in range(RETRIES):
+            seq = U64.unpack_from(buf, counters + 24)[0]
+            if not seq & 1:
+                count, _, head, _ = COUNTERS.unpack_from(buf, counters)
+                records = buf[self.records : self.records + count * RECORD_SIZE]
+                ring = buf[self.ring : self.ring + self.segment.ring_size * 8]
+                if U64.unpack_from(buf, counters + 24)[0] == seq:
+                    return count, head, records, ring
+            # an update takes longer than the copy, let a writer in the same process finish it
+            time.sleep(0)
+        raise SharedStoreError(self.name, msg="Shared section kept changing, the writer may have died mid-update. ")
+
+    def _name(self, slot: int, fields: tuple) -> str:
+        return self.symbols[slot] if slot < len(self.symbols) else _text(fields[5])
+
+    def as_dict(self) -> dict:
+        self.refresh()
+        count, _, records, _ = self.frame()
+        result = {}
+        for slot in range(count):
+            fields = BODY.unpack_from(records, slot * RECORD_SIZE + 8)
+            # empty for a slot the writer had to skip
+            if fields[5][0]:
+                result[self._name(slot, fields)] = self._quote(fields)
+        return result
+
+    def recent(self, since: int, max_age: float | None) -> Iterator[tuple[str, dict]]:
+        """
+        (pair, quote) written after version `since`, newest first, with the stop rules of QuoteStore._recent.
+        Walks a copy of the ring (see frame()); when the ring no longer reaches back to `since`, falls back to
+        a scan of all records of the copy.
+        """
+        self.refresh()
+        count, head, records, ring = self.frame()
+        ring_size = self.segment.ring_size
+        cutoff = -1.0 if max_age is None else time.time() - max_age
+        seen = set()
+        result = []
+        position = head - 1
+        complete = False
+        while position >= 0 and position >= head - ring_size:
+            entry = U64.unpack_from(ring, (position % ring_size) * 8)[0]
+            position -= 1
+            if entry >> SLOT_BITS <= since:
+                complete = True
+                break
+            slot = entry & ((1 << SLOT_BITS) - 1)
+            if slot in seen:
+                continue
+            seen.add(slot)
+            fields = BODY.unpack_from(records, slot * RECORD_SIZE + 8)
+            if fields[2] < cutoff:
+                # like QuoteStore._recent, an old restored quote does not end the walk
+                if fields[4] & STALE:
+                    continue
+                complete = True
+                break
+            if fields[3] and fields[3] < cutoff:
+                continue
+            result.append((self._name(slot, fields), self._quote(fields)))
+        if complete or position < 0:
+            return iter(result)
+        return self._scan(count, records, since, cutoff)
+
+    def _scan(self, count: int, records: bytes, since: int, cutoff: float) -> Iterator[tuple[str, dict]]:
+        fields = [(slot, BODY.unpack_from(records, slot * RECORD_SIZE + 8)) for slot in range(count)]
+        fields.sort(key=lambda item: item[1][0], reverse=True)
+        for slot, record in fields:
+            version, _, received, event, *_ = record
+            if version <= since:
+                break
+            if received < cutoff or (event and event < cutoff):
+                continue
+            yield self._name(slot, record), self._quote(record)
+
+
+class SharedQuoteStore:
+    """
+    QuoteStore read interface over a segment written by another process, used by the API workers.
+    Listeners registered with subscribe() are called from poll(), which follows the rings of every exchange.
+    """
+
+    def __init__(self, path: str):
+        self.segment = Segment(path, writable=False)
+        self.epoch = self.segment.epoch
+        self.tables = {name: SharedQuoteTable(self.segment, name) for name in self.segment.names}
+        self.listeners: list[Callable[[str, list[str]], None]] = []
+        # exchange versions listeners were last called for
+        self.polled = {name: table.version() for name, table in self.tables.items()}
+
+    @property
+    def exchanges(self) -> dict[str, SharedQuoteTable]:
+        # like QuoteStore, an exchange shows up once it received its first quote
+        return {name: table for name, table in self.tables.items() if table.version()}
+
+    def __contains__(self, exchange: str) -> bool:
+        table = self.tables.get(exchange)
+        return table is not None and table.version() > 0
+
+    def names(self) -> list[str]:
+        return list(self.exchanges)
+
+    def exchange(self, name: str) -> SharedQuoteTable:
+        return self.tables[name]
+
+    def version(self, scope: str = AGGREGATED) -> int:
+        if scope == AGGREGATED:
+            return U64.unpack_from(self.segment.buf, AGGREGATED_OFFSET)[0]
+        table = self.tables.get(scope)
+        return table.version() if table is not None else 0
+
+    def subscribe(self, listener: Callable[[str, list[str]], None]) -> None:
+        self.listeners.append(listener)
+
+    def changed_since(self, exchange: str, since: int, max_age: float | None = None) -> dict:
+        table = self.tables[exchange]
+        if since > table.version():
+            since = 0
+        return dict(table.recent(since, max_age))
+
+    def aggregated(self, max_age: float | None = None) -> dict:
+        result = {}
+        for exchange, table in self.exchanges.items():
+            quotes = table.as_dict().items() if max_age is None else table.recent(0, max_age)
+            for pair, quote in quotes:
+                result.setdefault(pair, {})[exchange] = quote
+        return result
+
+    def status(self) -> dict:
+        return self.segment.read_status()
+
+    def poll(self) -> None:
+        """
+        Calls the listeners once per exchange with the pairs written since the previous poll.
+        """
+        for name, table in self.tables.items():
+            version = table.version()
+            if version == self.polled[name]:
+                continue
+            if self.listeners:
+                pairs = [pair for pair, _ in table.recent(self.polled[name], None)]
+                for listener in self.listeners:
+                    listener(name, pairs)
+            self.polled[name] = version
+
+    def close(self) -> None:
+        self.segment.close()
+
+
+def remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,128 @@
+import gzip
+from typing import Any, Callable
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+from .codec import dumps
+from .settings import RESPONSE_GZIP, RESPONSE_GZIP_LEVEL, RESPONSE_GZIP_MIN_SIZE
+from .store import QuoteStore
+
+
+class CodecJSONResponse(JSONResponse):
+    """
+    JSONResponse encoded with the configured codec.
+    Returning it from an endpoint also skips FastAPI's jsonable_encoder pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class Snapshot:
+    """
+    Serialized response body for one version of a store scope.
+    The gzip variant is only built when a client accepts it.
+    """
+
+    __slots__ = ("version", "etag", "body", "_gzipped")
+
+    def __init__(self, version: int, etag: str, body: bytes):
+        self.version = version
+        self.etag = etag
+        self.body = body
+        self._gzipped = None
+
+    @property
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=RESPONSE_GZIP_LEVEL)
+        return self._gzipped
+
+
+class SnapshotCache:
+    """
+    Keeps the latest serialized body per scope (exchange name or the aggregated view).
+    A body is built lazily on the first request after the scope version changed.
+    """
+
+    def __init__(self, store: QuoteStore):
+        self.store = store
+        self.snapshots: dict[str, Snapshot] = {}
+
+    def get(self, scope: str, build: Callable[[], dict]) -> Snapshot:
+        return self.get_encoded(scope, lambda: dumps(build()))
+
+    def get_encoded(self, scope: str, build: Callable[[], bytes]) -> Snapshot:
+        version = self.store.version(scope)
+        snapshot = self.snapshots.get(scope)
+        if snapshot is None or snapshot.version != version:
+            etag = f'"{self.store.epoch}-{scope}-{version}"'
+            snapshot = self.snapshots[scope] = Snapshot(version, etag, build())
+        return snapshot
+
+    def clear(self) -> None:
+        self.snapshots.clear()
+
+
+class AggregatedBody:
+    """
+    The aggregated /currency/ body kept as one serialized fragment per pair.
+    A rebuild follows the exchange change logs from where the previous one stopped and re-serializes only the pairs
+    written since, the body is the join of the fragments. Works the same over a QuoteStore and a SharedQuoteStore.
+    """
+
+    def __init__(self, store: QuoteStore):
+        self.store = store
+        # {exchange: store version the fragments include}
+        self.cursors: dict[str, int] = {}
+        # {pair: {exchange: quote}}
+        self.quotes: dict[str, dict[str, dict]] = {}
+        # {pair: b'"PAIR":{...}'}
+        self.fragments: dict[str, bytes] = {}
+
+    def build(self) -> bytes:
+        store, quotes, cursors = self.store, self.quotes, self.cursors
+        dirty = set()
+        for exchange in store.names():
+            version = store.version(exchange)
+            cursor = cursors.get(exchange, 0)
+            if version == cursor:
+                continue
+            for pair, quote in store.changed_since(exchange, cursor).items():
+                pair_quotes = quotes.get(pair)
+                if pair_quotes is None:
+                    pair_quotes = quotes[pair] = {}
+                pair_quotes[exchange] = quote
+                dirty.add(pair)
+            cursors[exchange] = version
+        fragments = self.fragments
+        for pair in dirty:
+            # {"PAIR":{...}} without its braces
+            fragments[pair] = dumps({pair: quotes[pair]})[1:-1]
+        return b'{"result":{' + b",".join(fragments.values()) + b"}}"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def snapshot_response(request: Request, snapshot: Snapshot) -> Response:
+    headers = {"ETag": snapshot.etag, "Vary": "Accept-Encoding"}
+    if etag_matches(request, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    if (
+        RESPONSE_GZIP
+        and len(snapshot.body) >= RESPONSE_GZIP_MIN_SIZE
+        and "gzip" in request.headers.get("accept-encoding", "")
+    ):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snapshot.gzipped, media_type="application/json", headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
@@ -0,0 +1,87 @@
+"""
+Best bid, best ask and cross-exchange spread of every pair, maintained as quotes are written, for /best/ and /spreads/.
+"""
+from .store import QuoteStore
+
+
+class SpreadIndex:
+    """
+    Store listener recomputing the best quotes of every written pair over the exchanges that quote it,
+    a few slots per tick instead of a scan of the aggregated view per request.
+    The spread is (best bid - best ask) / mid in basis points, positive when one exchange bids above another's ask.
+    Pairs quoted by two exchanges or more are ranked widest spread first. The ranking is sorted when /spreads/ reads
+    it after a spread changed, not on every tick: a sorted list kept up to date would cost O(pairs) per changed pair.
+    Restored quotes are stale and left out.
+    """
+
+    def __init__(self, store: QuoteStore):
+        self.store = store
+        # {pair: (bid exchange, bid slot, ask exchange, ask slot, spread in basis points)}
+        self.best: dict[str, tuple[str, int, str, int, float]] = {}
+        # {pair: -spread} of the pairs quoted by two exchanges or more
+        self.ranked: dict[str, float] = {}
+        # pairs by -spread ascending, so the widest spreads come first, None until read again after a change
+        self.ranking: list[str] | None = []
+        # {exchange: (bid column, ask column, restored slots, price scale)}
+        self.columns: dict[str, tuple] = {}
+        store.subscribe(self.updated)
+
+    def updated(self, exchange: str, pairs: list[str]) -> None:
+        index, columns, best, ranked = self.store.index, self.columns, self.best, self.ranked
+        for pair in pairs:
+            bid = ask = None
+            quoted = 0
+            for name, slot in index[pair].items():
+                column = columns.get(name)
+                if column is None:
+                    column = self._columns(name)
+                bids, asks, restored, scale = column
+                if restored and slot in restored:
+                    continue
+                quoted += 1
+                price = bids[slot] / scale
+                if bid is None or price > bid:
+                    bid, bid_exchange, bid_slot = price, name, slot
+                price = asks[slot] / scale
+                if ask is None or price < ask:
+                    ask, ask_exchange, ask_slot = price, name, slot
+
+            if quoted:
+                mid = (bid + ask) / 2
+                spread = (bid - ask) / mid * 10_000 if mid else 0.0
+                best[pair] = (bid_exchange, bid_slot, ask_exchange, ask_slot, spread)
+            else:
+                best.pop(pair, None)
+            if quoted > 1:
+                rank = -spread
+                if ranked.get(pair) != rank:
+                    ranked[pair] = rank
+                    self.ranking = None
+            elif pair in ranked:
+                del ranked[pair]
+                self.ranking = None
+
+    def _columns(self, name: str) -> tuple:
+        # the columns of a table grow in place, the references stay valid
+        table = self.store.exchanges[name]
+        column = self.columns[name] = (table.bid, table.ask, table.restored, table.price_scale)
+        return column
+
+    def quote(self, pair: str) -> dict | None:
+        best = self.best.get(pair)
+        if best is None:
+            return None
+        bid_exchange, bid_slot, ask_exchange, ask_slot, spread = best
+        tables = self.store.exchanges
+        return {
+            "bid": {"exchange": bid_exchange, "price": tables[bid_exchange].raw_bid[bid_slot]},
+            "ask": {"exchange": ask_exchange, "price": tables[ask_exchange].raw_ask[ask_slot]},
+            "spread_bps": round(spread, 3),
+        }
+
+    def widest(self, top: int) -> list[dict]:
+        ranking = self.ranking
+        if ranking is None:
+            # float keys: the sort compares them without building a tuple per pair
+            ranking = self.ranking = sorted(self.ranked, key=self.ranked.__getitem__)
+        return [{"ticket": pair, **self.quote(pair)} for pair in ranking[:top]]
@@ -0,0 +1,354 @@
+import sys
+import time
+from array import array
+from typing import Callable, Iterator
+
+from .prices import PRICE_SCALE, parse_price
+from .settings import FIXED_POINT_EXCHANGES, QUOTE_TABLE_CAPACITY
+from .utils import midpoint
+
+AGGREGATED = "*"
+
+
+class QuoteTable:
+    """
+    Quotes of one exchange stored column-wise.
+    Every pair gets an interned symbol and a fixed slot in preallocated numeric columns,
+    an update overwrites the slot in place instead of allocating a new quote dict.
+    Exchange price strings are kept by reference, so responses keep the original precision.
+    Every slot also carries the exchange event time of its quote (0.0 when the feed has none)
+    and the local time the quote was received, both as unix timestamps in seconds.
+    """
+
+    # typecode of the ask/bid/mid columns, the stored values are price * price_scale and mid * mid_scale
+    price_type = "d"
+    price_scale = 1
+    mid_scale = 1
+
+    def __init__(self, capacity: int = QUOTE_TABLE_CAPACITY):
+        self.ids: dict[str, int] = {}
+        self.symbols: list[str] = []
+        self.raw_ask: list = []
+        self.raw_bid: list = []
+        self.ask = array(self.price_type, bytes(8 * capacity))
+        self.bid = array(self.price_type, bytes(8 * capacity))
+        self.mid = array(self.price_type, bytes(8 * capacity))
+        self.updated = array("d", bytes(8 * capacity))
+        self.event = array("d", bytes(8 * capacity))
+        # slots loaded from a snapshot and not refreshed by the feed yet, their quotes are flagged as stale
+        self.restored: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, pair: str) -> bool:
+        return pair in self.ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.symbols)
+
+    def slot(self, pair: str) -> int:
+        slot = self.ids.get(pair)
+        if slot is None:
+            slot = len(self.symbols)
+            if slot == len(self.ask):
+                self._grow()
+            pair = sys.intern(pair)
+            self.ids[pair] = slot
+            self.symbols.append(pair)
+            self.raw_ask.append(None)
+            self.raw_bid.append(None)
+        return slot
+
+    def nbytes(self) -> int:
+        """
+        Memory of the table containers, the price strings shared with the exchange frames are not counted.
+        """
+        return sum(
+            sys.getsizeof(column)
+            for column in (
+                self.ids,
+                self.symbols,
+                self.raw_ask,
+                self.raw_bid,
+                self.ask,
+                self.bid,
+                self.mid,
+                self.updated,
+                self.event,
+                self.restored,
+            )
+        )
+
+    def _grow(self) -> None:
+        extra = bytes(8 * len(self.ask))
+        for column in (self.ask, self.bid, self.mid, self.updated, self.event):
+            column.frombytes(extra)
+
+    @staticmethod
+    def parse(ask, bid) -> tuple:
+        ask_price = float(ask)
+        bid_price = float(bid)
+        return ask_price, bid_price, midpoint(ask_price, bid_price)
+
+    def quote(self, slot: int) -> dict:
+        quote = {
+            "ask": self.raw_ask[slot],
+            "bid": self.raw_bid[slot],
+            "ask_bid_average": self.mid[slot] / self.mid_scale,
+        }
+        if self.restored and slot in self.restored:
+            quote["stale"] = True
+            quote["updated_at"] = self.updated[slot]
+        return quote
+
+    def age(self, slot: int, now: float) -> float:
+        """
+        Seconds since the quote's exchange event time or since it was received, whichever is older.
+        """
+        event = self.event[slot]
+        received = self.updated[slot]
+        return now - (event if event and event < received else received)
+
+    def get(self, pair: str) -> dict | None:
+        slot = self.ids.get(pair)
+        return None if slot is None else self.quote(slot)
+
+    def as_dict(self) -> dict:
+        return {pair: self.quote(slot) for pair, slot in self.ids.items()}
+
+
+class FixedPointQuoteTable(QuoteTable):
+    """
+    QuoteTable keeping prices as scaled integers parsed straight from the exchange strings.
+    The mid is stored as ask + bid, so it is exact and only turned into a float when a quote is read.
+    """
+
+    price_type = "q"
+    price_scale = PRICE_SCALE
+    mid_scale = 2 * PRICE_SCALE
+
+    @staticmethod
+    def parse(ask, bid) -> tuple:
+        ask_price = parse_price(ask)
+        bid_price = parse_price(bid)
+        return ask_price, bid_price, ask_price + bid_price
+
+
+class QuoteStore:
+    """
+    In-memory quote cache shared by all exchange connectors, one QuoteTable per exchange.
+    The pair-keyed cross-exchange index of table slots is extended at write time when a new pair appears,
+    so the aggregated view is never regrouped per request.
+    Every write bumps the exchange version and the aggregated version, readers use them as cache keys.
+    A connector commits a whole frame with update_many(): one version bump and one listener call for all its ticks.
+    """
+
+    def __init__(self, fixed_point: set[str] = FIXED_POINT_EXCHANGES):
+        # exchanges whose prices are kept as scaled integers instead of floats
+        self.fixed_point = fixed_point
+        self.exchanges: dict[str, QuoteTable] = {}
+        # {pair: {exchange: slot}}
+        self.index: dict[str, dict[str, int]] = {}
+        # versions restart from zero with the process, the epoch tells them apart between restarts
+        self.epoch = format(time.time_ns(), "x")
+        self.versions: dict[str, int] = {AGGREGATED: 0}
+        # {exchange: {pair: version of its last update}} ordered from the oldest to the newest update
+        self.changes: dict[str, dict[str, int]] = {}
+        # called with (exchange, pairs written) after every write, must not block
+        self.listeners: list[Callable[[str, list[str]], None]] = []
+
+    def __contains__(self, exchange: str) -> bool:
+        return exchange in self.exchanges
+
+    def names(self) -> list[str]:
+        return list(self.exchanges.keys())
+
+    def exchange(self, name: str) -> QuoteTable:
+        return self.exchanges[name]
+
+    def subscribe(self, listener: Callable[[str, list[str]], None]) -> None:
+        self.listeners.append(listener)
+
+    def version(self, scope: str = AGGREGATED) -> int:
+        return self.versions.get(scope, 0)
+
+    def table(self, exchange: str) -> QuoteTable:
+        table = self.exchanges.get(exchange)
+        if table is None:
+            table_class = FixedPointQuoteTable if exchange in self.fixed_point else QuoteTable
+            table = self.exchanges[exchange] = table_class()
+            self.versions[exchange] = 0
+            self.changes[exchange] = {}
+        return table
+
+    def update(
+        self,
+        exchange: str,
+        pair: str,
+        ask,
+        bid,
+        event_time: float = 0.0,
+        received_at: float | None = None,
+        restored: bool = False,
+    ) -> None:
+        """
+        event_time - exchange timestamp of the quote, received_at - local receive time, now when not given,
+        restored - the quote comes from a snapshot (or its feed was unsubscribed) and stays flagged as stale
+        until the feed updates the pair.
+        """
+        table = self.exchanges.get(exchange)
+        if table is None:
+            table = self.table(exchange)
+        # parse before touching the table, a bad tick must not leave a half-written slot
+        ask_price, bid_price, mid = table.parse(ask, bid)
+        slot = table.ids.get(pair)
+        if slot is None:
+            slot = table.slot(pair)
+            self.index.setdefault(pair, {})[exchange] = slot
+        table.raw_ask[slot] = ask
+        table.raw_bid[slot] = bid
+        table.ask[slot] = ask_price
+        table.bid[slot] = bid_price
+        table.mid[slot] = mid
+        table.updated[slot] = time.time() if received_at is None else received_at
+        table.event[slot] = event_time
+        if restored:
+            table.restored.add(slot)
+        elif table.restored:
+            table.restored.discard(slot)
+
+        versions = self.versions
+        version = versions[exchange] = versions[exchange] + 1
+        versions[AGGREGATED] += 1
+
+        # re-inserting moves the pair to the end of the log
+        changes = self.changes[exchange]
+        changes.pop(pair, None)
+        changes[pair] = version
+
+        if self.listeners:
+            pairs = [pair]
+            for listener in self.listeners:
+                listener(exchange, pairs)
+
+    def update_many(self, exchange: str, quotes: dict, restored: bool = False) -> list[tuple[str, Exception]]:
+        """
+        Writes a frame of quotes, {pair: (ask, bid, event_time, received_at)} with received_at None for now,
+        as a single update: every quote is parsed before the first slot is written, the written pairs share one
+        version and the listeners are called once with all of them, so readers see the frame entirely or not at all.
+        Quotes that do not parse are left out and returned as (pair, error).
+        """
+        table = self.exchanges.get(exchange)
+        if table is None:
+            table = self.table(exchange)
+        parse = table.parse
+        parsed = []
+        rejected = []
+        for pair, (ask, bid, event_time, received_at) in quotes.items():
+            try:
+                parsed.append((pair, ask, bid, event_time, received_at, *parse(ask, bid)))
+            except (ValueError, TypeError) as e:
+                rejected.append((pair, e))
+        if not parsed:
+            return rejected
+
+        versions = self.versions
+        version = versions[exchange] = versions[exchange] + 1
+        versions[AGGREGATED] += 1
+
+        ids, index, changes = table.ids, self.index, self.changes[exchange]
+        raw_ask, raw_bid, ask_column, bid_column = table.raw_ask, table.raw_bid, table.ask, table.bid
+        mid_column, updated, event, stale = table.mid, table.updated, table.event, table.restored
+        now = time.time()
+        for pair, ask, bid, event_time, received_at, ask_price, bid_price, mid in parsed:
+            slot = ids.get(pair)
+            if slot is None:
+                # grows the columns in place, the bound ones stay valid
+                slot = table.slot(pair)
+                index.setdefault(pair, {})[exchange] = slot
+            raw_ask[slot] = ask
+            raw_bid[slot] = bid
+            ask_column[slot] = ask_price
+            bid_column[slot] = bid_price
+            mid_column[slot] = mid
+            updated[slot] = now if received_at is None else received_at
+            event[slot] = event_time
+            if restored:
+                stale.add(slot)
+            elif stale:
+                stale.discard(slot)
+            changes.pop(pair, None)
+            changes[pair] = version
+
+        if self.listeners:
+            pairs = list(quotes) if not rejected else [row[0] for row in parsed]
+            for listener in self.listeners:
+                listener(exchange, pairs)
+        return rejected
+
+    def mark_stale(self, exchange: str, pair: str) -> None:
+        """
+        Flags the last quote of a pair whose feed stopped as stale, its receive and event times are kept.
+        """
+        table = self.exchanges.get(exchange)
+        slot = table.ids.get(pair) if table is not None else None
+        if slot is None or slot in table.restored:
+            return
+        self.update(
+            exchange,
+            pair,
+            table.raw_ask[slot],
+            table.raw_bid[slot],
+            table.event[slot],
+            table.updated[slot],
+            restored=True,
+        )
+
+    def aggregated(self, max_age: float | None = None) -> dict:
+        tables = self.exchanges
+        if max_age is None:
+            return {
+                pair: {exchange: tables[exchange].quote(slot) for exchange, slot in slots.items()}
+                for pair, slots in self.index.items()
+            }
+        result = {}
+        for exchange, table in tables.items():
+            for pair, slot in self._recent(exchange, 0, max_age):
+                result.setdefault(pair, {})[exchange] = table.quote(slot)
+        return result
+
+    def changed_since(self, exchange: str, since: int, max_age: float | None = None) -> dict:
+        """
+        Pairs of the exchange updated after the given version, only quotes younger than max_age seconds if given.
+        Walks the change log from the newest update and stops at the first older one,
+        so the cost depends on the number of changed pairs, not on the cache size.
+        """
+        table = self.exchanges[exchange]
+        if since > self.versions[exchange]:
+            # version from a previous process, the client has to start over
+            since = 0
+        return {pair: table.quote(slot) for pair, slot in self._recent(exchange, since, max_age)}
+
+    def _recent(self, exchange: str, since: int, max_age: float | None) -> Iterator[tuple[str, int]]:
+        """
+        (pair, slot) from the newest update back to the given version or to the first quote received max_age ago.
+        The feed's entries in the change log are in receive order, so every entry behind that one is older too.
+        Restored quotes keep their old receive times wherever they were logged (a snapshot load, an eviction flagging
+        the quote as stale), an old one is skipped instead of ending the walk.
+        A quote whose exchange event time is older than max_age is skipped.
+        """
+        table = self.exchanges[exchange]
+        ids, updated, event, restored = table.ids, table.updated, table.event, table.restored
+        cutoff = -1.0 if max_age is None else time.time() - max_age
+        for pair, version in reversed(self.changes[exchange].items()):
+            if version <= since:
+                break
+            slot = ids[pair]
+            if updated[slot] < cutoff:
+                if restored and slot in restored:
+                    continue
+                break
+            if event[slot] and event[slot] < cutoff:
+                continue
+            yield pair, slot
@@ -0,0 +1,179 @@
+import asyncio
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from .codec import dumps_str
+from .settings import MARKETS, STREAM_MAX_SUBSCRIPTIONS
+from .store import QuoteStore
+from .symbols import registry
+
+EXCHANGES = {market["name"] for market in MARKETS.values()}
+
+
+class Subscriber:
+    """
+    Outgoing buffer of one /stream client.
+    Whole-exchange subscriptions are a cursor into the store change log, single pairs are marked as pending
+    and read from the store when sent, so a slow client gets the latest quote per pair
+    and its memory never grows past the pairs it follows.
+    """
+
+    def __init__(self):
+        self.pending: set[tuple[str, str]] = set()
+        self.cursors: dict[str, int] = {}
+        self.pairs: set[tuple[str, str]] = set()
+        self.ready = asyncio.Event()
+        self.conflated = 0
+
+    def push(self, exchange: str, pair: str) -> None:
+        key = (exchange, pair)
+        if key in self.pending:
+            self.conflated += 1
+        else:
+            self.pending.add(key)
+        if not self.ready.is_set():
+            self.ready.set()
+
+    async def drain(self, store: QuoteStore) -> list[dict]:
+        await self.ready.wait()
+        self.ready.clear()
+        pending, self.pending = self.pending, set()
+        updates = [
+            {"exchange": exchange, "pair": pair, "price": store.exchanges[exchange].get(pair)}
+            for exchange, pair in pending
+        ]
+        for exchange, cursor in self.cursors.items():
+            if exchange not in store:
+                continue
+            version = store.version(exchange)
+            if version != cursor:
+                changed = store.changed_since(exchange, cursor)
+                updates.extend({"exchange": exchange, "pair": pair, "price": quote} for pair, quote in changed.items())
+                self.cursors[exchange] = version
+        return updates
+
+
+class StreamHub:
+    """
+    Fans store writes out to /stream subscribers.
+    A write only touches clients following that exact pair; clients following a whole exchange are woken
+    once per event loop iteration and read the changes from the store themselves.
+    """
+
+    def __init__(self, store: QuoteStore):
+        self.store = store
+        self.by_exchange: dict[str, set[Subscriber]] = {}
+        self.by_pair: dict[tuple[str, str], set[Subscriber]] = {}
+        self.dirty: set[str] = set()
+        store.subscribe(self.publish)
+
+    def publish(self, exchange: str, pairs: list[str]) -> None:
+        if exchange not in self.dirty and self.by_exchange.get(exchange):
+            if not self.dirty:
+                asyncio.get_running_loop().call_soon(self._wake)
+            self.dirty.add(exchange)
+        by_pair = self.by_pair
+        if by_pair:
+            for pair in pairs:
+                subscribers = by_pair.get((exchange, pair))
+                if subscribers:
+                    for subscriber in subscribers:
+                        if exchange not in subscriber.cursors:
+                            subscriber.push(exchange, pair)
+
+    def _wake(self) -> None:
+        for exchange in self.dirty:
+            for subscriber in self.by_exchange.get(exchange, ()):
+                subscriber.ready.set()
+        self.dirty.clear()
+
+    def subscribe(self, subscriber: Subscriber, exchange: str, pairs: list[str] | None) -> None:
+        if not pairs:
+            # cursor 0 - the first drain sends the whole exchange cache
+            subscriber.cursors[exchange] = 0
+            subscriber.ready.set()
+            self.by_exchange.setdefault(exchange, set()).add(subscriber)
+            return
+        if len(subscriber.pairs) + len(pairs) > STREAM_MAX_SUBSCRIPTIONS:
+            raise ValueError(f"Subscription limit is {STREAM_MAX_SUBSCRIPTIONS} pairs")
+        table = self.store.exchanges.get(exchange, ())
+        for pair in pairs:
+            key = (exchange, registry.resolve(pair.upper()))
+            subscriber.pairs.add(key)
+            self.by_pair.setdefault(key, set()).add(subscriber)
+            if key[1] in table:
+                subscriber.push(*key)
+
+    def unsubscribe(self, subscriber: Subscriber, exchange: str, pairs: list[str] | None) -> None:
+        if not pairs:
+            subscriber.cursors.pop(exchange, None)
+            self.by_exchange.get(exchange, set()).discard(subscriber)
+            return
+        for pair in pairs:
+            key = (exchange, registry.resolve(pair.upper()))
+            subscriber.pairs.discard(key)
+            self.by_pair.get(key, set()).discard(subscriber)
+
+    def remove(self, subscriber: Subscriber) -> None:
+        for exchange in list(subscriber.cursors):
+            self.unsubscribe(subscriber, exchange, None)
+        for exchange, pair in list(subscriber.pairs):
+            self.unsubscribe(subscriber, exchange, [pair])
+
+    async def serve(self, websocket: WebSocket) -> None:
+        """
+        Client protocol (JSON text frames):
+        -> {"action": "subscribe" | "unsubscribe", "exchange": "binance", "pairs": ["BTCUSDT"]}
+           without "pairs" the whole exchange is (un)subscribed
+        <- {"updates": [{"exchange": "binance", "pair": "BTCUSDT", "price": {...}}, ...]}
+           current quotes are sent right after subscribing, then only changes
+        <- {"error": "..."} for malformed requests
+        """
+        await websocket.accept()
+        subscriber = Subscriber()
+        sender = asyncio.create_task(self._send(websocket, subscriber))
+        try:
+            while True:
+                try:
+                    message = await websocket.receive_json()
+                except WebSocketDisconnect:
+                    break
+                except ValueError:
+                    await websocket.send_json({"error": "Message must be a JSON object"})
+                    continue
+                error = self._handle(subscriber, message)
+                if error:
+                    await websocket.send_json({"error": error})
+        finally:
+            sender.cancel()
+            self.remove(subscriber)
+
+    def _handle(self, subscriber: Subscriber, message: dict) -> str | None:
+        if not isinstance(message, dict):
+            return "Message must be a JSON object"
+        action = message.get("action")
+        exchange = str(message.get("exchange", "")).lower()
+        pairs = message.get("pairs")
+        if exchange not in EXCHANGES:
+            return f"Please choose one of available exchanges: {sorted(EXCHANGES)}"
+        if pairs is not None and not (isinstance(pairs, list) and all(isinstance(pair, str) for pair in pairs)):
+            return "Pairs must be a list of strings"
+        if action == "subscribe":
+            try:
+                self.subscribe(subscriber, exchange, pairs)
+            except ValueError as e:
+                return str(e)
+        elif action == "unsubscribe":
+            self.unsubscribe(subscriber, exchange, pairs)
+        else:
+            return "Action must be one of: subscribe, unsubscribe"
+        return None
+
+    async def _send(self, websocket: WebSocket, subscriber: Subscriber) -> None:
+        try:
+            while True:
+                updates = await subscriber.drain(self.store)
+                if updates:
+                    await websocket.send_text(dumps_str({"updates": updates}))
+        except (WebSocketDisconnect, RuntimeError):
+            pass
@@ -0,0 +1,124 @@
+import asyncio
+import random
+import time
+
+from .settings import SUPERVISOR_BACKOFF_INITIAL, SUPERVISOR_BACKOFF_MAX, SUPERVISOR_STALL_TIMEOUT, logger
+
+
+class ConnectorState:
+    def __init__(self):
+        self.status = "idle"
+        self.connects = 0
+        self.restarts = 0
+        self.stalls = 0
+        self.last_error: str | None = None
+        self.next_attempt_in = 0.0
+
+    def to_dict(self, connector) -> dict:
+        last_message_at = connector.last_message_at
+        return {
+            "status": self.status,
+            "connects": self.connects,
+            "restarts": self.restarts,
+            "stalls": self.stalls,
+            "last_error": self.last_error,
+            "last_message_age": round(time.monotonic() - last_message_at, 3) if last_message_at else None,
+            "next_attempt_in": self.next_attempt_in,
+            "ingest": connector.queue.stats(),
+            "lag_ms": connector.metrics.lag.to_dict() if connector.metrics is not None else None,
+            "heartbeat": connector.heartbeat.to_dict(),
+        }
+
+
+class ConnectorStalled(Exception):
+    pass
+
+
+class Supervisor:
+    """
+    Owns the task of every exchange connector.
+    A connector whose connection() fails or stops receiving frames for stall_timeout seconds is restarted
+    after an exponential backoff with jitter; the backoff resets once a connection has delivered data.
+    """
+
+    def __init__(
+        self,
+        connectors: list,
+        backoff_initial: float = SUPERVISOR_BACKOFF_INITIAL,
+        backoff_max: float = SUPERVISOR_BACKOFF_MAX,
+        stall_timeout: float = SUPERVISOR_STALL_TIMEOUT,
+    ):
+        self.connectors = {connector.label: connector for connector in connectors}
+        self.states = {name: ConnectorState() for name in self.connectors}
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.stall_timeout = stall_timeout
+        self.tasks: dict[str, asyncio.Task] = {}
+
+    def start(self) -> None:
+        for name, connector in self.connectors.items():
+            self.tasks[name] = asyncio.create_task(self._supervise(connector), name=f"supervisor-{name}")
+
+    async def stop(self) -> None:
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        self.tasks.clear()
+        for connector in self.connectors.values():
+            connector.close()
+        for state in self.states.values():
+            state.status = "stopped"
+
+    def status(self) -> dict:
+        return {name: self.states[name].to_dict(connector) for name, connector in self.connectors.items()}
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_initial * 2**attempt)
+        return random.uniform(delay / 2, delay)
+
+    async def _supervise(self, connector) -> None:
+        state = self.states[connector.label]
+        attempt = 0
+        while True:
+            state.status = "connecting"
+            state.connects += 1
+            state.next_attempt_in = 0.0
+            started_at = connector.last_message_at = time.monotonic()
+            try:
+                await self._watch(connector, state)
+                state.last_error = "connection closed"
+            except asyncio.CancelledError:
+                raise
+            except ConnectorStalled as e:
+                state.stalls += 1
+                state.last_error = str(e)
+            except Exception as e:
+                state.last_error = f"{type(e).__name__}: {e}"
+            logger.error(f"[Supervisor] {connector.label} connector stopped: {state.last_error}")
+
+            # a connection that delivered data was healthy, start the backoff over
+            attempt = 0 if connector.last_message_at > started_at else attempt + 1
+            state.restarts += 1
+            state.status = "backoff"
+            state.next_attempt_in = round(self.backoff(attempt), 3)
+            await asyncio.sleep(state.next_attempt_in)
+
+    async def _watch(self, connector, state: ConnectorState) -> None:
+        started_at = connector.last_message_at
+        task = asyncio.create_task(connector.connection(), name=f"connector-{connector.label}")
+        check_interval = min(1.0, self.stall_timeout / 4)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=check_interval)
+                if done:
+                    return task.result()
+                silence = time.monotonic() - connector.last_message_at
+                if silence > self.stall_timeout:
+                    state.status = "stalled"
+                    raise ConnectorStalled(f"no data for {silence:.1f}s")
+                if connector.last_message_at > started_at:
+                    state.status = "running"
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,81 @@
+"""
+Canonical pair names shared by every exchange.
+
+A raw exchange symbol or channel (Kraken "XBT/USD", Huobi "market.btcusdt.ticker", KuCoin "BTC-USDT") is mapped to
+one canonical pair name built from its base and quote asset codes with the exchange aliases applied (Kraken's XBT is
+BTC), so the same asset is stored under the same pair on every exchange and the aggregated view merges it.
+The mappings are filled from the symbol catalogs when a connector starts, or the first time a raw name is seen;
+a handler then does one dict lookup per tick instead of rewriting strings. Canonical names are interned.
+"""
+import sys
+
+from .settings import ASSET_ALIASES, QUOTE_ASSETS
+
+
+class SymbolRegistry:
+    def __init__(self, aliases: dict[str, str] = ASSET_ALIASES, quotes: tuple[str, ...] = QUOTE_ASSETS):
+        self.aliases = aliases
+        # longest first, so BTCUSDT is split as BTC/USDT rather than BTCUS/DT
+        self.quotes = sorted(quotes, key=len, reverse=True)
+        # {exchange: {raw symbol or channel: canonical pair}}
+        self.exchanges: dict[str, dict[str, str]] = {}
+        # {canonical pair: (base, quote)}, pairs whose quote asset is unknown are not listed
+        self.assets: dict[str, tuple[str, str]] = {}
+        # {exchange-specific pair name: canonical pair}, e.g. XBTUSD -> BTCUSD
+        self.names: dict[str, str] = {}
+
+    def channels(self, exchange: str) -> dict[str, str]:
+        """
+        The raw name -> canonical pair map of an exchange, connectors keep a reference for their lookups.
+        """
+        return self.exchanges.setdefault(exchange, {})
+
+    def asset(self, code: str) -> str:
+        code = code.upper()
+        return self.aliases.get(code, code)
+
+    def add(self, exchange: str, raw: str, base: str, quote: str) -> str:
+        name = (base + quote).upper()
+        base, quote = self.asset(base), self.asset(quote)
+        pair = sys.intern(base + quote)
+        if pair not in self.assets:
+            self.assets[pair] = sys.intern(base), sys.intern(quote)
+        if name != pair:
+            self.names[name] = pair
+        return self._map(exchange, raw, pair)
+
+    def add_symbol(self, exchange: str, raw: str, symbol: str) -> str:
+        """
+        Registers a symbol written without separator (BTCUSDT), split on the known quote assets.
+        """
+        symbol = symbol.upper()
+        parts = self.split(symbol)
+        if parts is None:
+            return self._map(exchange, raw, sys.intern(symbol))
+        return self.add(exchange, raw, *parts)
+
+    def split(self, symbol: str) -> tuple[str, str] | None:
+        for quote in self.quotes:
+            if symbol.endswith(quote) and len(symbol) > len(quote):
+                return symbol[: -len(quote)], quote
+        return None
+
+    def resolve(self, pair: str) -> str:
+        """
+        Canonical name of an upper-case pair a client asked for, exchange-specific names (XBTUSD) included.
+        """
+        name = self.names.get(pair)
+        if name is not None:
+            return name
+        # not registered in this process (API workers of the multi-worker mode have no connectors)
+        for alias, asset in self.aliases.items():
+            if pair.startswith(alias):
+                return asset + pair[len(alias) :]
+        return pair
+
+    def _map(self, exchange: str, raw: str, pair: str) -> str:
+        self.channels(exchange)[raw] = pair
+        return pair
+
+
+registry = SymbolRegistry()
@@ -15,11 +15,12 @@ class CurrencyAggregation:
             self.data[pair][self.exchange_name] = data
 
 
+def midpoint(buy: float, sell: float) -> float:
+    return round((buy + sell) / 2, 5)
+
+
 def calculate_average_value(buy: str, sell: str) -> float:
-    buy_float = float(buy)
-    sell_float = float(sell)
-    average = (buy_float + sell_float) / 2
-    return round(average, 5)
+    return midpoint(float(buy), float(sell))
 
 
 def validate_crypto_pair(pair: str) -> bool:
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.replay import CONNECTORS, StandInServer, synthesize
+from src import bootstrap
+from src.bootstrap import Catalog
+from src.store import QuoteStore
+
+URL = "https://exchange.test/symbols"
+
+
+def counting_catalog(directory, ttl: float = 60.0) -> tuple[Catalog, list]:
+    requests = []
+
+    async def fetch(url: str) -> dict:
+        requests.append(url)
+        return {"symbols": [f"S{len(requests)}"]}
+
+    catalog = Catalog("test", lambda data: data["symbols"], ttl=ttl, directory=str(directory))
+    catalog.fetch = fetch
+    return catalog, requests
+
+
+class TestCatalog:
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_cached_in_memory_and_on_disk(tmp_path):
+        catalog, requests = counting_catalog(tmp_path)
+
+        assert await catalog.get(URL) == ["S1"]
+        assert await catalog.get(URL) == ["S1"]
+        # a new process starts from the file
+        restarted, restarted_requests = counting_catalog(tmp_path)
+        assert await restarted.get(URL) == ["S1"]
+
+        assert requests == [URL]
+        assert restarted_requests == []
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_expired_catalog_is_refreshed_in_the_background(tmp_path):
+        catalog, requests = counting_catalog(tmp_path, ttl=60.0)
+        await catalog.get(URL)
+        catalog.fetched_at = time.time() - 61
+
+        # the expired list is returned at once, the refresh replaces it afterwards
+        assert await catalog.get(URL) == ["S1"]
+        await catalog.refreshing
+        assert await catalog.get(URL) == ["S2"]
+        assert len(requests) == 2
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_other_url_is_not_served_from_the_cache(tmp_path):
+        catalog, requests = counting_catalog(tmp_path)
+        await catalog.get(URL)
+
+        assert await catalog.get("http://127.0.0.1:1/pairs") == ["S2"]
+        assert len(requests) == 2
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_reconnect_reuses_catalog_and_session():
+        recording = synthesize("kraken", pairs=5, frames=20)
+        connector = CONNECTORS["kraken"](QuoteStore())
+
+        async with StandInServer(recording) as server:
+            server.configure(connector)
+            try:
+                for _ in range(2):
+                    task = asyncio.create_task(connector.connection())
+                    while connector.queue.processed < len(recording):
+                        await asyncio.sleep(0.01)
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    connector.queue.processed = 0
+                session = bootstrap.session()
+            finally:
+                await bootstrap.close()
+
+        assert server.rest_requests == 1
+        assert session.closed
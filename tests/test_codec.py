@@ -0,0 +1,22 @@
+import pytest
+
+from src.codec import CODECS, get_codec
+
+
+class TestCodec:
+    @staticmethod
+    @pytest.mark.parametrize("name", sorted(CODECS))
+    def test_round_trip(name):
+        codec = CODECS[name]
+        frame = [{"s": "BTCUSDT", "a": "65000.01000000", "b": "64999.99", "E": 1697000000000}]
+
+        assert codec.loads(codec.dumps(frame)) == frame
+        assert codec.loads(codec.dumps_str(frame).encode("utf-8")) == frame
+        assert isinstance(codec.dumps({"ping": 1}), bytes)
+        assert isinstance(codec.dumps_str({"ping": 1}), str)
+
+    @staticmethod
+    def test_unknown_codec():
+        assert get_codec("json").name == "json"
+        with pytest.raises(ValueError):
+            get_codec("yaml")
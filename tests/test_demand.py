@@ -0,0 +1,132 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from benchmarks.replay import StandInServer, synthesize
+from markets.huobi import HuobiWebSocket
+from markets.kraken import KrakenWebSocket
+from src import bootstrap
+from src.demand import DemandSubscriptions
+from src.store import QuoteStore
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message: str) -> None:
+        self.sent.append(json.loads(message))
+
+
+def kraken(store: QuoteStore) -> KrakenWebSocket:
+    connector = KrakenWebSocket(store)
+    connector.catalog.url, connector.catalog.directory = connector.pairs_endpoint, None
+    connector.catalog.items, connector.catalog.fetched_at = ["XBT/USD", "ETH/USD", "DOT/EUR"], time.time()
+    return connector
+
+
+class TestDemandSubscriptions:
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_connects_with_always_on_pairs_only():
+        connector = kraken(QuoteStore())
+        DemandSubscriptions(connector.db, [connector], always_on={"XBTUSD"})
+
+        assert connector.demanded(await connector.catalog.get(connector.pairs_endpoint)) == ["XBT/USD"]
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_first_request_subscribes_and_idle_pair_is_evicted():
+        store = QuoteStore()
+        connector = kraken(store)
+        connector.websocket = RecordingSocket()
+        demand = DemandSubscriptions(store, [connector], always_on={"XBTUSD"}, wait=1.0, ttl=60.0)
+
+        async def feed() -> None:
+            while not connector.websocket.sent:
+                await asyncio.sleep(0.001)
+            store.update("kraken", "ETHUSD", "2001.5", "2001.0")
+
+        feeding = asyncio.create_task(feed())
+        await demand.request("kraken", "ETHUSD")
+        await feeding
+        await demand.request("kraken", "ETHUSD")
+        assert connector.websocket.sent == [
+            {"event": "subscribe", "pair": ["ETH/USD"], "subscription": {"name": "ticker"}}
+        ]
+
+        assert await demand.evict(time.monotonic() + 61) == {"kraken": ["ETHUSD"]}
+        assert connector.websocket.sent[-1] == {
+            "event": "unsubscribe",
+            "pair": ["ETH/USD"],
+            "subscription": {"name": "ticker"},
+        }
+        table = store.exchange("kraken")
+        assert table.ids["ETHUSD"] in table.restored
+        assert table.quote(table.ids["ETHUSD"])["ask"] == "2001.5"
+        assert connector.wanted == {"BTCUSD"}
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_max_age_queries_after_eviction():
+        store = QuoteStore()
+        connector = kraken(store)
+        connector.websocket = RecordingSocket()
+        demand = DemandSubscriptions(store, [connector], always_on={"XBTUSD"}, wait=0.0, ttl=60.0)
+        now = time.time()
+        store.update("kraken", "ETHUSD", "2", "1", received_at=now - 30)
+        await demand.request("kraken", "ETHUSD")
+        store.update("kraken", "BTCUSD", "2", "1")
+        store.update("kraken", "DOTEUR", "2", "1")
+
+        await demand.evict(time.monotonic() + 61)
+
+        # the evicted quote is logged last with its old receive time, the fresh ones behind it are still found
+        assert list(store.changes["kraken"])[-1] == "ETHUSD"
+        assert store.changed_since("kraken", 0, max_age=5).keys() == {"BTCUSD", "DOTEUR"}
+        assert store.aggregated(max_age=5).keys() == {"BTCUSD", "DOTEUR"}
+        assert store.changed_since("kraken", 0, max_age=60).keys() == {"BTCUSD", "DOTEUR", "ETHUSD"}
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_always_on_and_unknown_pairs_are_not_subscribed():
+        connector = kraken(QuoteStore())
+        connector.websocket = RecordingSocket()
+        demand = DemandSubscriptions(connector.db, [connector], always_on={"XBTUSD"}, wait=1.0)
+
+        await demand.request("kraken", "BTCUSD")
+        await demand.request("kraken", "NOPEUSD")
+        await demand.request("binance", "BTCUSDT")
+
+        assert connector.websocket.sent == []
+        assert demand.status() == {"kraken": {"always_on": 1, "requested": 0}}
+        assert await demand.evict(time.monotonic() + 10**6) == {}
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_sharded_huobi_subscribes_requested_pair_on_its_shard():
+        recording = synthesize("huobi", pairs=20, frames=1000)
+        store = QuoteStore()
+        connectors = HuobiWebSocket.sharded(store, 2)
+        demand = DemandSubscriptions(store, connectors, always_on={"C0USDT"}, wait=5.0)
+
+        # replayed over ~2 s, only the channels a connection is subscribed to are sent to it
+        async with StandInServer(recording, speed=0.5, route=True, route_quiet=0.02) as server:
+            for connector in connectors:
+                server.configure(connector)
+            tasks = [asyncio.create_task(connector.connection()) for connector in connectors]
+            try:
+                await demand.request("huobi", "C1USD")
+                table = store.exchange("huobi")
+                assert "C1USD" in table.ids
+                assert "C2EUR" not in table.ids
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await bootstrap.close()
+
+        assert sum(connector.subscriptions for connector in connectors) == 2
+        assert sorted(len(connector.wanted - {"C0USDT"}) for connector in connectors) == [0, 1]
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from benchmarks.replay import CONNECTORS, StandInServer, synthesize
+from src import bootstrap
+from src.heartbeat import Heartbeat
+from src.store import QuoteStore
+
+
+class SilentSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    async def send(self, message: str) -> None:
+        self.sent.append(message)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+async def run_connector(exchange: str, until, interval: float | None = None):
+    recording = synthesize(exchange, pairs=5, frames=50)
+    connector = CONNECTORS[exchange](QuoteStore())
+    if interval is not None:
+        connector.heartbeat.interval = interval
+    async with StandInServer(recording) as server:
+        server.configure(connector)
+        task = asyncio.create_task(connector.connection())
+
+        async def answered() -> None:
+            while not until(connector):
+                await asyncio.sleep(0.005)
+
+        try:
+            await asyncio.wait_for(answered(), 5)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await bootstrap.close()
+    return connector
+
+
+class TestHeartbeat:
+    @staticmethod
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("exchange", ["kraken", "binance"])
+    async def test_pings_are_answered_and_timed(exchange):
+        # Kraken pings with an event message, Binance with a websocket protocol ping
+        connector = await run_connector(exchange, lambda c: c.heartbeat.pongs >= 3, interval=0.01)
+
+        heartbeat = connector.heartbeat.to_dict()
+        assert heartbeat["timeouts"] == 0
+        assert set(heartbeat["rtt_ms"]) == {"p50", "p90", "p99"}
+
+    @staticmethod
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("exchange, library_pings", [("binance", None), ("kraken", 20)])
+    async def test_protocol_pings_are_sent_by_the_heartbeat_only(exchange, library_pings):
+        intervals = []
+
+        def connected(connector) -> bool:
+            if connector.websocket is not None:
+                intervals.append(connector.websocket.ping_interval)
+            return bool(intervals)
+
+        await run_connector(exchange, connected)
+
+        assert intervals[0] == library_pings
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_kucoin_ping_interval_is_taken_in_milliseconds():
+        connector = await run_connector("kucoin", lambda c: c.heartbeat.pongs >= 1)
+
+        # the stand-in token has pingInterval 18000 and pingTimeout 10000
+        assert connector.heartbeat.interval == 18.0
+        assert connector.heartbeat.timeout == 10.0
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_unanswered_ping_closes_the_connection():
+        websocket = SilentSocket()
+        heartbeat = Heartbeat(interval=0.01, timeout=0.025, message=str)
+
+        await asyncio.wait_for(heartbeat.run(websocket), 1)
+
+        assert websocket.closed
+        assert heartbeat.timeouts == 1
+        assert heartbeat.pongs == 0
+        assert len(websocket.sent) >= 3
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_missing_server_pings_close_the_connection():
+        websocket = SilentSocket()
+        heartbeat = Heartbeat(interval=0.01, timeout=0.05, server_pings=True)
+        task = asyncio.create_task(heartbeat.run(websocket))
+        for _ in range(5):
+            await asyncio.sleep(0.02)
+            heartbeat.server_ping()
+        assert not task.done()
+
+        await asyncio.wait_for(task, 1)
+
+        assert websocket.closed
+        assert websocket.sent == []
+        assert heartbeat.server_pings_received == 5
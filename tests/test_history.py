@@ -0,0 +1,88 @@
+import pytest
+from httpx import AsyncClient
+
+from src import history
+from src.app import DB, app
+from src.history import TickHistory
+from src.store import QuoteStore
+
+BACKENDS = ["python"] + (["numpy"] if history.np is not None else [])
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(history, "np", None)
+    return request.param
+
+
+def feed(store: QuoteStore, ticks: list[tuple[float, str, str]], pair: str = "BTCUSDT") -> None:
+    for received_at, ask, bid in ticks:
+        store.update_many("kraken", {pair: (ask, bid, 0.0, received_at)})
+
+
+class TestTickHistory:
+    @staticmethod
+    def test_window_summary(backend):
+        store = QuoteStore()
+        ticks = TickHistory(store, depth=8)
+        feed(store, [(100.0, "11", "9"), (110.0, "13", "11"), (120.0, "9", "8"), (130.0, "12", "10")])
+
+        summary = ticks.summary("kraken", "BTCUSDT", window=30, now=140.0)
+
+        assert summary == {
+            "ticks": 3,
+            "from": 110.0,
+            "to": 130.0,
+            "open": 12.0,
+            "high": 12.0,
+            "low": 8.5,
+            "close": 11.0,
+            # 12 for 10s, 8.5 for 10s, 11 for 10s
+            "twap": pytest.approx(10.5),
+            "spread": {"min": 1.0, "max": 2.0},
+            "truncated": False,
+        }
+        assert ticks.summary("kraken", "BTCUSDT", window=5, now=140.0) == {"ticks": 0, "truncated": False}
+        assert ticks.summary("kraken", "ETHUSDT", window=5) is None
+
+    @staticmethod
+    def test_ring_keeps_the_last_ticks(backend):
+        store = QuoteStore()
+        ticks = TickHistory(store, depth=4)
+        feed(store, [(float(t), str(t + 1), str(t)) for t in range(10)])
+
+        summary = ticks.summary("kraken", "BTCUSDT", window=100, now=10.0)
+
+        assert summary["ticks"] == 4
+        assert (summary["open"], summary["close"]) == (6.5, 9.5)
+        assert summary["truncated"]
+        assert not ticks.summary("kraken", "BTCUSDT", window=3, now=10.0)["truncated"]
+
+    @staticmethod
+    def test_restored_quotes_and_budget():
+        store = QuoteStore()
+        ticks = TickHistory(store, depth=4, budget=2 * 4 * 3 * 8)
+        store.update("kraken", "OLDUSDT", "2", "1", received_at=1.0, restored=True)
+        for pair in ("BTCUSDT", "ETHUSDT", "XRPUSDT", "XRPUSDT"):
+            store.update("kraken", pair, "2", "1")
+
+        assert ticks.summary("kraken", "OLDUSDT", 60) is None
+        assert ticks.summary("kraken", "XRPUSDT", 60) is None
+        assert ticks.status() == {"pairs": 2, "untracked": 1, "depth": 4, "bytes": 192}
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_history_endpoint():
+        DB.update("kucoin", "HISTUSDT", "2.0", "1.0")
+        DB.update("kucoin", "HISTUSDT", "4.0", "3.0")
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/history/", params={"exchange": "KuCoin", "pair": "histusdt", "window": 60})
+            missing = await client.get("/history/", params={"exchange": "kucoin", "pair": "NONEUSDT"})
+
+        body = response.json()
+        assert response.status_code == 200
+        assert (body["exchange"], body["ticket"], body["window"]) == ("kucoin", "HISTUSDT", 60.0)
+        assert (body["ticks"], body["open"], body["close"]) == (2, 1.5, 3.5)
+        assert missing.status_code == 404
@@ -0,0 +1,143 @@
+import asyncio
+import gzip
+import time
+
+import pytest
+
+from markets.binance import BinanceWebSocket
+from markets.huobi import HuobiWebSocket, decode_frame
+from markets.kraken import KrakenWebSocket
+from markets.kucoin import KucoinWebSocket
+from src.codec import dumps
+from src.ingest import DecodePool, IngestQueue
+from src.store import QuoteStore
+
+
+class TestIngest:
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_queue_drops_oldest_when_full():
+        queue = IngestQueue(maxsize=2)
+        for frame in ("a", "b", "c"):
+            queue.put(frame)
+
+        assert [frame for frame, _ in await queue.get_batch()] == ["b", "c"]
+        assert queue.stats()["dropped"] == 1
+        assert len(queue) == 0
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_queue_keeps_control_frames_when_full():
+        store = QuoteStore()
+        connector = HuobiWebSocket(store)
+        ping = gzip.compress(dumps({"ping": 1}))
+        tick = gzip.compress(dumps({"ch": "market.btcusdt.ticker", "tick": {"ask": 2, "bid": 1}}))
+        queue = IngestQueue(maxsize=3, control=connector.control_frame)
+        for frame in (ping, tick, tick, ping):
+            queue.put(frame)
+
+        assert [frame for frame, _ in await queue.get_batch()] == [ping, tick, ping]
+        assert queue.stats()["dropped"] == 1
+
+        # only control frames queued: the buffer grows instead of losing one
+        for frame in (ping, ping, ping, ping):
+            queue.put(frame)
+        assert len(queue) == 4
+
+        assert KrakenWebSocket.control_frame('{"event":"pong","reqid":1}')
+        assert not KrakenWebSocket.control_frame('[42,{"a":["2"],"b":["1"]},"ticker","XBT/USD"]')
+        assert KucoinWebSocket.control_frame('{"id":"1","type":"pong"}')
+        assert not KucoinWebSocket.control_frame('{"type":"message","topic":"/market/ticker:all"}')
+        assert KucoinWebSocket.control_frame('{"id": "1", "type": "pong"}')
+        assert not KucoinWebSocket.control_frame('{"type": "message", "topic": "/market/ticker:all"}')
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_processing_merges_symbols_and_skips_bad_frames():
+        store = QuoteStore()
+        connector = BinanceWebSocket(store)
+        frames = [
+            dumps([{"s": "BTCUSDT", "a": "2", "b": "1"}, {"s": "ETHUSDT", "a": "4", "b": "3"}]),
+            b"not json",
+            dumps([{"s": "BTCUSDT", "a": "6", "b": "5"}, {"s": "XRPUSDT", "a": "x", "b": "1"}]),
+        ]
+        for frame in frames:
+            connector.queue.put(frame)
+
+        async with connector.processing():
+            while connector.queue.processed < len(frames):
+                await asyncio.sleep(0.01)
+
+        stats = connector.queue.stats()
+        assert store.exchange("binance").get("BTCUSDT") == {"ask": "6", "bid": "5", "ask_bid_average": 5.5}
+        assert "XRPUSDT" not in store.exchange("binance")
+        assert stats["merged"] == 1
+        assert stats["committed"] == 2
+        assert stats["errors"] == 2
+        # the merged batch is one store update
+        assert store.version("binance") == 1
+        assert list(store.changes["binance"]) == ["ETHUSDT", "BTCUSDT"]
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_processing_keeps_event_time_and_lag():
+        store = QuoteStore()
+        connector = BinanceWebSocket(store)
+        event_ms = int(time.time() * 1000) - 250
+        connector.queue.put(dumps([{"s": "BTCUSDT", "a": "2", "b": "1", "E": event_ms}]))
+
+        async with connector.processing():
+            while connector.queue.processed < 1:
+                await asyncio.sleep(0.01)
+
+        table = store.exchange("binance")
+        assert table.event[0] == event_ms / 1000
+        assert table.updated[0] >= table.event[0]
+        assert connector.metrics.lag.to_dict()["p50"] >= 250
+
+    @staticmethod
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("kind", ["thread", "process"])
+    async def test_decode_pool_keeps_frame_order(kind):
+        frames = [gzip.compress(dumps({"n": i})) for i in range(10)]
+        frames[3] = b"not gzip"
+        pool = DecodePool(decode_frame, kind, workers=2, chunk=4)
+        try:
+            results = await pool.decode(frames)
+        finally:
+            pool.close()
+
+        assert isinstance(results[3], Exception)
+        assert [result["n"] for i, result in enumerate(results) if i != 3] == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_pooled_huobi_processing_answers_pings():
+        store = QuoteStore()
+        connector = HuobiWebSocket(store, decoder=DecodePool(decode_frame, "thread", chunk=2))
+        pongs = []
+
+        async def pong(websocket, data) -> None:
+            pongs.append(data["ping"])
+
+        connector.pong = pong
+        tick = {"ask": 2.0, "bid": 1.0}
+        frames = [
+            {"ch": "market.btcusdt.ticker", "ts": 1, "tick": tick},
+            {"ping": 123},
+            {"ch": "market.ethusdt.ticker", "ts": 2, "tick": tick},
+        ]
+        for frame in frames:
+            connector.queue.put(gzip.compress(dumps(frame)))
+        connector.queue.put(b"broken")
+
+        try:
+            async with connector.processing():
+                while connector.queue.processed < 4:
+                    await asyncio.sleep(0.01)
+        finally:
+            connector.close()
+
+        assert pongs == [123]
+        assert sorted(store.exchange("huobi").ids) == ["BTCUSDT", "ETHUSDT"]
+        assert connector.queue.errors == 1
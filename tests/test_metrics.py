@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from markets.binance import BinanceWebSocket
+from src import app as app_module
+from src.app import app
+from src.codec import dumps
+from src.metrics import Histogram, query_shape, render
+from src.store import QuoteStore
+from src.supervisor import ConnectorState
+
+
+class TestMetrics:
+    @staticmethod
+    def test_histogram_buckets():
+        histogram = Histogram(buckets=(0.001, 0.01))
+        histogram.observe(0.0005)
+        histogram.observe(0.005, count=3)
+        histogram.observe(1.0)
+
+        assert histogram.counts == [1, 3, 1]
+        assert histogram.count == 5
+        assert histogram.sum == pytest.approx(1.0155)
+
+    @staticmethod
+    def test_query_shape():
+        assert query_shape(b"") == "all"
+        assert query_shape(b"exchange=binance") == "exchange"
+        assert query_shape(b"exchange=binance&since=10") == "delta"
+        assert query_shape(b"pair=BTCUSDT&exchange=binance") == "pair"
+        assert query_shape(b"pair=BTCUSDT") == "invalid"
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_render_connector_and_store_metrics():
+        store = QuoteStore()
+        connector = BinanceWebSocket(store)
+        frame = dumps([{"s": "BTCUSDT", "a": "2", "b": "1"}])
+        connector.queue.put(frame)
+        async with connector.processing():
+            while connector.queue.processed < 1:
+                await asyncio.sleep(0.01)
+        state = ConnectorState()
+        state.restarts = 2
+
+        text = render(store, {"binance": connector}, {"binance": state}, {})
+
+        assert f'ingest_bytes_total{{exchange="binance"}} {len(frame)}' in text
+        assert 'ingest_messages_total{exchange="binance"} 1' in text
+        assert 'connector_reconnects_total{exchange="binance"} 2' in text
+        assert 'ingest_decode_seconds_count{exchange="binance"} 1' in text
+        assert 'store_pairs{exchange="binance"} 1' in text
+        # one HELP/TYPE header per family
+        assert text.count("# TYPE ingest_messages_total counter") == 1
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint_records_currency_latency():
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            await client.get("/currency/", params={"exchange": "unknown"})
+            response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert app_module.LATENCY[("/currency/", "exchange")].count >= 1
+        assert 'http_request_duration_seconds_count{path="/currency/",shape="exchange"}' in response.text
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+from src.persistence import Snapshotter, load
+from src.store import QuoteStore
+
+
+class TestSnapshots:
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_round_trip_flags_restored_quotes(tmp_path):
+        path = str(tmp_path / "quotes.snapshot")
+        now = time.time()
+        store = QuoteStore()
+        store.update("binance", "BTCUSDT", "2", "1", event_time=now - 1, received_at=now)
+        store.update("huobi", "ETHUSDT", 4.0, 3.0, received_at=now)
+        await Snapshotter(store, path).save()
+
+        restored = QuoteStore()
+        assert load(restored, path) == 2
+        quote = restored.exchange("binance").get("BTCUSDT")
+        assert quote == {"ask": "2", "bid": "1", "ask_bid_average": 1.5, "stale": True, "updated_at": now}
+        assert restored.exchange("binance").event[0] == now - 1
+        assert restored.exchange("huobi").get("ETHUSDT")["ask"] == 4.0
+
+        restored.update("binance", "BTCUSDT", "6", "5")
+        assert restored.exchange("binance").get("BTCUSDT") == {"ask": "6", "bid": "5", "ask_bid_average": 5.5}
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_old_quotes_and_bad_files_are_skipped(tmp_path):
+        path = str(tmp_path / "quotes.snapshot")
+        store = QuoteStore()
+        store.update("kraken", "OLDUSDT", "2", "1", received_at=time.time() - 7200)
+        store.update("kraken", "NEWUSDT", "2", "1")
+        snapshotter = Snapshotter(store, path)
+        await snapshotter.save()
+
+        restored = QuoteStore()
+        assert load(restored, path, max_age=3600) == 1
+        assert "OLDUSDT" not in restored.exchange("kraken")
+
+        with open(path, "wb") as file:
+            file.write(b"garbage")
+        assert load(QuoteStore(), path) == 0
+        assert load(QuoteStore(), str(tmp_path / "missing")) == 0
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from src.prices import PRICE_SCALE, parse_price
+from src.store import FixedPointQuoteTable, QuoteStore
+
+
+class TestFixedPointPrices:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("65000.01000000", 65000_01 * PRICE_SCALE // 100),
+            ("0.00000123", 123 * PRICE_SCALE // 10**8),
+            ("1", PRICE_SCALE),
+            ("1e-05", PRICE_SCALE // 10**5),
+            (2345.67, 234567 * PRICE_SCALE // 100),
+        ],
+    )
+    def test_parse_price(value, expected):
+        assert parse_price(value) == expected
+
+    @staticmethod
+    @pytest.mark.parametrize("value", ["x", "", "-1", "1.2.3", "nan", "inf"])
+    def test_parse_price_invalid(value):
+        with pytest.raises(ValueError):
+            parse_price(value)
+
+    @staticmethod
+    def test_fixed_point_matches_float_api_for_typical_prices():
+        float_store = QuoteStore(fixed_point=set())
+        fixed_store = QuoteStore(fixed_point={"binance"})
+        for i in range(1000):
+            ask = f"{random.uniform(1, 70000):.2f}"
+            bid = f"{random.uniform(1, 70000):.2f}"
+            float_store.update("binance", f"PAIR{i}", ask, bid)
+            fixed_store.update("binance", f"PAIR{i}", ask, bid)
+
+        assert isinstance(fixed_store.exchange("binance"), FixedPointQuoteTable)
+        assert fixed_store.exchange("binance").as_dict() == float_store.exchange("binance").as_dict()
+
+    @staticmethod
+    def test_fixed_point_mid_is_exact_for_low_prices():
+        float_store = QuoteStore(fixed_point=set())
+        fixed_store = QuoteStore(fixed_point={"kraken"})
+        float_store.update("kraken", "SHIBUSDT", "0.00000901", "0.00000900")
+        fixed_store.update("kraken", "SHIBUSDT", "0.00000901", "0.00000900")
+
+        assert float_store.exchange("kraken").get("SHIBUSDT")["ask_bid_average"] == 0.00001
+        assert fixed_store.exchange("kraken").get("SHIBUSDT") == {
+            "ask": "0.00000901",
+            "bid": "0.00000900",
+            "ask_bid_average": 0.000009005,
+        }
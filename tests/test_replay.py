@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from benchmarks.replay import CONNECTORS, Recording, StandInServer, synthesize
+from markets.binance import BinanceWebSocket
+from markets.huobi import HuobiWebSocket
+from src import bootstrap
+from src.store import QuoteStore
+
+
+class TestReplay:
+    @staticmethod
+    def test_recording_round_trip(tmp_path):
+        recording = synthesize("huobi", pairs=5, frames=20)
+        path = str(tmp_path / "huobi.jsonl.gz")
+
+        recording.save(path)
+        loaded = Recording.load(path)
+
+        assert loaded.exchange == "huobi"
+        assert loaded.frames == [(round(offset, 6), frame) for offset, frame in recording.frames]
+        assert loaded.pairs_payload() == recording.pairs_payload()
+
+    @staticmethod
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("exchange", sorted(CONNECTORS))
+    async def test_connector_ingests_replayed_stream(exchange):
+        recording = synthesize(exchange, pairs=20, frames=300)
+        store = QuoteStore()
+        connector = CONNECTORS[exchange](store)
+
+        async with StandInServer(recording) as server:
+            server.configure(connector)
+            task = asyncio.create_task(connector.connection())
+
+            async def replayed() -> None:
+                while connector.queue.processed < len(recording):
+                    await asyncio.sleep(0.01)
+
+            try:
+                await asyncio.wait_for(replayed(), 10)
+            finally:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await bootstrap.close()
+
+        assert connector.queue.errors == 0
+        assert len(store.exchange(connector.name)) == 20
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_sharded_huobi_subscribes_every_symbol_once():
+        recording = synthesize("huobi", pairs=40, frames=400)
+        store = QuoteStore()
+        connectors = HuobiWebSocket.sharded(store, 3)
+
+        async with StandInServer(recording, route=True, route_quiet=0.02) as server:
+            for connector in connectors:
+                server.configure(connector)
+            tasks = [asyncio.create_task(connector.connection()) for connector in connectors]
+
+            async def replayed() -> None:
+                while server.replays_done < 3 or sum(c.queue.processed for c in connectors) < server.frames_sent + 40:
+                    await asyncio.sleep(0.01)
+
+            try:
+                await asyncio.wait_for(replayed(), 10)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await bootstrap.close()
+
+        assert [connector.label for connector in connectors] == ["huobi-0", "huobi-1", "huobi-2"]
+        assert all(connector.subscriptions for connector in connectors)
+        assert sum(connector.subscribed for connector in connectors) == 40
+        assert sum(connector.queue.errors for connector in connectors) == 0
+        assert len(store.exchange("huobi")) == 40
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_binance_book_mode_spreads_streams_over_connections():
+        recording = synthesize("binance_book", pairs=30, frames=200)
+        store = QuoteStore()
+        connectors = BinanceWebSocket.sharded(store, "book")
+        symbols = recording.pairs_payload()["symbols"]
+
+        async with StandInServer(recording) as server:
+            for connector in connectors:
+                server.configure(connector)
+            replayed = [server.watch(connector) for connector in connectors]
+            tasks = [asyncio.create_task(connector.connection()) for connector in connectors]
+            try:
+                await asyncio.wait_for(asyncio.gather(*replayed), 30)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await bootstrap.close()
+
+        owners = [[connector.owns(symbol["symbol"]) for connector in connectors].count(True) for symbol in symbols]
+        assert len(connectors) == 3
+        assert owners == [1] * len(symbols)
+        assert all(connector.subscribed == connector.subscriptions for connector in connectors)
+        assert sum(connector.queue.errors for connector in connectors) == 0
+        assert len(store.exchange("binance")) == 30
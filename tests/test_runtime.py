@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+
+from common.views import BaseWebSocketMixin
+from src.store import QuoteStore
+from src.symbols import registry
+
+
+class ToyExchange(BaseWebSocketMixin):
+    """
+    An exchange spec with only the hooks: a symbol catalog, a subscription and a tick format.
+    """
+
+    def __init__(self, db: QuoteStore, uri: str):
+        super().__init__(name="toy", db=db, uri=uri)
+
+    async def bootstrap(self) -> list:
+        return ["BTC_USDT", "XBT_EUR"]
+
+    async def subscribe(self, websocket, symbols: list) -> None:
+        await websocket.send(json.dumps({"op": "subscribe", "args": symbols}))
+
+    def register(self, raw: str) -> str:
+        return registry.add(self.name, raw, *raw.split("_"))
+
+    def extract_ticks(self, data: dict) -> list[tuple]:
+        return [(self.pair_of(tick["s"]), tick["a"], tick["b"], 0.0) for tick in data.get("ticks", ())]
+
+
+class TestConnectorRuntime:
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_spec_with_hooks_only_ingests_its_subscription():
+        async def exchange(websocket) -> None:
+            request = json.loads(await websocket.recv())
+            ticks = [{"s": symbol, "a": "2.0", "b": "1.0"} for symbol in request["args"]]
+            await websocket.send(json.dumps({"ticks": ticks}))
+            await websocket.wait_closed()
+
+        store = QuoteStore()
+        async with websockets.serve(exchange, "127.0.0.1", 0) as server:
+            connector = ToyExchange(store, f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}")
+            connector.heartbeat.interval = 0.01
+            task = asyncio.create_task(connector.connection())
+
+            async def ingested() -> None:
+                while len(store.exchanges.get("toy", ())) < 2 or not connector.heartbeat.pongs:
+                    await asyncio.sleep(0.01)
+
+            try:
+                await asyncio.wait_for(ingested(), 5)
+            finally:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+        assert sorted(store.exchange("toy").ids) == ["BTCEUR", "BTCUSDT"]
+        assert connector.websocket is None
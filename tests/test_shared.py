@@ -0,0 +1,163 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from src import ingestor
+from src.shared import SharedQuoteStore, SharedQuoteWriter
+from src.store import QuoteStore
+
+
+def read_quote(path: str, exchange: str, pair: str, results) -> None:
+    results.put(SharedQuoteStore(path).exchange(exchange).get(pair))
+
+
+@pytest.fixture
+def shared(tmp_path):
+    store = QuoteStore()
+    writer = SharedQuoteWriter(store, str(tmp_path / "quotes"), capacity=64)
+    reader = SharedQuoteStore(str(tmp_path / "quotes"))
+    yield store, writer, reader
+    reader.close()
+    writer.close()
+
+
+class TestSharedStore:
+    @staticmethod
+    def test_reader_mirrors_store(shared):
+        store, writer, reader = shared
+        store.update("binance", "BTCUSDT", "2", "1")
+        store.update("huobi", "BTCUSDT", 4.0, 3.0)
+        store.update("binance", "BTCUSDT", "6", "5")
+
+        assert reader.names() == ["binance", "huobi"]
+        assert "kraken" not in reader
+        assert reader.epoch == store.epoch
+        assert reader.version() == store.version()
+        assert reader.version("binance") == store.version("binance")
+        assert reader.exchange("huobi").get("BTCUSDT") == {"ask": 4.0, "bid": 3.0, "ask_bid_average": 3.5}
+        assert reader.aggregated() == store.aggregated()
+
+    @staticmethod
+    def test_changed_since_and_max_age(shared):
+        store, writer, reader = shared
+        now = time.time()
+        store.update("kraken", "OLDUSDT", "2", "1", received_at=now - 60)
+        version = store.version("kraken")
+        store.update("kraken", "BTCUSDT", "2", "1")
+        store.update("kraken", "LAGUSDT", "2", "1", event_time=now - 30)
+
+        assert reader.changed_since("kraken", version) == store.changed_since("kraken", version)
+        assert reader.changed_since("kraken", 0, max_age=5).keys() == {"BTCUSDT"}
+        assert reader.aggregated(max_age=40).keys() == {"BTCUSDT", "LAGUSDT"}
+
+    @staticmethod
+    def test_max_age_skips_old_stale_quotes(shared):
+        store, writer, reader = shared
+        store.update("kraken", "OLDUSDT", "2", "1", received_at=time.time() - 60)
+        store.update("kraken", "BTCUSDT", "2", "1")
+        store.mark_stale("kraken", "OLDUSDT")
+
+        assert reader.changed_since("kraken", 0, max_age=5).keys() == {"BTCUSDT"}
+
+    @staticmethod
+    def test_delta_falls_back_to_scan_when_ring_wrapped(shared):
+        store, writer, reader = shared
+        for i in range(300):
+            store.update("kucoin", f"PAIR{i % 10}USDT", str(i + 2), str(i))
+
+        assert reader.changed_since("kucoin", 0) == store.changed_since("kucoin", 0)
+        assert reader.changed_since("kucoin", 295).keys() == {f"PAIR{i}USDT" for i in range(5, 10)}
+
+    @staticmethod
+    def test_poll_calls_listeners(shared):
+        store, writer, reader = shared
+        calls = []
+        reader.subscribe(lambda exchange, pairs: calls.extend((exchange, pair) for pair in pairs))
+        store.update("binance", "BTCUSDT", "2", "1")
+        store.update("binance", "ETHUSDT", "2", "1")
+        reader.poll()
+        reader.poll()
+
+        assert sorted(calls) == [("binance", "BTCUSDT"), ("binance", "ETHUSDT")]
+
+    @staticmethod
+    def test_frame_is_published_once(shared):
+        store, writer, reader = shared
+        store.update("kucoin", "BTCUSDT", "2", "1")
+        version = reader.version("kucoin")
+        store.update_many("kucoin", {f"PAIR{i}USDT": (str(i + 2), str(i), 0.0, None) for i in range(10)})
+
+        assert reader.version("kucoin") == version + 1
+        assert reader.changed_since("kucoin", version) == store.changed_since("kucoin", version)
+        assert len(reader.exchange("kucoin")) == 11
+
+    @staticmethod
+    def test_readers_see_whole_frames(shared):
+        store, writer, reader = shared
+        pairs = [f"PAIR{i}USDT" for i in range(50)]
+        store.update_many("binance", {pair: ("1", "1", 0.0, None) for pair in pairs})
+        done, stop = threading.Event(), threading.Event()
+
+        def write() -> None:
+            # every frame writes one price to all pairs, the thread switches in the middle of frames
+            for i in range(2, 2000):
+                if stop.is_set():
+                    break
+                store.update_many("binance", {pair: (str(i), str(i), 0.0, None) for pair in pairs})
+            done.set()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        reads = 0
+        try:
+            while not done.is_set() or not reads:
+                table = reader.exchange("binance")
+                assert len({quote["ask"] for quote in table.as_dict().values()}) == 1
+                assert len({quote["ask"] for _, quote in table.recent(0, None)}) == 1
+                reads += 1
+        finally:
+            stop.set()
+            thread.join()
+
+    @staticmethod
+    def test_status_blob(shared):
+        store, writer, reader = shared
+        assert reader.status() == {}
+        writer.write_status({"connectors": {"binance": {"status": "running"}}})
+        assert reader.status() == {"connectors": {"binance": {"status": "running"}}}
+
+    @staticmethod
+    def test_reader_in_another_process(tmp_path):
+        store = QuoteStore()
+        writer = SharedQuoteWriter(store, str(tmp_path / "quotes"), capacity=64)
+        store.update("binance", "BTCUSDT", "2", "1")
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        process = context.Process(target=read_quote, args=(str(tmp_path / "quotes"), "binance", "BTCUSDT", results))
+        process.start()
+        try:
+            assert results.get(timeout=30) == {"ask": "2", "bid": "1", "ask_bid_average": 1.5}
+        finally:
+            process.join()
+            writer.close()
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_ingest_shuts_down_on_sigterm(tmp_path, monkeypatch):
+        monkeypatch.setattr(ingestor, "connectors", lambda store: [])
+        monkeypatch.setattr(ingestor, "SNAPSHOT_PATH", str(tmp_path / "snapshot"))
+        ready = asyncio.Event()
+        task = asyncio.create_task(ingestor.serve(str(tmp_path / "quotes"), ready))
+        await asyncio.wait_for(ready.wait(), 10)
+
+        os.kill(os.getpid(), signal.SIGTERM)
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(task, 10)
+
+        # the finally of ingest() ran: the last snapshot is written
+        assert (tmp_path / "snapshot").exists()
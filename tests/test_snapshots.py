@@ -0,0 +1,122 @@
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from src.app import DB, app
+from src.codec import loads
+from src.snapshots import AggregatedBody
+from src.store import QuoteStore
+
+
+class TestSnapshotResponses:
+    @staticmethod
+    def test_aggregated_body_follows_writes():
+        store = QuoteStore()
+        body = AggregatedBody(store)
+        assert loads(body.build()) == {"result": {}}
+
+        store.update("binance", "BTCUSDT", "2", "1")
+        store.update("kraken", "BTCUSDT", "4", "3")
+        store.update("kraken", "ETHUSDT", "6", "5")
+        assert loads(body.build()) == {"result": store.aggregated()}
+
+        fragment = body.fragments["ETHUSDT"]
+        store.update("binance", "BTCUSDT", "8", "7")
+        store.mark_stale("kraken", "BTCUSDT")
+        assert loads(body.build()) == {"result": store.aggregated()}
+        # untouched pairs keep their serialized fragment
+        assert body.fragments["ETHUSDT"] is fragment
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_etag_not_modified():
+        DB.update("binance", "ETAGUSDT", "2.0", "1.0")
+        params = {"exchange": "binance"}
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/currency/", params=params)
+            etag = response.headers["etag"]
+            cached = await client.get("/currency/", params=params, headers={"If-None-Match": etag})
+
+            DB.update("binance", "ETAGUSDT", "4.0", "3.0")
+            changed = await client.get("/currency/", params=params, headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert changed.json()["result"]["ETAGUSDT"]["ask"] == "4.0"
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_aggregated_gzip_body():
+        for i in range(100):
+            DB.update("kraken", f"GZIP{i}USDT", "2.0", "1.0")
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/currency/", headers={"Accept-Encoding": "gzip"})
+            plain = await client.get("/currency/", headers={"Accept-Encoding": "identity"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-encoding" not in plain.headers
+        assert response.headers["etag"] == plain.headers["etag"]
+        assert response.json() == plain.json()
+        assert response.json()["result"]["GZIP1USDT"]["kraken"]["ask"] == "2.0"
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_since_delta():
+        DB.update("huobi", "DELTA1USDT", "2.0", "1.0")
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            full = await client.get("/currency/", params={"exchange": "huobi", "since": 0})
+            version = full.json()["version"]
+            DB.update("huobi", "DELTA2USDT", "4.0", "3.0")
+            delta = await client.get("/currency/", params={"exchange": "huobi", "since": version})
+            no_exchange = await client.get("/currency/", params={"since": version})
+
+        assert "DELTA1USDT" in full.json()["result"]
+        assert version == f"{DB.epoch}-{DB.version('huobi') - 1}"
+        assert delta.json() == {
+            "result": {"DELTA2USDT": {"ask": "4.0", "bid": "3.0", "ask_bid_average": 3.5}},
+            "version": f"{DB.epoch}-{DB.version('huobi')}",
+        }
+        assert no_exchange.status_code == 400
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_since_from_another_process_gets_everything():
+        DB.update("huobi", "EPOCH1USDT", "2.0", "1.0")
+        DB.update("huobi", "EPOCH2USDT", "2.0", "1.0")
+        # a token from before a restart whose version the new process already passed
+        since = f"0-{DB.version('huobi') - 1}"
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            restarted = await client.get("/currency/", params={"exchange": "huobi", "since": since})
+            bare = await client.get("/currency/", params={"exchange": "huobi", "since": DB.version("huobi") - 1})
+            invalid = await client.get("/currency/", params={"exchange": "huobi", "since": "abc"})
+
+        assert {"EPOCH1USDT", "EPOCH2USDT"} <= restarted.json()["result"].keys()
+        assert bare.json()["result"].keys() == {"EPOCH2USDT"}
+        assert invalid.status_code == 400
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_max_age_filter():
+        DB.update("kucoin", "FRESHUSDT", "2.0", "1.0")
+        DB.update("kucoin", "STALEUSDT", "2.0", "1.0", event_time=time.time() - 120)
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            exchange = await client.get("/currency/", params={"exchange": "kucoin", "max_age_ms": 60000})
+            stale = await client.get(
+                "/currency/", params={"exchange": "kucoin", "pair": "STALEUSDT", "max_age_ms": 60000}
+            )
+            aggregated = await client.get("/currency/", params={"max_age_ms": 60000})
+
+        assert "FRESHUSDT" in exchange.json()["result"]
+        assert "STALEUSDT" not in exchange.json()["result"]
+        assert stale.status_code == 404
+        assert "STALEUSDT" not in aggregated.json()["result"]
+        assert "kucoin" in aggregated.json()["result"]["FRESHUSDT"]
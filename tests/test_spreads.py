@@ -0,0 +1,78 @@
+import pytest
+from httpx import AsyncClient
+
+from src.app import DB, app
+from src.spreads import SpreadIndex
+from src.store import QuoteStore
+
+
+class TestSpreadIndex:
+    @staticmethod
+    def test_best_quotes_follow_updates():
+        store = QuoteStore(fixed_point={"kraken"})
+        spreads = SpreadIndex(store)
+        store.update("binance", "BTCUSDT", "101", "99")
+        assert spreads.quote("BTCUSDT") == {
+            "bid": {"exchange": "binance", "price": "99"},
+            "ask": {"exchange": "binance", "price": "101"},
+            "spread_bps": -200.0,
+        }
+        assert spreads.widest(10) == []
+
+        # kraken bids above the binance ask
+        store.update("kraken", "BTCUSDT", "103", "102")
+        assert spreads.quote("BTCUSDT") == {
+            "bid": {"exchange": "kraken", "price": "102"},
+            "ask": {"exchange": "binance", "price": "101"},
+            "spread_bps": pytest.approx(98.522, abs=1e-3),
+        }
+
+        store.update("kraken", "BTCUSDT", "100.5", "100")
+        quote = spreads.quote("BTCUSDT")
+        assert (quote["bid"]["exchange"], quote["ask"]["exchange"]) == ("kraken", "kraken")
+
+    @staticmethod
+    def test_ranking_and_stale_quotes():
+        store = QuoteStore()
+        spreads = SpreadIndex(store)
+        store.update_many(
+            "binance",
+            {"BTCUSDT": ("101", "99", 0.0, None), "ETHUSDT": ("11", "10", 0.0, None), "XRPUSDT": ("2", "1", 0.0, None)},
+        )
+        store.update_many("kucoin", {"BTCUSDT": ("100", "99", 0.0, None), "ETHUSDT": ("10", "9.5", 0.0, None)})
+
+        # ETHUSDT: bid 10 against ask 10, BTCUSDT: bid 99 against ask 100
+        assert [entry["ticket"] for entry in spreads.widest(10)] == ["ETHUSDT", "BTCUSDT"]
+        assert [entry["ticket"] for entry in spreads.widest(1)] == ["ETHUSDT"]
+
+        store.update("kucoin", "ETHUSDT", "20", "1")
+        assert [entry["ticket"] for entry in spreads.widest(10)] == ["BTCUSDT", "ETHUSDT"]
+
+        # a stale quote is no longer compared, a single quote is not ranked
+        store.mark_stale("kucoin", "ETHUSDT")
+        assert [entry["ticket"] for entry in spreads.widest(10)] == ["BTCUSDT"]
+        assert spreads.quote("ETHUSDT")["bid"]["exchange"] == "binance"
+        assert len(spreads.ranking) == len(spreads.ranked) == 1
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_best_and_spreads_endpoints():
+        DB.update("kraken", "BESTUSDT", "2000.0", "1999.0")
+        DB.update("huobi", "BESTUSDT", "998.0", "997.0")
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            best = await client.get("/best/", params={"pair": "bestusdt"})
+            widest = await client.get("/spreads/", params={"top": 1000})
+            first = await client.get("/spreads/", params={"top": 1})
+            missing = await client.get("/best/", params={"pair": "NONEUSDT"})
+            invalid = await client.get("/spreads/", params={"top": 0})
+
+        assert best.status_code == 200
+        assert best.json()["bid"] == {"exchange": "kraken", "price": "1999.0"}
+        assert best.json()["ask"] == {"exchange": "huobi", "price": "998.0"}
+        # other tests share the app store, the pair is ranked among their pairs
+        ranking = [entry["ticket"] for entry in widest.json()["result"]]
+        assert "BESTUSDT" in ranking
+        assert first.json()["result"] == widest.json()["result"][:1]
+        assert missing.status_code == 404
+        assert invalid.status_code == 422
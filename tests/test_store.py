@@ -0,0 +1,116 @@
+import sys
+import time
+
+import pytest
+
+from src.store import QuoteStore
+
+
+class TestQuoteStore:
+    @staticmethod
+    def test_aggregated_index_follows_updates():
+        store = QuoteStore()
+        store.update("binance", "BTCUSDT", "2", "1")
+        store.update("kraken", "BTCUSDT", "4", "3")
+        store.update("binance", "BTCUSDT", "6", "5")
+
+        assert store.names() == ["binance", "kraken"]
+        assert store.index == {"BTCUSDT": {"binance": 0, "kraken": 0}}
+        assert store.aggregated() == {
+            "BTCUSDT": {
+                "binance": {"ask": "6", "bid": "5", "ask_bid_average": 5.5},
+                "kraken": {"ask": "4", "bid": "3", "ask_bid_average": 3.5},
+            }
+        }
+
+    @staticmethod
+    def test_invalid_tick_leaves_slot_untouched():
+        store = QuoteStore()
+        store.update("huobi", "BTCUSDT", "2", "1")
+
+        try:
+            store.update("huobi", "BTCUSDT", "x", "1")
+        except ValueError:
+            pass
+
+        assert store.exchange("huobi").get("BTCUSDT") == {"ask": "2", "bid": "1", "ask_bid_average": 1.5}
+        assert store.version("huobi") == 1
+
+    @staticmethod
+    def test_table_grows_past_capacity():
+        store = QuoteStore()
+        table = store.table("kucoin")
+        capacity = len(table.ask)
+        for i in range(capacity + 1):
+            store.update("kucoin", f"PAIR{i}USDT", str(i + 2), str(i))
+
+        assert len(table) == capacity + 1
+        assert len(table.ask) == 2 * capacity
+        assert table.get(f"PAIR{capacity}USDT")["ask_bid_average"] == capacity + 1
+
+    @staticmethod
+    def test_nbytes_counts_every_column():
+        store = QuoteStore()
+        table = store.table("kucoin")
+        for i in range(100):
+            store.update("kucoin", f"PAIR{i}USDT", "2", "1")
+        before, restored = table.nbytes(), sys.getsizeof(table.restored)
+        for i in range(100):
+            store.update("kucoin", f"PAIR{i}USDT", "2", "1", restored=True)
+
+        # only the restored set grew
+        assert table.nbytes() - before == sys.getsizeof(table.restored) - restored > 0
+        # ask, bid, mid, updated and event
+        assert table.nbytes() > 5 * sys.getsizeof(table.event)
+
+    @staticmethod
+    def test_changed_since_returns_only_newer_pairs():
+        store = QuoteStore()
+        for pair in ("BTCUSDT", "ETHUSDT", "XRPUSDT"):
+            store.update("kraken", pair, "2", "1")
+        version = store.version("kraken")
+        store.update("kraken", "BTCUSDT", "4", "3")
+
+        assert store.changed_since("kraken", 0).keys() == {"BTCUSDT", "ETHUSDT", "XRPUSDT"}
+        assert store.changed_since("kraken", version) == {"BTCUSDT": {"ask": "4", "bid": "3", "ask_bid_average": 3.5}}
+        assert store.changed_since("kraken", store.version("kraken")) == {}
+        # unknown future version falls back to the full cache
+        assert len(store.changed_since("kraken", store.version("kraken") + 10)) == 3
+
+    @staticmethod
+    def test_max_age_stops_at_first_stale_quote():
+        store = QuoteStore()
+        now = time.time()
+        store.update("huobi", "OLDUSDT", "2", "1", received_at=now - 60)
+        store.update("huobi", "LAGUSDT", "2", "1", event_time=now - 30, received_at=now)
+        store.update("huobi", "NEWUSDT", "2", "1", event_time=now - 0.1, received_at=now)
+
+        assert store.changed_since("huobi", 0, max_age=5).keys() == {"NEWUSDT"}
+        assert store.aggregated(max_age=40).keys() == {"NEWUSDT", "LAGUSDT"}
+        assert store.exchange("huobi").age(0, now) == pytest.approx(60)
+
+    @staticmethod
+    def test_frame_is_one_update():
+        store = QuoteStore()
+        calls = []
+        store.subscribe(lambda exchange, pairs: calls.append((exchange, pairs)))
+        store.update("binance", "BTCUSDT", "2", "1")
+        version = store.version("binance")
+
+        rejected = store.update_many(
+            "binance",
+            {"ETHUSDT": ("4", "3", 0.0, None), "XRPUSDT": ("x", "1", 0.0, None), "BTCUSDT": ("6", "5", 0.0, None)},
+        )
+
+        assert [pair for pair, _ in rejected] == ["XRPUSDT"]
+        assert store.version("binance") == version + 1
+        assert store.version() == 2
+        assert calls == [("binance", ["BTCUSDT"]), ("binance", ["ETHUSDT", "BTCUSDT"])]
+        assert store.changed_since("binance", version) == {
+            "ETHUSDT": {"ask": "4", "bid": "3", "ask_bid_average": 3.5},
+            "BTCUSDT": {"ask": "6", "bid": "5", "ask_bid_average": 5.5},
+        }
+        assert store.index == {"BTCUSDT": {"binance": 0}, "ETHUSDT": {"binance": 1}}
+        # nothing parses, nothing is written
+        assert [pair for pair, _ in store.update_many("binance", {"BTCUSDT": (None, "1", 0.0, None)})] == ["BTCUSDT"]
+        assert store.version("binance") == version + 1
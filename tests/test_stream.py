@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import DB, app
+from src.store import QuoteStore
+from src.stream import StreamHub, Subscriber
+
+
+class TestStream:
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_subscriber_conflates_per_pair():
+        store = QuoteStore()
+        hub = StreamHub(store)
+        subscriber = Subscriber()
+        hub.subscribe(subscriber, "binance", ["btcusdt"])
+
+        for price in ("1", "2", "3"):
+            store.update("binance", "BTCUSDT", price, price)
+        store.update("binance", "ETHUSDT", "9", "9")
+
+        updates = await asyncio.wait_for(subscriber.drain(store), 1)
+        assert updates == [
+            {"exchange": "binance", "pair": "BTCUSDT", "price": {"ask": "3", "bid": "3", "ask_bid_average": 3.0}}
+        ]
+        assert subscriber.conflated == 2
+
+        hub.remove(subscriber)
+        store.update("binance", "BTCUSDT", "4", "4")
+        assert subscriber.pending == set()
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_exchange_subscriber_reads_changes_once():
+        store = QuoteStore()
+        hub = StreamHub(store)
+        subscriber = Subscriber()
+        store.update("kraken", "BTCUSDT", "1", "1")
+        hub.subscribe(subscriber, "kraken", None)
+
+        snapshot = await asyncio.wait_for(subscriber.drain(store), 1)
+        for price in ("2", "3"):
+            store.update("kraken", "ETHUSDT", price, price)
+        changes = await asyncio.wait_for(subscriber.drain(store), 1)
+
+        assert [update["pair"] for update in snapshot] == ["BTCUSDT"]
+        assert changes == [
+            {"exchange": "kraken", "pair": "ETHUSDT", "price": {"ask": "3", "bid": "3", "ask_bid_average": 3.0}}
+        ]
+
+    @staticmethod
+    def test_stream_sends_snapshot_and_errors():
+        DB.update("kucoin", "STREAMUSDT", "2.0", "1.0")
+        client = TestClient(app)
+
+        with client.websocket_connect("/stream") as websocket:
+            websocket.send_json({"action": "subscribe", "exchange": "unknown"})
+            assert "error" in websocket.receive_json()
+            # the stream survives a malformed pair
+            websocket.send_json({"action": "subscribe", "exchange": "kucoin", "pairs": [1]})
+            assert websocket.receive_json() == {"error": "Pairs must be a list of strings"}
+
+            websocket.send_json({"action": "subscribe", "exchange": "kucoin", "pairs": ["streamusdt"]})
+            message = websocket.receive_json()
+
+        assert message == {
+            "updates": [
+                {
+                    "exchange": "kucoin",
+                    "pair": "STREAMUSDT",
+                    "price": {"ask": "2.0", "bid": "1.0", "ask_bid_average": 1.5},
+                }
+            ]
+        }
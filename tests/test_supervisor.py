@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+import websockets
+
+from markets.binance import BinanceWebSocket
+from src.store import QuoteStore
+from src.supervisor import Supervisor
+
+FRAME = '[{"s": "BTCUSDT", "a": "2.0", "b": "1.0"}]'
+
+
+class FakeExchange:
+    """
+    Local websocket server standing in for an exchange, behaviour picks what every connection does.
+    """
+
+    def __init__(self, behaviour):
+        self.behaviour = behaviour
+        self.connections = 0
+        self.server = None
+
+    async def handler(self, websocket: websockets.WebSocketServerProtocol) -> None:
+        self.connections += 1
+        await self.behaviour(websocket, self.connections)
+
+    async def __aenter__(self) -> str:
+        self.server = await websockets.serve(self.handler, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}"
+
+    async def __aexit__(self, *args) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    async def poll() -> None:
+        while not condition():
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+class TestSupervisor:
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_restarts_dropped_connection():
+        async def drop_after_one_frame(websocket, _):
+            await websocket.send(FRAME)
+
+        exchange = FakeExchange(drop_after_one_frame)
+        store = QuoteStore()
+        async with exchange as uri:
+            connector = BinanceWebSocket(store)
+            connector.uri = uri
+            supervisor = Supervisor([connector], backoff_initial=0.01, backoff_max=0.05, stall_timeout=5)
+            supervisor.start()
+            try:
+                await wait_for(lambda: exchange.connections >= 3)
+            finally:
+                await supervisor.stop()
+
+        state = supervisor.status()["binance"]
+        assert state["restarts"] >= 2
+        assert state["stalls"] == 0
+        assert store.exchange("binance").get("BTCUSDT")["ask"] == "2.0"
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_reconnects_stalled_feed():
+        async def hang_after_first_connection(websocket, connection):
+            if connection > 1:
+                await websocket.send(FRAME)
+            await websocket.wait_closed()
+
+        exchange = FakeExchange(hang_after_first_connection)
+        store = QuoteStore()
+        async with exchange as uri:
+            connector = BinanceWebSocket(store)
+            connector.uri = uri
+            supervisor = Supervisor([connector], backoff_initial=0.01, backoff_max=0.05, stall_timeout=0.2)
+            supervisor.start()
+            try:
+                await wait_for(lambda: "binance" in store)
+                await wait_for(lambda: supervisor.status()["binance"]["status"] == "running")
+            finally:
+                await supervisor.stop()
+
+        state = supervisor.status()["binance"]
+        assert exchange.connections >= 2
+        assert state["stalls"] >= 1
+        assert state["last_error"].startswith("no data")
+
+    @staticmethod
+    def test_backoff_is_capped_and_jittered():
+        supervisor = Supervisor([], backoff_initial=1, backoff_max=8)
+
+        delays = [supervisor.backoff(attempt) for attempt in range(10)]
+
+        assert all(0.5 <= delay <= 8 for delay in delays)
+        assert 4 <= supervisor.backoff(10) <= 8
@@ -0,0 +1,72 @@
+import pytest
+from httpx import AsyncClient
+
+from markets.binance import BinanceWebSocket
+from markets.huobi import HuobiWebSocket
+from markets.kraken import KrakenWebSocket
+from markets.kucoin import KucoinWebSocket
+from src.app import DB, app
+from src.store import QuoteStore
+from src.symbols import SymbolRegistry
+
+
+class TestSymbolRegistry:
+    @staticmethod
+    def test_aliases_and_separators_map_to_one_pair():
+        registry = SymbolRegistry()
+
+        assert registry.add("kraken", "XBT/USDT", "XBT", "USDT") == "BTCUSDT"
+        assert registry.add("kucoin", "BTC-USDT", "BTC", "USDT") == "BTCUSDT"
+        assert registry.add_symbol("huobi", "market.btcusdt.ticker", "btcusdt") == "BTCUSDT"
+        assert registry.add_symbol("binance", "XDGUSDT", "XDGUSDT") == "DOGEUSDT"
+
+        assert registry.assets["BTCUSDT"] == ("BTC", "USDT")
+        assert registry.channels("kraken") == {"XBT/USDT": "BTCUSDT"}
+        assert registry.channels("huobi")["market.btcusdt.ticker"] is registry.channels("kucoin")["BTC-USDT"]
+
+    @staticmethod
+    def test_unknown_quote_keeps_the_symbol():
+        registry = SymbolRegistry()
+
+        assert registry.add_symbol("binance", "ABCXYZ", "abcxyz") == "ABCXYZ"
+        assert "ABCXYZ" not in registry.assets
+
+    @staticmethod
+    def test_resolve_exchange_names():
+        registry = SymbolRegistry()
+        registry.add("kraken", "XBT/EUR", "XBT", "EUR")
+
+        assert registry.resolve("XBTEUR") == "BTCEUR"
+        # not registered, the alias is applied to the base
+        assert registry.resolve("XBTUSD") == "BTCUSD"
+        assert registry.resolve("ETHUSD") == "ETHUSD"
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_aggregated_view_merges_the_same_asset_across_exchanges():
+        store = QuoteStore()
+        ticker = {"a": ["30001.1", 1, "1.0"], "b": ["30000.9", 1, "1.0"]}
+        await KrakenWebSocket(store).handler_data([1, ticker, "ticker", "XBT/USDT"])
+        await BinanceWebSocket(store).handler_data([{"s": "BTCUSDT", "a": "30001.0", "b": "30000.0"}])
+        await KucoinWebSocket(store).handler_data(
+            {"subject": "BTC-USDT", "data": {"bestAsk": "30002.0", "bestBid": "30001.0"}}
+        )
+        await HuobiWebSocket(store).handler_data(
+            None, {"ch": "market.btcusdt.ticker", "tick": {"ask": 30003.0, "bid": 30002.0}}
+        )
+
+        assert sorted(store.aggregated()["BTCUSDT"]) == ["binance", "huobi", "kraken", "kucoin"]
+        assert "XBTUSDT" not in store.aggregated()
+
+    @staticmethod
+    @pytest.mark.asyncio
+    async def test_exchange_pair_name_is_served_under_the_canonical_pair():
+        ticker = {"a": ["27001.1", 1, "1.0"], "b": ["27000.9", 1, "1.0"]}
+        await KrakenWebSocket(DB).handler_data([1, ticker, "ticker", "XBT/EUR"])
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/currency/", params={"exchange": "kraken", "pair": "XBTEUR"})
+
+        assert response.status_code == 200
+        assert response.json()["ticket"] == "BTCEUR"
+        assert response.json()["price"]["ask"] == "27001.1"